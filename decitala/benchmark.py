@@ -0,0 +1,624 @@
+####################################################################################################
+# File:     benchmark.py
+# Purpose:  Benchmarks for path finding (on synthetic extractions) and for end-to-end search
+#           (on the bundled corpora and synthetic scores).
+#
+# Author:   Luke Poeppel
+#
+# Location: NYC, 2021
+####################################################################################################
+"""
+Benchmarks for the path-finding algorithms. Synthetic extractions (with controllable size,
+overlap density and slur density) are generated with :obj:`synthetic_extractions`; every function
+in :obj:`BENCHMARKS` is timed on them and its peak memory is measured with ``tracemalloc``, and
+the optimality gap of the beam search is reported for every width of :obj:`BEAM_WIDTHS`. The
+results can be saved as a JSON baseline and later compared against it. Timings depend on the
+machine, so the baseline is not versioned: save it before a change and compare after it.
+
+The end-to-end benchmarks (:obj:`run_search_benchmarks`, also available as ``decitala bench``)
+time the loading of every :obj:`decitala.hash_table.FragmentHashTable` subclass and
+:obj:`decitala.search.rolling_hash_search`, :obj:`decitala.search.rolling_tree_search` and
+:obj:`decitala.search.path_finder` on the scores in ``tests/static``, on the ODNC transcriptions and
+on long scores generated by :obj:`generate_score`, with the search time broken down by stage.
+"""
+import dataclasses
+import functools
+import glob
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from music21 import (
+	note,
+	spanner,
+	stream
+)
+
+from . import (
+	hash_table,
+	instrumentation
+)
+from .fragment import GeneralFragment
+from .search import (
+	Extraction,
+	path_finder,
+	rolling_hash_search,
+	rolling_tree_search
+)
+from .path_finding import (
+	beam,
+	dijkstra,
+	floyd_warshall,
+	path_finding_utils,
+	pofp
+)
+
+here = os.path.abspath(os.path.dirname(__file__))
+baseline_path = os.path.dirname(here) + "/benchmarks/path_finding.json"
+static_dir = os.path.dirname(here) + "/tests/static"
+
+# Durations (quarter lengths) of the notes of the synthetic fragments.
+SYNTHETIC_DURATIONS = [0.25, 0.5, 0.75, 1.0]
+
+# The number of Pareto optimal paths grows exponentially with the overlap; cap it.
+PARETO_MAX_PATHS = 10000
+
+# Beam widths whose optimality gap (see `beam.optimality_gap`) is reported by `run_benchmarks`.
+BEAM_WIDTHS = (1, 4, 16, 64)
+
+class BenchmarkException(Exception):
+	pass
+
+def synthetic_extractions(
+		n,
+		overlap=2.0,
+		slur_density=0.1,
+		max_onsets=6,
+		seed=0
+	):
+	"""
+	Generates ``n`` random :obj:`decitala.search.Extraction` objects sorted by onset. Every
+	fragment is a :obj:`decitala.fragment.GeneralFragment` of 2 to ``max_onsets`` notes; onsets
+	are on a sixteenth-note grid.
+
+	:param int n: number of extractions.
+	:param float overlap: average number of extractions sounding at any onset.
+	:param float slur_density: probability of an extraction being spanned by a slur.
+	:param int max_onsets: maximum number of onsets in a fragment.
+	:param int seed: seed of the random generator.
+	:return: a list of extractions.
+	:rtype: list
+
+	>>> data = synthetic_extractions(100, overlap=3.0, seed=1)
+	>>> len(data)
+	100
+	>>> all(a.onset_range[0] <= b.onset_range[0] for a, b in zip(data, data[1:]))
+	True
+	"""
+	if overlap <= 0:
+		raise BenchmarkException("The overlap must be positive.")
+
+	rng = np.random.default_rng(seed)
+	mean_duration = np.mean(SYNTHETIC_DURATIONS) * (2 + max_onsets) / 2
+	step = mean_duration / overlap
+
+	extractions = []
+	start = 0.0
+	for i in range(n):
+		num_onsets = int(rng.integers(2, max_onsets + 1))
+		ql_array = list(rng.choice(SYNTHETIC_DURATIONS, size=num_onsets))
+		is_spanned_by_slur = bool(rng.random() < slur_density)
+		extractions.append(Extraction(
+			fragment=GeneralFragment(ql_array, name=f"synthetic-{i}"),
+			onset_range=(start, start + sum(ql_array)),
+			retrograde=False,
+			factor=1.0,
+			difference=0.0,
+			mod_hierarchy_val=1,
+			pitch_content=[None] * num_onsets,
+			is_spanned_by_slur=is_spanned_by_slur,
+			slur_count=num_onsets if is_spanned_by_slur else 0,
+			slur_start_end_count=2 if is_spanned_by_slur else 0,
+			id_=i + 1
+		))
+		start += round(rng.exponential(step) * 4) / 4
+
+	return extractions
+
+def _pareto_optimal_paths(data, cost_function_class):
+	return list(pofp.iter_pareto_optimal_longest_paths(data, max_paths=PARETO_MAX_PATHS))
+
+
+# name: (function of the data and the cost function, largest size it is run on).
+BENCHMARKS = {
+	"sources_and_sinks": (
+		lambda data, cost_function_class: path_finding_utils.sources_and_sinks(data),
+		None
+	),
+	"build_graph": (
+		lambda data, cost_function_class: path_finding_utils.build_graph(data, cost_function_class), # noqa
+		None
+	),
+	"dijkstra_best_source_and_sink": (
+		lambda data, cost_function_class: dijkstra.dijkstra_best_source_and_sink(data, cost_function_class), # noqa
+		2000
+	),
+	"floyd_warshall": (
+		lambda data, cost_function_class: floyd_warshall.floyd_warshall(data, cost_function_class), # noqa
+		100
+	),
+	"get_pareto_optimal_longest_paths": (_pareto_optimal_paths, 2000),
+	"beam_search": (
+		lambda data, cost_function_class: beam.beam_search(data, cost_function_class),
+		None
+	),
+}
+
+def measure(function, repeat=3, trace_memory=True):
+	"""
+	Times a function of no arguments and measures its peak memory (in a separate run, since
+	``tracemalloc`` slows the code down).
+
+	:param function: the function to measure.
+	:param int repeat: number of timed runs.
+	:param bool trace_memory: whether to measure the peak memory. If ``False``, it is ``None``.
+	:return: the best and median time of the runs (in seconds) and the peak memory (in bytes).
+	:rtype: dict
+	"""
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		function()
+		times.append(time.perf_counter() - start)
+
+	if not(trace_memory):
+		return {
+			"best_seconds": min(times),
+			"median_seconds": float(np.median(times)),
+			"peak_memory": None
+		}
+
+	tracemalloc.start()
+	try:
+		function()
+		_, peak_memory = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+
+	return {
+		"best_seconds": min(times),
+		"median_seconds": float(np.median(times)),
+		"peak_memory": peak_memory
+	}
+
+def run_benchmarks(
+		sizes=(100, 300, 1000),
+		overlap=2.0,
+		slur_density=0.1,
+		names=None,
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		repeat=3,
+		seed=0,
+		beam_widths=BEAM_WIDTHS
+	):
+	"""
+	Runs the benchmarks on synthetic extractions of each size. A benchmark is skipped for sizes
+	above its limit in :obj:`BENCHMARKS`. The optimality gap of the beam search (see
+	:obj:`decitala.path_finding.beam.optimality_gap`) is also reported for each size and beam
+	width.
+
+	:param tuple sizes: numbers of extractions.
+	:param float overlap: see :obj:`synthetic_extractions`.
+	:param float slur_density: see :obj:`synthetic_extractions`.
+	:param list names: optional subset of the keys of :obj:`BENCHMARKS`.
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param int repeat: number of timed runs per benchmark.
+	:param int seed: seed of the random generator.
+	:param tuple beam_widths: beam widths whose optimality gap is reported.
+	:return: the parameters of the run, the measurements (keyed by benchmark name and size) and
+			the beam search and exact costs and their gap (keyed by size and beam width).
+	:rtype: dict
+	"""
+	names = list(BENCHMARKS) if names is None else names
+	unknown = set(names) - set(BENCHMARKS)
+	if unknown:
+		raise BenchmarkException(f"Unknown benchmarks: {sorted(unknown)}.")
+
+	results = {name: dict() for name in names}
+	beam_optimality_gaps = dict()
+	for size in sizes:
+		data = synthetic_extractions(size, overlap=overlap, slur_density=slur_density, seed=seed)
+		beam_optimality_gaps[str(size)] = dict()
+		for beam_width in beam_widths:
+			beam_cost, exact_cost, gap = beam.optimality_gap(
+				data,
+				cost_function_class=cost_function_class,
+				beam_width=beam_width
+			)
+			beam_optimality_gaps[str(size)][str(beam_width)] = {
+				"beam_cost": beam_cost,
+				"exact_cost": exact_cost,
+				"gap": gap
+			}
+		for name in names:
+			function, max_size = BENCHMARKS[name]
+			if max_size is not None and size > max_size:
+				continue
+			results[name][str(size)] = measure(
+				lambda: function(data, cost_function_class),
+				repeat=repeat
+			)
+
+	return {
+		"parameters": {
+			"sizes": list(sizes),
+			"overlap": overlap,
+			"slur_density": slur_density,
+			"repeat": repeat,
+			"seed": seed,
+			"beam_widths": list(beam_widths),
+			"python": platform.python_version(),
+			"machine": platform.machine()
+		},
+		"results": results,
+		"beam_optimality_gaps": beam_optimality_gaps
+	}
+
+@functools.lru_cache(maxsize=None)
+def _legacy_num_onsets(fragment):
+	return len(fragment.ql_array())
+
+class _LegacyHashFragment(GeneralFragment):
+	"""
+	A :obj:`decitala.fragment.GeneralFragment` hashed by the string built from its name and data
+	on every call, with ``num_onsets`` cached in a global ``lru_cache`` keyed by the fragment, as
+	before the identity key and per-instance caches; used by :obj:`fragment_hash_benchmark`.
+	"""
+	def __hash__(self):
+		lil_repr = "-".join([str(self.name), str(self.data)])
+		return hash(lil_repr)
+
+	def __eq__(self, other):
+		return self.__hash__() == other.__hash__()
+
+	@property
+	def num_onsets(self):
+		return _legacy_num_onsets(self)
+
+def fragment_hash_benchmark(
+		n=100,
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		repeat=3,
+		seed=0
+	):
+	"""
+	Micro-benchmark of the fragment caches: times the scalar ``cost`` of the cost function on every
+	pair of ``n`` synthetic extractions (each call reads ``num_onsets`` of both fragments), once
+	with :obj:`decitala.fragment.GeneralFragment` objects and once with fragments using the former
+	string-based hash and global ``lru_cache``.
+
+	:param int n: number of extractions.
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param int repeat: number of timed runs.
+	:param int seed: seed of the random generator.
+	:return: the measurements of both versions and the speedup of the best times.
+	:rtype: dict
+	"""
+	data = synthetic_extractions(n, seed=seed)
+	legacy_data = [
+		dataclasses.replace(
+			x,
+			fragment=_LegacyHashFragment(list(x.fragment.ql_array()), name=x.fragment.name)
+		) for x in data
+	]
+
+	def _all_costs(extractions):
+		for vertex_a in extractions:
+			for vertex_b in extractions:
+				cost_function_class.cost(vertex_a=vertex_a, vertex_b=vertex_b)
+
+	current = measure(lambda: _all_costs(data), repeat=repeat, trace_memory=False)
+	legacy = measure(lambda: _all_costs(legacy_data), repeat=repeat, trace_memory=False)
+	return {
+		"current": current,
+		"legacy": legacy,
+		"speedup": legacy["best_seconds"] / current["best_seconds"]
+	}
+
+def save_baseline(benchmark_results, filepath=baseline_path):
+	"""
+	Saves the output of :obj:`run_benchmarks` as a JSON baseline.
+	"""
+	os.makedirs(os.path.dirname(filepath), exist_ok=True)
+	with open(filepath, "w") as output:
+		json.dump(obj=benchmark_results, fp=output, indent=4)
+
+def compare_to_baseline(benchmark_results, filepath=baseline_path, tolerance=0.25):
+	"""
+	Compares the output of :obj:`run_benchmarks` with a saved baseline.
+
+	:param dict benchmark_results: output of :obj:`run_benchmarks`.
+	:param str filepath: path to the baseline.
+	:param float tolerance: relative increase of the best time or peak memory above which a
+							measurement counts as a regression.
+	:return: one dictionary per regression (benchmark name, size, metric, baseline value, current
+			value and their ratio).
+	:rtype: list
+	"""
+	with open(filepath, "r") as baseline_file:
+		baseline = json.load(baseline_file)
+
+	regressions = []
+	for name, by_size in benchmark_results["results"].items():
+		for size, measurements in by_size.items():
+			baseline_measurements = baseline["results"].get(name, dict()).get(size)
+			if baseline_measurements is None:
+				continue
+			for metric in ["best_seconds", "peak_memory"]:
+				ratio = measurements[metric] / max(baseline_measurements[metric], 1e-12)
+				if ratio > 1 + tolerance:
+					regressions.append({
+						"name": name,
+						"size": int(size),
+						"metric": metric,
+						"baseline": baseline_measurements[metric],
+						"current": measurements[metric],
+						"ratio": ratio
+					})
+
+	return regressions
+
+
+####################################################################################################
+# End-to-end search benchmarks.
+TABLE_CLASSES = [
+	hash_table.GreekFootHashTable,
+	hash_table.DecitalaHashTable,
+	hash_table.ProsodicMeterHashTable,
+	hash_table.AllCorporaHashTable,
+]
+
+SEARCH_STAGES = ["parse", "windowing", "lookup", "slur_features", "graph", "path"]
+
+def generate_score(
+		num_notes,
+		filepath,
+		rest_density=0.02,
+		slur_density=0.1,
+		seed=0
+	):
+	"""
+	Writes a single-part MusicXML score of ``num_notes`` random notes and rests (with durations in
+	:obj:`SYNTHETIC_DURATIONS`) and random slurs of 2 to 5 notes.
+
+	:param int num_notes: number of notes and rests.
+	:param str filepath: path of the MusicXML file to write.
+	:param float rest_density: probability of an object being a rest.
+	:param float slur_density: probability of a slur starting on a note.
+	:param int seed: seed of the random generator.
+	:return: the path of the written file.
+	:rtype: str
+	"""
+	rng = np.random.default_rng(seed)
+	part = stream.Part()
+	runs = [[]]  # runs of consecutive notes, which slurs cannot leave.
+	for _ in range(num_notes):
+		quarter_length = float(rng.choice(SYNTHETIC_DURATIONS))
+		if rng.random() < rest_density:
+			part.append(note.Rest(quarterLength=quarter_length))
+			runs.append([])
+		else:
+			this_note = note.Note(int(rng.integers(60, 85)), quarterLength=quarter_length)
+			part.append(this_note)
+			runs[-1].append(this_note)
+
+	for run in runs:
+		i = 0
+		while i < len(run) - 1:
+			if rng.random() < slur_density:
+				length = int(rng.integers(2, 6))
+				part.insert(0, spanner.Slur(run[i:i + length]))
+				i += length
+			else:
+				i += 1
+
+	stream.Score([part]).write("musicxml", fp=filepath)
+	return filepath
+
+def static_scores():
+	"""
+	:return: the MusicXML scores in ``tests/static`` (empty if the tests are not available).
+	:rtype: list
+	"""
+	return sorted(glob.glob(static_dir + "/*.xml"))
+
+def odnc_scores():
+	"""
+	:return: the paths of the ODNC transcriptions that exist on this machine and the number of
+			transcriptions whose file is missing.
+	:rtype: tuple
+	"""
+	from .database.db import get_all_transcriptions
+
+	filepaths = [x.filepath for x in get_all_transcriptions()]
+	existing = [x for x in filepaths if os.path.isfile(x)]
+	return existing, len(filepaths) - len(existing)
+
+def search_stage_timings(
+		filepath,
+		part_num,
+		table,
+		windows=list(range(2, 19)),
+		algorithm="dag",
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		enforce_earliest_start=False
+	):
+	"""
+	Runs :obj:`decitala.search.path_finder` in an :obj:`decitala.instrumentation.instrument` block.
+	With ``algorithm="dag"``, the graph and path stages are timed separately.
+
+	:param str filepath: Path to file to be searched.
+	:param int part_num: Part in the file to be searched (0-indexed).
+	:param `decitala.hash_table.FragmentHashTable` table: a loaded hash table.
+	:param list windows: The allowed window sizes for search.
+	:param str algorithm: algorithm passed to :obj:`decitala.search.path_finder`.
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param bool enforce_earliest_start: whether to require that all sources begin at the earliest
+										detected onset.
+	:return: the seconds spent in each of :obj:`SEARCH_STAGES`, the counters of the
+			instrumentation and the number of extractions in the path.
+	:rtype: dict
+	"""
+	with instrumentation.instrument() as report:
+		path = path_finder(
+			filepath=filepath,
+			part_num=part_num,
+			table=table,
+			windows=windows,
+			algorithm=algorithm,
+			cost_function_class=cost_function_class,
+			enforce_earliest_start=enforce_earliest_start
+		)
+
+	return {
+		"seconds": {stage: report.seconds.get(stage, 0.0) for stage in SEARCH_STAGES},
+		"counts": dict(report.counts),
+		"path_length": len(path) if path else 0
+	}
+
+def _load_trees():
+	"""
+	The trees depend on optional packages (``treeplotter`` and ``wand``); returns ``None`` with
+	the reason if they cannot be imported.
+	"""
+	try:
+		from . import trees
+	except ImportError as error:
+		return None, f"rolling_tree_search unavailable: {error}"
+
+	return (
+		trees.FragmentTree.from_frag_type(frag_type="greek_foot", rep_type="ratio"),
+		trees.FragmentTree.from_frag_type(frag_type="greek_foot", rep_type="difference")
+	), None
+
+def run_search_benchmarks(
+		sources=("static", "odnc", "synthetic"),
+		synthetic_lengths=(500,),
+		table_class=hash_table.GreekFootHashTable,
+		algorithm="dijkstra",
+		repeat=1,
+		include_tree_search=True,
+		seed=0
+	):
+	"""
+	Runs the end-to-end benchmarks. Every hash table class in :obj:`TABLE_CLASSES` is timed while
+	loading; every score is searched with :obj:`decitala.search.rolling_hash_search`,
+	:obj:`decitala.search.rolling_tree_search` and :obj:`decitala.search.path_finder`, and its search
+	time is broken down with :obj:`search_stage_timings`. ODNC transcriptions whose file is
+	missing on this machine are counted in ``"skipped"``.
+
+	:param tuple sources: any of ``"static"`` (``tests/static/*.xml``), ``"odnc"`` (the
+						transcriptions referenced by the ODNC database) and ``"synthetic"``
+						(scores from :obj:`generate_score`).
+	:param tuple synthetic_lengths: numbers of notes of the synthetic scores.
+	:param table_class: the :obj:`decitala.hash_table.FragmentHashTable` subclass searched.
+	:param str algorithm: algorithm passed to :obj:`decitala.search.path_finder`.
+	:param int repeat: number of timed runs per measurement.
+	:param bool include_tree_search: whether to time :obj:`decitala.search.rolling_tree_search`.
+	:param int seed: seed of the synthetic scores.
+	:return: the parameters of the run, the table loading times and the per-score measurements.
+	:rtype: dict
+	"""
+	unknown = set(sources) - {"static", "odnc", "synthetic"}
+	if unknown:
+		raise BenchmarkException(f"Unknown sources: {sorted(unknown)}.")
+
+	table_loads = {
+		this_class.__name__: measure(this_class, repeat=repeat, trace_memory=False)
+		for this_class in TABLE_CLASSES
+	}
+	table = table_class()
+
+	skipped = dict()
+	search_trees = None
+	if include_tree_search:
+		search_trees, reason = _load_trees()
+		if search_trees is None:
+			skipped["rolling_tree_search"] = reason
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		scores = []
+		if "static" in sources:
+			scores.extend(("static", x) for x in static_scores())
+		if "odnc" in sources:
+			odnc_filepaths, num_missing = odnc_scores()
+			scores.extend(("odnc", x) for x in odnc_filepaths)
+			skipped["odnc_missing_files"] = num_missing
+		if "synthetic" in sources:
+			for length in synthetic_lengths:
+				filepath = generate_score(length, f"{tmp_dir}/synthetic_{length}.xml", seed=seed)
+				scores.append(("synthetic", filepath))
+
+		results = []
+		for source, filepath in scores:
+			result = {
+				"source": source,
+				"name": os.path.basename(filepath),
+				"rolling_hash_search": measure(
+					lambda: rolling_hash_search(filepath=filepath, part_num=0, table=table),
+					repeat=repeat,
+					trace_memory=False
+				),
+				"path_finder": measure(
+					lambda: path_finder(
+						filepath=filepath,
+						part_num=0,
+						table=table,
+						algorithm=algorithm
+					),
+					repeat=repeat,
+					trace_memory=False
+				),
+				"stages": search_stage_timings(
+					filepath=filepath,
+					part_num=0,
+					table=table,
+					algorithm=algorithm
+				)
+			}
+			if search_trees is not None:
+				result["rolling_tree_search"] = measure(
+					lambda: rolling_tree_search(
+						filepath=filepath,
+						part_num=0,
+						ratio_tree=search_trees[0],
+						difference_tree=search_trees[1]
+					),
+					repeat=repeat,
+					trace_memory=False
+				)
+			results.append(result)
+
+	return {
+		"parameters": {
+			"sources": list(sources),
+			"synthetic_lengths": list(synthetic_lengths),
+			"table_class": table_class.__name__,
+			"algorithm": algorithm,
+			"repeat": repeat,
+			"seed": seed,
+			"python": platform.python_version(),
+			"machine": platform.machine()
+		},
+		"table_loads": table_loads,
+		"scores": results,
+		"skipped": skipped
+	}
@@ -7,52 +7,42 @@
 # Location: Frankfurt, DE 2020 / NYC, 2020 / Kent, 2020
 ####################################################################################################
 import click
+import importlib
 import json
-import sys
 import doctest
 
 from decitala import __version__
-from . import (
-	search,
-	fragment,
-	utils,
-	hash_table,
-	database,
-	trees
-)
-
-from .path_finding import (
-	dijkstra,
-	floyd_warshall,
-	path_finding_utils,
-	pofp
-)
-from .hm import (
-	contour,
-	molt,
-	hm_utils,
-	schultz,
-	contour_utils
-)
+from . import utils
 
+# Imported by the commands that need them, so that `decitala --help` (and every command) only
+# pays for its own imports.
 ALL_MODULES = [
-	contour,
-	contour_utils,
-	database,
-	fragment,
-	utils,
-	trees,
-	search,
-	hash_table,
-	dijkstra,
-	floyd_warshall,
-	path_finding_utils,
-	pofp,
-	schultz,
-	molt,
-	hm_utils
+	"hm.contour",
+	"hm.contour_utils",
+	"database",
+	"fragment",
+	"utils",
+	"trees",
+	"search",
+	"hash_table",
+	"path_finding.dijkstra",
+	"path_finding.floyd_warshall",
+	"path_finding.path_finding_utils",
+	"path_finding.pofp",
+	"hm.schultz",
+	"hm.molt",
+	"hm.hm_utils"
 ]
 
+def _import(module_name):
+	# The modules of the subpackages can also be given by their short name (e.g. "contour").
+	for full_name in ALL_MODULES:
+		if full_name.split(".")[-1] == module_name:
+			module_name = full_name
+			break
+	return importlib.import_module("." + module_name, package=__package__)
+
+
 logger = utils.get_logger(name=__file__)
 
 @click.group()
@@ -64,21 +54,18 @@ def decitala():
 def doctest_runner(module=None):
 	if module:
 		logger.info("Testing: {}".format(module))
-		logger.info(doctest.testmod(module))
+		logger.info(doctest.testmod(_import(module)))
 	else:
 		logger.info("Running all doctests...")
 		for this_module in ALL_MODULES:
 			logger.info("Testing: {}".format(this_module))
-			logger.info(doctest.testmod(this_module))
+			logger.info(doctest.testmod(_import(this_module)))
 
 @decitala.command()
 @click.option("--module", default="", help="A module in the decitala package to doctest")
 def dtest(module):
 	if module:
-		arg_in = sys.argv[-1]
-		if arg_in:
-			mod = globals()[arg_in]
-			doctest_runner(module=mod)
+		doctest_runner(module=module)
 	else:
 		doctest_runner()
 
@@ -88,12 +75,14 @@ def dtest(module):
 @click.option("--frag_type", default="greek_foot")
 @click.option("--verbose", default=True)
 def path_finder(filepath, part_num, frag_type, verbose): # noqa
+	from . import fragment, hash_table, search
+
 	if frag_type == "decitala":
 		table = hash_table.DecitalaHashTable()
 	elif frag_type == "greek_foot":
 		table = hash_table.GreekFootHashTable()
 
-	best_path = path_finder(
+	best_path = search.path_finder(
 		filepath=filepath,
 		part_num=part_num,
 		table=table,
@@ -106,6 +95,38 @@ def path_finder(filepath, part_num, frag_type, verbose): # noqa
 		json.dump(obj=best_path, fp=output, cls=fragment.FragmentEncoder, indent=4)
 	logger.info(f"Result saved in: {filename}")
 
+@decitala.command()
+@click.option("--source", "sources", multiple=True, default=["static", "odnc", "synthetic"], help="static, odnc and/or synthetic.") # noqa
+@click.option("--length", "lengths", multiple=True, default=[500], type=int, help="Number of notes of a synthetic score.") # noqa
+@click.option("--frag_type", default="greek_foot")
+@click.option("--algorithm", default="dijkstra")
+@click.option("--repeat", default=1, help="Number of timed runs per measurement.")
+@click.option("--tree_search/--no_tree_search", default=True)
+@click.option("--output", default="decitala_bench.json", help="Path to the JSON report.")
+def bench(sources, lengths, frag_type, algorithm, repeat, tree_search, output):
+	"""Times the table loads, searches and path finding; see decitala.benchmark."""
+	from . import benchmark, hash_table
+
+	table_classes = {
+		"greek_foot": hash_table.GreekFootHashTable,
+		"decitala": hash_table.DecitalaHashTable,
+		"prosodic_meter": hash_table.ProsodicMeterHashTable,
+		"all": hash_table.AllCorporaHashTable,
+	}
+	report = benchmark.run_search_benchmarks(
+		sources=sources,
+		synthetic_lengths=lengths,
+		table_class=table_classes[frag_type],
+		algorithm=algorithm,
+		repeat=repeat,
+		include_tree_search=tree_search
+	)
+	with open(output, "w") as report_file:
+		json.dump(obj=report, fp=report_file, indent=4)
+	for score in report["scores"]:
+		logger.info(f"{score['name']}: path_finder {score['path_finder']['best_seconds']:.3f}s")
+	logger.info(f"Report saved in: {output}")
+
 
 # @decitala.command()
 # @click.option("--filepath", default="", help="Path to filepath parsed for the database.")
@@ -6,21 +6,32 @@
 #
 # Location: Kent, CT 2020, 2021 / Frankfurt, DE 2020 / NYC, 2021
 ####################################################################################################
+import functools
 import json
 import natsort
 import os
 
+from concurrent.futures import ProcessPoolExecutor
+
 from sqlalchemy import (
+	insert,
+	inspect,
+	select,
 	Column,
 	String,
 	Float,
 	Boolean,
 	Integer,
+	LargeBinary,
 	ForeignKey,
+	Index,
 )
 from sqlalchemy.orm import (
 	relationship,
 	backref,
+	configure_mappers,
+	joinedload,
+	selectinload,
 )
 
 from music21 import converter
@@ -30,6 +41,8 @@ from ..utils import get_logger
 from ..hm import hm_utils
 from ..vis import annotate_score
 from .db_utils import (
+	dispose_engines,
+	get_scoped_session,
 	get_session,
 	TRANSCRIPTION_BASE,
 	USER_BASE
@@ -40,6 +53,7 @@ from ..search import (
 )
 from ..path_finding import path_finding_utils
 from .corpora_models import (
+	CategoryData,
 	SubcategoryData,
 	TranscriptionData
 )
@@ -73,27 +87,107 @@ class CompositionData(USER_BASE):
 		self.part_num = part_num
 		self.local_filepath = local_filepath
 
+def encode_pitch_content(pitch_content):
+	"""
+	Compact binary encoding of the ``pitch_content`` of an extraction (one byte per MIDI value,
+	each note preceded by its number of pitches; ``None`` is stored as ``255``).
+
+	:param list pitch_content: a list of tuples of MIDI values, one per note.
+	:rtype: bytes
+
+	>>> encode_pitch_content([(72,), (60, 64), ()])
+	b'\\x01H\\x02<@\\x00'
+	>>> decode_pitch_content(encode_pitch_content([(72,), (60, 64), (), None]))
+	[(72,), (60, 64), (), None]
+	"""
+	encoded = bytearray()
+	for pitches in pitch_content:
+		if pitches is None:
+			encoded.append(255)
+		else:
+			encoded.append(len(pitches))
+			encoded.extend(pitches)
+	return bytes(encoded)
+
+def decode_pitch_content(encoded):
+	"""
+	Inverse of :obj:`encode_pitch_content`.
+
+	:param bytes encoded: an encoded pitch content.
+	:rtype: list
+	"""
+	pitch_content = []
+	i = 0
+	while i < len(encoded):
+		size = encoded[i]
+		if size == 255:
+			pitch_content.append(None)
+			i += 1
+		else:
+			pitch_content.append(tuple(encoded[i + 1:i + 1 + size]))
+			i += 1 + size
+	return pitch_content
+
+class FragmentDim(USER_BASE):
+	"""
+	SQLAlchemy model representing a distinct fragment of an extraction or path database. Every
+	:obj:`ExtractionData` row references one by ``fragment_id``, so the occurrences of a fragment
+	are found with an index lookup (e.g. on ``name``).
+
+	:param str data: the fragment serialized with :obj:`decitala.fragment.FragmentEncoder`.
+	:param str name: name of the fragment.
+	:param str frag_type: type of the fragment.
+	"""
+	__tablename__ = "FragmentDim"
+
+	id = Column(Integer, primary_key=True)
+
+	data = Column(String, index=True)
+	name = Column(String, index=True)
+	frag_type = Column(String)
+
+	def __init__(self, data, name, frag_type):
+		self.data = data
+		self.name = name
+		self.frag_type = frag_type
+
+	@classmethod
+	def from_fragment(cls, fragment):
+		"""
+		Creates a :obj:`FragmentDim` object from a fragment.
+		"""
+		return FragmentDim(**_fragment_values(json.dumps(fragment, cls=FragmentEncoder)))
+
+def _fragment_values(fragment_json):
+	loaded = json.loads(fragment_json)
+	return dict(data=fragment_json, name=loaded.get("name"), frag_type=loaded.get("frag_type"))
+
 # TODO: rename to `ExtractionData`
 class ExtractionData(USER_BASE):
 	"""
 	SQLAlchemy model representing a fragment extracted from a composition. Intended to be used with
 	the class method :obj:`ExtractionData.from_extraction`. See :obj:`decitala.search.Extraction`
-	for the relevant information on each column in the database.
+	for the relevant information on each column in the database. The fragment is stored in the
+	:obj:`FragmentDim` table and the pitch content is encoded with :obj:`encode_pitch_content`.
 	"""
 	__tablename__ = "ExtractionData"
+	__table_args__ = (
+		Index("ix_ExtractionData_composition_onset", "composition_data_id", "onset_start"),
+	)
 
 	id = Column(Integer, primary_key=True)
 
-	fragment = Column(String)
+	fragment_id = Column(Integer, ForeignKey("FragmentDim.id"), index=True)
+	fragment_dim = relationship("FragmentDim")
 	onset_start = Column(Float)
 	onset_stop = Column(Float)
 
 	retrograde = Column(Boolean)
 	factor = Column(Float)
 	difference = Column(Float)
-	mod_hierarchy_val = Column(Integer)
+	mod_hierarchy_val = Column(Integer, index=True)
 
-	pitch_content = Column(String)
+	pitch_content = Column(LargeBinary)
 	is_spanned_by_slur = Column(Boolean)
 	slur_count = Column(Integer)
 	slur_start_end_count = Column(Integer)
@@ -106,7 +200,7 @@ class ExtractionData(USER_BASE):
 
 	def __init__(
 			self,
-			fragment,
+			fragment_dim,
 			onset_start,
 			onset_stop,
 			retrograde,
@@ -120,7 +214,7 @@ class ExtractionData(USER_BASE):
 			id_,
 			contiguous_summation
 		):
-		self.fragment = fragment
+		self.fragment_dim = fragment_dim
 		self.onset_start = onset_start
 		self.onset_stop = onset_stop
 		self.retrograde = retrograde
@@ -134,60 +228,323 @@ class ExtractionData(USER_BASE):
 		self.id_ = id_
 		self.contiguous_summation = contiguous_summation
 
+	@property
+	def fragment(self):
+		"""
+		The fragment, serialized with :obj:`decitala.fragment.FragmentEncoder`.
+		"""
+		return self.fragment_dim.data
+
 	@classmethod
-	def from_extraction(cls, extraction):
+	def from_extraction(cls, extraction, fragment_dim=None):
 		"""
 		Creates an :obj:`decitala.database.db.ExtractionData` object from a
 		:obj:`decitala.search.Extraction` object. This is more durable to accidentally breaking
 		things when adding data to extractions.
+
+		:param fragment_dim: the :obj:`FragmentDim` of the fragment, if it is already stored.
 		"""
-		return ExtractionData(
-			fragment=json.dumps(extraction.fragment, cls=FragmentEncoder),
-			onset_start=extraction.onset_range[0],
-			onset_stop=extraction.onset_range[1],
-			retrograde=extraction.retrograde,
-			factor=extraction.factor,
-			difference=extraction.difference,
-			mod_hierarchy_val=extraction.mod_hierarchy_val,
-			pitch_content=json.dumps(extraction.pitch_content),
-			is_spanned_by_slur=extraction.is_spanned_by_slur,
-			slur_count=extraction.slur_count,
-			slur_start_end_count=extraction.slur_start_end_count,
-			id_=extraction.id_,
-			contiguous_summation=extraction.contiguous_summation
-		)
+		if fragment_dim is None:
+			fragment_dim = FragmentDim.from_fragment(extraction.fragment)
+		return ExtractionData(fragment_dim=fragment_dim, **_extraction_values(extraction))
 
-def _add_extraction_results_to_session(
-		filepath,
-		part_nums,
-		table,
-		windows,
-		session
-	):
-	filepath_name = filepath.split("/")[-1]
-	for this_part in part_nums:
-		data = CompositionData(
-			name=filepath_name,
-			part_num=this_part,
-			local_filepath=filepath
-		)
-		session.add(data)
+def _extraction_values(extraction):
+	"""
+	Column values of the :obj:`ExtractionData` row of an extraction, except for its fragment.
+	"""
+	return dict(
+		onset_start=extraction.onset_range[0],
+		onset_stop=extraction.onset_range[1],
+		retrograde=extraction.retrograde,
+		factor=extraction.factor,
+		difference=extraction.difference,
+		mod_hierarchy_val=extraction.mod_hierarchy_val,
+		pitch_content=encode_pitch_content(extraction.pitch_content),
+		is_spanned_by_slur=extraction.is_spanned_by_slur,
+		slur_count=extraction.slur_count,
+		slur_start_end_count=extraction.slur_start_end_count,
+		id_=extraction.id_,
+		contiguous_summation=extraction.contiguous_summation
+	)
+
+
+# Faster (but not crash-safe) settings used while a new database is written.
+BUILD_PRAGMAS = {"journal_mode": "MEMORY", "synchronous": "OFF"}
 
-		all_results = rolling_hash_search(
-			filepath=filepath,
-			part_num=this_part,
-			table=table,
-			windows=windows
+class BulkWriter:
+	"""
+	Writes compositions and their extractions to a database with SQLAlchemy Core (one
+	``executemany`` per chunk of rows, each chunk in its own transaction) instead of adding
+	:obj:`ExtractionData` objects to a session one by one. Every distinct fragment is serialized
+	and stored (as a :obj:`FragmentDim` row) once. While the writer is open, the SQLite pragmas of
+	:obj:`BUILD_PRAGMAS` are used; the previous settings are restored when it is closed. Intended
+	for building new databases: if the process crashes in the middle of a build, the database may
+	be corrupt.
+
+	:param str db_path: path to the database.
+	:param int chunk_size: number of extraction rows per transaction.
+
+	>>> import tempfile
+	>>> from decitala.search import Extraction
+	>>> from decitala.fragment import GreekFoot
+	>>> extraction = Extraction(fragment=GreekFoot("Iamb"), onset_range=(0.0, 0.75), retrograde=False, factor=0.5, difference=0.0, mod_hierarchy_val=1, pitch_content=[(60,), (62,)], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=1) # noqa
+	>>> with tempfile.TemporaryDirectory() as tmpdir:
+	... 	db_path = tmpdir + "/example.db"
+	... 	with BulkWriter(db_path) as writer:
+	... 		composition_id = writer.add_composition("example.xml", 0, "/path/to/example.xml")
+	... 		writer.add_extractions(composition_id, [extraction] * 3)
+	... 	session = get_session(db_path=db_path, base=USER_BASE)
+	... 	[x.onset_stop for x in session.query(CompositionData).first().composition_data]
+	[0.75, 0.75, 0.75]
+	"""
+	def __init__(self, db_path, chunk_size=5000):
+		self.chunk_size = chunk_size
+		engine = get_session(db_path=db_path, base=USER_BASE).get_bind()
+		self.connection = engine.connect()
+		self._previous_pragmas = {
+			pragma: self.connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+			for pragma in BUILD_PRAGMAS
+		}
+		self._set_pragmas(BUILD_PRAGMAS)
+
+		self._rows = []
+		self._fragment_ids = {}
+		# Ids of the fragments already in the database, by their JSON.
+		self._dim_ids = {
+			data: id_ for id_, data in self.connection.execute(
+				select(FragmentDim.__table__.c.id, FragmentDim.__table__.c.data)
+			)
+		}
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.close()
+		else:
+			self.connection.rollback()
+			self._close_connection()
+		return False
+
+	def _set_pragmas(self, pragmas):
+		for pragma, value in pragmas.items():
+			self.connection.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+		self.connection.commit()
+
+	def add_composition(self, name, part_num, local_filepath):
+		"""
+		:return: the id of the new :obj:`CompositionData` row.
+		:rtype: int
+		"""
+		result = self.connection.execute(
+			insert(CompositionData.__table__).values(
+				name=name,
+				part_num=part_num,
+				local_filepath=local_filepath
+			)
 		)
-		if not(all_results):
-			return "No fragments extracted –– stopping."
+		return result.inserted_primary_key[0]
+
+	def add_extractions(self, composition_id, extractions):
+		"""
+		Queues the rows of the extractions of a composition, writing every full chunk.
+
+		:param int composition_id: see :obj:`BulkWriter.add_composition`.
+		:param list extractions: a list of :obj:`decitala.search.Extraction` objects.
+		"""
+		for extraction in extractions:
+			fragment_id = self._fragment_ids.get(extraction.fragment)
+			if fragment_id is None:
+				fragment_id = self._fragment_id(json.dumps(extraction.fragment, cls=FragmentEncoder))
+				self._fragment_ids[extraction.fragment] = fragment_id
+			row = _extraction_values(extraction)
+			row["fragment_id"] = fragment_id
+			row["composition_data_id"] = composition_id
+			self._rows.append(row)
+
+		while len(self._rows) >= self.chunk_size:
+			self._write(self._rows[:self.chunk_size])
+			del self._rows[:self.chunk_size]
+
+	def _fragment_id(self, fragment_json):
+		fragment_id = self._dim_ids.get(fragment_json)
+		if fragment_id is None:
+			result = self.connection.execute(
+				insert(FragmentDim.__table__).values(**_fragment_values(fragment_json))
+			)
+			fragment_id = self._dim_ids[fragment_json] = result.inserted_primary_key[0]
+		return fragment_id
+
+	def _write(self, rows):
+		if rows:
+			self.connection.execute(insert(ExtractionData.__table__), rows)
+		self.connection.commit()
+
+	def close(self):
+		"""
+		Writes the remaining rows and restores the previous pragmas.
+		"""
+		self._write(self._rows)
+		self._rows = []
+		self._close_connection()
+
+	def _close_connection(self):
+		try:
+			self._set_pragmas(self._previous_pragmas)
+		finally:
+			self.connection.close()
+
+def migrate_extraction_database(db_path, chunk_size=5000):
+	"""
+	Migrates an extraction or path database written by an earlier version of decitala (whose
+	:obj:`ExtractionData` rows hold the fragment and the pitch content as JSON) to the current
+	format: the fragments are moved to the :obj:`FragmentDim` table, the pitch content is encoded
+	with :obj:`encode_pitch_content` and the indexes are created. The migration runs in a single
+	transaction; databases already in the current format are left unchanged.
+
+	:param str db_path: path to the database.
+	:param int chunk_size: number of rows converted at a time.
+	:return: the number of migrated rows.
+	:rtype: int
+	"""
+	assert os.path.isfile(db_path), DatabaseException("✗ The path provided is not a valid file.")
+	engine = get_session(db_path=db_path, base=USER_BASE).get_bind()
+	table = ExtractionData.__table__
+	with engine.connect() as connection:
+		old_columns = [x["name"] for x in inspect(connection).get_columns(table.name)]
+		if "fragment_id" in old_columns:
+			return 0
+		copied_columns = [
+			x for x in old_columns if x in table.c and x not in {"fragment", "pitch_content"}
+		]
+
+		# pysqlite doesn't begin a transaction before DDL statements.
+		connection.exec_driver_sql("BEGIN")
+		connection.exec_driver_sql(f'ALTER TABLE "{table.name}" RENAME TO "_{table.name}_old"')
+		table.create(connection)
+
+		fragment_ids = {}
+		selected = ", ".join(f'"{x}"' for x in copied_columns + ["fragment", "pitch_content"])
+		old_rows = connection.exec_driver_sql(f'SELECT {selected} FROM "_{table.name}_old"')
+		num_rows = 0
+		while True:
+			chunk = old_rows.fetchmany(chunk_size)
+			if not chunk:
+				break
+			rows = []
+			for old_row in chunk:
+				row = dict(zip(copied_columns, old_row))
+				fragment_json, pitch_content = old_row[-2:]
+				if fragment_json not in fragment_ids:
+					fragment_ids[fragment_json] = connection.execute(
+						insert(FragmentDim.__table__).values(**_fragment_values(fragment_json))
+					).inserted_primary_key[0]
+				row["fragment_id"] = fragment_ids[fragment_json]
+				row["pitch_content"] = encode_pitch_content(
+					[None if x is None else tuple(x) for x in json.loads(pitch_content)]
+				)
+				rows.append(row)
+			connection.execute(insert(table), rows)
+			num_rows += len(rows)
+
+		connection.exec_driver_sql(f'DROP TABLE "_{table.name}_old"')
+		connection.commit()
+		connection.exec_driver_sql("VACUUM")
+	return num_rows
+
+
+# Table of the worker processes of `_run_jobs`, sent once per process instead of once per job.
+_worker_table = None
+
+def _init_worker(table):
+	global _worker_table
+	_worker_table = table
+
+	# Connections inherited from the parent process (with the "fork" start method) must not be
+	# used by the worker.
+	from .. import fragment
+	dispose_engines(close=False)
+	fragment._session = None
+
+def _run_worker_job(job, filepath_part):
+	return job(_worker_table, *filepath_part)
+
+def _cancel_remaining(part_nums, futures):
+	try:
+		for part_num, future in zip(part_nums, futures):
+			yield part_num, future.result()
+	finally:
+		for future in futures:
+			future.cancel()
+
+def _run_jobs(job, data_in, table, n_jobs):
+	"""
+	Yields, for every file of ``data_in`` in order, its path and a generator of
+	``(part_num, job(table, filepath, part_num))`` over its parts. With ``n_jobs=1``, a part is only
+	searched when its generator reaches it. Otherwise, every job is submitted to a process pool at
+	once; closing the generator of a file cancels its remaining parts, but those already running
+	(or done) are computed anyway.
+	"""
+	if n_jobs == 1:
+		for filepath, part_nums in data_in.items():
+			yield filepath, ((x, job(table, filepath, x)) for x in part_nums)
+		return
+
+	with ProcessPoolExecutor(
+			max_workers=n_jobs,
+			initializer=_init_worker,
+			initargs=(table,)
+		) as executor:
+		futures = {
+			filepath: [executor.submit(_run_worker_job, job, (filepath, x)) for x in part_nums]
+			for filepath, part_nums in data_in.items()
+		}
+		for filepath, part_nums in data_in.items():
+			yield filepath, _cancel_remaining(part_nums, futures[filepath])
+
+def _build_database(db_path, data_in, table, job, n_jobs):
+	"""
+	Runs ``job`` on every part of every file of ``data_in`` (see :obj:`_run_jobs`) and writes the
+	results with a single :obj:`BulkWriter`, in the order of ``data_in``. The remaining
+	parts of a file are skipped after a part without results: with ``n_jobs=1`` they are never
+	searched; in a process pool, those not started yet are cancelled.
+	"""
+	results = _run_jobs(job, data_in, table, n_jobs)
+	try:
+		with BulkWriter(db_path) as writer:
+			for filepath, part_results in results:
+				filepath_name = filepath.split("/")[-1]
+				for part_num, extractions in part_results:
+					composition_id = writer.add_composition(
+						name=filepath_name,
+						part_num=part_num,
+						local_filepath=filepath
+					)
+					if not(extractions):
+						break  # No fragments extracted –– stopping.
+
+					writer.add_extractions(composition_id, extractions)
+				part_results.close()
+	finally:
+		results.close()
+
+def _extraction_job(table, filepath, part_num, windows):
+	return rolling_hash_search(
+		filepath=filepath,
+		part_num=part_num,
+		table=table,
+		windows=windows
+	)
 
-		extraction_objects = []
-		for extraction in all_results:
-			f = ExtractionData.from_extraction(extraction)
-			extraction_objects.append(f)
-			session.add(f)
-		data.composition_data = extraction_objects
+def _path_job(table, filepath, part_num, **path_finder_kwargs):
+	return path_finder(
+		filepath=filepath,
+		part_num=part_num,
+		table=table,
+		verbose=True,
+		**path_finder_kwargs
+	)
 
 def create_extraction_database(
 		db_path,
@@ -215,17 +572,13 @@ def create_extraction_database(
 	logger = get_logger(name=__file__, print_to_console=True)
 	logger.info(f"Preparing database at {db_path}...")
 
-	session = get_session(db_path=db_path, base=USER_BASE)
-
-	_add_extraction_results_to_session(
-		filepath,
-		part_nums,
-		table,
-		windows,
-		session
+	_build_database(
+		db_path=db_path,
+		data_in={filepath: part_nums},
+		table=table,
+		job=functools.partial(_extraction_job, windows=windows),
+		n_jobs=1
 	)
-
-	session.commit()
 	return
 
 def batch_create_extraction_database(
@@ -233,6 +586,7 @@ def batch_create_extraction_database(
 		data_in,
 		table,
 		windows,
+		n_jobs=1,
 		verbose=False
 	):
 	"""
@@ -243,6 +597,9 @@ def batch_create_extraction_database(
 	:param dict data_in: Dictionary of filepaths (key) and part nums in a list (value).
 	:param list table: A :obj:`decitala.hash_table.FragmentHashTable` object.
 	:param list windows: Possible lengths of the search frames.
+	:param int n_jobs: Number of processes searching the parts. The calling process is the only
+					one writing to the database, in the order of ``data_in``. ``None`` uses all
+					available processors. Default is ``1``.
 	:param bool verbose: Whether to log the SQL calls. False by default.
 	"""
 	assert db_path.endswith(".db"), DatabaseException("✗ The db_path must end with '.db'.")
@@ -252,67 +609,15 @@ def batch_create_extraction_database(
 	logger = get_logger(name=__file__, print_to_console=True)
 	logger.info(f"Preparing database at {db_path}...")
 
-	session = get_session(db_path=db_path, base=USER_BASE)
-
-	for filepath, part_nums in data_in.items():
-		_add_extraction_results_to_session(
-			filepath,
-			part_nums,
-			table,
-			windows,
-			session
-		)
-
-	session.commit()
+	_build_database(
+		db_path=db_path,
+		data_in=data_in,
+		table=table,
+		job=functools.partial(_extraction_job, windows=windows),
+		n_jobs=n_jobs
+	)
 	return
 
-def _add_path_results_to_session(
-		filepath,
-		part_nums,
-		table,
-		windows,
-		allow_subdivision,
-		allow_contiguous_summation,
-		algorithm,
-		cost_function_class,
-		split_dict,
-		slur_constraint,
-		enforce_earliest_start,
-		session
-	):
-	filepath_name = filepath.split("/")[-1]
-	for part_num in part_nums:
-		data = CompositionData(
-			name=filepath_name,
-			part_num=part_num,
-			local_filepath=filepath
-		)
-		session.add(data)
-
-		path = path_finder(
-			filepath=filepath,
-			part_num=part_num,
-			table=table,
-			windows=windows,
-			allow_subdivision=allow_subdivision,
-			allow_contiguous_summation=allow_contiguous_summation,
-			algorithm=algorithm,
-			cost_function_class=cost_function_class,
-			split_dict=split_dict,
-			slur_constraint=slur_constraint,
-			enforce_earliest_start=enforce_earliest_start,
-			verbose=True
-		)
-		if not(path):
-			return "No fragments extracted –– stopping."
-
-		extraction_objects = []
-		for extraction in path:
-			f = ExtractionData.from_extraction(extraction)
-			extraction_objects.append(f)
-			session.add(f)
-		data.composition_data = extraction_objects
-
 def create_path_database(
 		db_path,
 		filepath,
@@ -342,12 +647,8 @@ def create_path_database(
 	logger = get_logger(name=__file__, print_to_console=True)
 	logger.info(f"Preparing database at {db_path}...")
 
-	session = get_session(db_path=db_path, base=USER_BASE)
-
-	_add_path_results_to_session(
-		filepath=filepath,
-		part_nums=part_nums,
-		table=table,
+	job = functools.partial(
+		_path_job,
 		windows=windows,
 		allow_subdivision=allow_subdivision,
 		allow_contiguous_summation=allow_contiguous_summation,
@@ -355,11 +656,15 @@ def create_path_database(
 		cost_function_class=cost_function_class,
 		split_dict=split_dict,
 		slur_constraint=slur_constraint,
-		enforce_earliest_start=enforce_earliest_start,
-		session=session
+		enforce_earliest_start=enforce_earliest_start
+	)
+	_build_database(
+		db_path=db_path,
+		data_in={filepath: part_nums},
+		table=table,
+		job=job,
+		n_jobs=1
 	)
-
-	session.commit()
 	return
 
 def batch_create_path_database(
@@ -374,6 +679,7 @@ def batch_create_path_database(
 		split_dict=None,
 		slur_constraint=False,
 		enforce_earliest_start=False,
+		n_jobs=1,
 		verbose=False
 	):
 	"""
@@ -383,6 +689,9 @@ def batch_create_path_database(
 
 	:param str db_path: Path to the database to be created.
 	:param dict data_in: Dictionary of filepaths (key) and part nums in a list (value).
+	:param int n_jobs: Number of processes finding the paths. The calling process is the only one
+					writing to the database, in the order of ``data_in``. ``None`` uses all
+					available processors. Default is ``1``.
 	"""
 	assert db_path.endswith(".db"), DatabaseException("✗ The db_path must end with '.db'.")
 	if os.path.isfile(db_path):
@@ -391,25 +700,24 @@ def batch_create_path_database(
 	logger = get_logger(name=__file__, print_to_console=True)
 	logger.info(f"Preparing database at {db_path}...")
 
-	session = get_session(db_path=db_path, base=USER_BASE)
-
-	for filepath, part_nums in data_in.items():
-		_add_path_results_to_session(
-			filepath=filepath,
-			part_nums=part_nums,
-			table=table,
-			windows=windows,
-			allow_subdivision=allow_subdivision,
-			allow_contiguous_summation=allow_contiguous_summation,
-			algorithm=algorithm,
-			cost_function_class=cost_function_class,
-			split_dict=split_dict,
-			slur_constraint=slur_constraint,
-			enforce_earliest_start=enforce_earliest_start,
-			session=session
-		)
-
-	session.commit()
+	job = functools.partial(
+		_path_job,
+		windows=windows,
+		allow_subdivision=allow_subdivision,
+		allow_contiguous_summation=allow_contiguous_summation,
+		algorithm=algorithm,
+		cost_function_class=cost_function_class,
+		split_dict=split_dict,
+		slur_constraint=slur_constraint,
+		enforce_earliest_start=enforce_earliest_start
+	)
+	_build_database(
+		db_path=db_path,
+		data_in=data_in,
+		table=table,
+		job=job,
+		n_jobs=n_jobs
+	)
 	return
 
 ####################################################################################################
@@ -419,12 +727,29 @@ class Species:
 	It only requires a name (and also supports class methods).
 	"""
 	def __init__(self, name):
-		self.session = get_session(db_path=ODNC_Database, base=TRANSCRIPTION_BASE)
-		res = self.session.query(SubcategoryData).filter(SubcategoryData.name == name).first()
+		self.session = _odnc_session()
+		res = self.session.query(SubcategoryData).options(
+			joinedload(SubcategoryData.category),
+			selectinload(SubcategoryData.transcriptions)
+		).filter(SubcategoryData.name == name).first()
 		if not res:
 			raise DatabaseException(f"No matches found for '{name}'")
+		self._load(res)
 
+	@classmethod
+	def _from_row(cls, row):
+		"""
+		Builds a species (and its transcriptions) from a loaded ``SubcategoryData`` row, without
+		further queries if its category and transcriptions were loaded with it.
+		"""
+		species = cls.__new__(cls)
+		species.session = _odnc_session()
+		species._load(row)
+		return species
+
+	def _load(self, res):
 		self.name = res.name
+		self.category = res.category.name if res.category else None
 		self.latin = res.latin
 		self.local_name = res.local_name
 		self.reported_size = res.reported_size
@@ -433,7 +758,7 @@ class Species:
 		self.locations = json.loads(res.locations)
 		self.datetimes = json.loads(res.datetimes)
 
-		self.transcriptions = [Transcription(transcription.name) for transcription in res.transcriptions]
+		self.transcriptions = [Transcription._from_row(row) for row in res.transcriptions]
 
 	def __repr__(self):
 		return f"<database.Species {self.name}>"
@@ -476,17 +801,40 @@ class Transcription:
 	It only requires a name (and also supports class methods).
 	"""
 	def __init__(self, name):
-		self.session = get_session(db_path=ODNC_Database, base=TRANSCRIPTION_BASE)
+		self.session = _odnc_session()
 		res = self.session.query(TranscriptionData).filter(TranscriptionData.name == name).first()
 		if not res:
 			raise DatabaseException(f"No matches found for '{name}'")
+		self._load(res)
 
+	@classmethod
+	def _from_row(cls, row):
+		"""
+		Builds a transcription from a loaded ``TranscriptionData`` row.
+		"""
+		transcription = cls.__new__(cls)
+		transcription.session = _odnc_session()
+		transcription._load(row)
+		return transcription
+
+	def _load(self, res):
 		self.name = res.name
 		self.filepath = res.filepath
-		if not(res.analysis):
-			self.analysis = None
-		else:
-			self.analysis = json.loads(res.analysis, cls=FragmentDecoder)
+		# Decoded on first access (decoding builds the fragments of the analysis).
+		self._analysis_json = res.analysis or None
+		self._analysis = None
+
+	@property
+	def analysis(self):
+		if self._analysis is None and self._analysis_json is not None:
+			self._analysis = json.loads(self._analysis_json, cls=FragmentDecoder)
+			self._analysis_json = None
+		return self._analysis
+
+	@analysis.setter
+	def analysis(self, value):
+		self._analysis = value
+		self._analysis_json = None
 
 	def __repr__(self):
 		return f"<database.Transcription {self.name}>"
@@ -507,12 +855,48 @@ class Transcription:
 				converted = converter.parse(self.filepath)
 				converted.show()
 
+def _odnc_session():
+	return get_scoped_session(db_path=ODNC_Database, base=TRANSCRIPTION_BASE)
+
 def get_all_species():
-	session = get_session(db_path=ODNC_Database, base=TRANSCRIPTION_BASE)
-	res = session.query(SubcategoryData).all()
-	return [Species(x.name) for x in res]
+	"""
+	Returns every species of the ODNC database (with their transcriptions), loaded in two
+	queries.
+
+	:rtype: list
+	"""
+	res = _odnc_session().query(SubcategoryData).options(
+		joinedload(SubcategoryData.category),
+		selectinload(SubcategoryData.transcriptions)
+	).order_by(SubcategoryData.id).all()
+	return [Species._from_row(x) for x in res]
 
 def get_all_transcriptions():
-	session = get_session(db_path=ODNC_Database, base=TRANSCRIPTION_BASE)
-	res = session.query(TranscriptionData).all()
-	return natsort.natsorted([Transcription(x.name) for x in res], key=lambda x: x.name)
\ No newline at end of file
+	"""
+	Returns every transcription of the ODNC database, naturally sorted by name, loaded in one
+	query. Their analyses are decoded on first access.
+
+	:rtype: list
+	"""
+	res = _odnc_session().query(TranscriptionData).all()
+	return natsort.natsorted([Transcription._from_row(x) for x in res], key=lambda x: x.name)
+
+def get_odnc_catalog():
+	"""
+	Loads the categories, species and transcriptions of the ODNC database in one pass (three
+	queries).
+
+	:return: a dictionary from the name of every category (in the order of their group number)
+			to its species.
+	:rtype: dict
+	"""
+	configure_mappers()  # creates the ``CategoryData.subcategories`` backref.
+	res = _odnc_session().query(CategoryData).options(
+		selectinload(CategoryData.subcategories).selectinload(SubcategoryData.transcriptions)
+	).order_by(CategoryData.group_number).all()
+	return {
+		category.name: [
+			Species._from_row(x) for x in sorted(category.subcategories, key=lambda x: x.id)
+		]
+		for category in res
+	}
@@ -1,16 +1,81 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import (
+	scoped_session,
+	sessionmaker
+)
+
+# (engine, session factory, scoped session factory) of every (db_path, base) opened by
+# `get_session` or `get_scoped_session`.
+_engines = {}
+
+def _entry(db_path, base, echo):
+	key = (os.path.abspath(db_path), base)
+	entry = _engines.get(key)
+	if entry is None or not os.path.isfile(db_path):
+		if entry is not None:
+			_dispose(entry)
+		engine = create_engine(f"sqlite:////{db_path}", echo=echo)
+		base.metadata.create_all(engine)
+		with engine.connect():  # creates the file, even if ``base`` has no tables.
+			pass
+		Session = sessionmaker(bind=engine)
+		entry = _engines[key] = (engine, Session, scoped_session(Session))
+
+	entry[0].echo = echo
+	return entry
 
 def get_session(db_path, base, echo=False):
-	engine = create_engine(f"sqlite:////{db_path}", echo=echo)
-	base.metadata.create_all(engine)
+	"""
+	Returns a new session of a database. The engine (and the tables of ``base``) are only created
+	on the first call for a given ``db_path`` and ``base`` (or if the database file was removed
+	since); later calls reuse the engine, but every call returns a separate session.
+
+	:param str db_path: path to the database.
+	:param base: the declarative base of the tables of the database.
+	:param bool echo: whether to log the SQL calls.
+	:return: the session of the database.
+	:rtype: `sqlalchemy.orm.Session`
+	"""
+	return _entry(db_path, base, echo)[1]()
+
+def get_scoped_session(db_path, base, echo=False):
+	"""
+	Same as :obj:`get_session`, but every call in the same thread returns the same session (so
+	the objects it loaded, and its uncommitted changes, are shared by the callers).
+
+	:param str db_path: path to the database.
+	:param base: the declarative base of the tables of the database.
+	:param bool echo: whether to log the SQL calls.
+	:return: the session of the database for the current thread.
+	:rtype: `sqlalchemy.orm.Session`
+	"""
+	return _entry(db_path, base, echo)[2]()
+
+def _dispose(entry):
+	engine, _, scoped = entry
+	scoped.remove()
+	engine.dispose()
+
+def dispose_engines(close=True):
+	"""
+	Discards the sessions and engines opened by :obj:`get_session` and :obj:`get_scoped_session`.
 
-	Session = sessionmaker(bind=engine)
-	session = Session()
-	return session
+	:param bool close: whether to close their connections. In a forked worker process, use
+						``close=False``: the connections inherited from the parent process are
+						dropped without being used (``Engine.dispose(close=False)``, available
+						since SQLAlchemy 1.4.33; ``setup.py`` requires 2.0).
+	"""
+	while _engines:
+		entry = _engines.popitem()[1]
+		if close:
+			_dispose(entry)
+		else:
+			entry[0].dispose(close=False)
 
 
 FRAGMENT_BASE = declarative_base()
 TRANSCRIPTION_BASE = declarative_base()
-USER_BASE = declarative_base()
\ No newline at end of file
+USER_BASE = declarative_base()
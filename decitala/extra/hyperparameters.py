@@ -64,6 +64,15 @@ ALLOW_TRANSCRIPTION_SUBDIVISION = False
 ALLOW_COMPOSITION_SUBDIVISION = True
 ENFORCE_EARLIEST_START = True
 
+# Loaded once, on first use; with `use_cache=True` the extractions of each work are also only
+# computed once and every point of the grid only re-weights the cached edge features.
+_TABLES = dict()
+
+def _table(table_class):
+	if table_class not in _TABLES:
+		_TABLES[table_class] = table_class()
+	return _TABLES[table_class]
+
 def test_single_transcription(transcription, point, verbose=False, show_fragments=False):
 	"""Calculates accuracy of a point for a single transcription."""
 	cost = path_finding_utils.CostFunction3D(
@@ -74,11 +83,13 @@ def test_single_transcription(transcription, point, verbose=False, show_fragment
 	path = search.path_finder(
 		filepath=transcription.filepath,
 		part_num=0,
-		table=hash_table.GreekFootHashTable(),
+		table=_table(hash_table.GreekFootHashTable),
+		algorithm="dag",
 		allow_subdivision=ALLOW_TRANSCRIPTION_SUBDIVISION,
 		cost_function_class=cost,
 		split_dict=path_finding_utils.default_split_dict(),
 		enforce_earliest_start=ENFORCE_EARLIEST_START,
+		use_cache=True,
 		verbose=verbose
 	)
 	if show_fragments:
@@ -103,11 +114,13 @@ def test_single_work(work, point, verbose=False, show_fragments=False):
 	path = search.path_finder(
 		filepath=compositions[work]["filepath"],
 		part_num=compositions[work]["part_num"],
-		table=hash_table.DecitalaHashTable(),
+		table=_table(hash_table.DecitalaHashTable),
+		algorithm="dag",
 		allow_subdivision=ALLOW_COMPOSITION_SUBDIVISION,
 		cost_function_class=cost,
 		split_dict=path_finding_utils.default_split_dict(),
 		enforce_earliest_start=ENFORCE_EARLIEST_START,
+		use_cache=True,
 		verbose=verbose
 	)
 	if show_fragments:
@@ -12,7 +12,6 @@ import numpy as np
 import os
 
 from collections import Counter
-from functools import lru_cache
 
 from music21 import converter
 from music21 import note
@@ -39,7 +38,13 @@ fragment_db = os.path.dirname(here) + "/databases/fragment_database.db"
 # ID's of decitalas with "subtalas"
 subdecitala_array = np.array([26, 38, 55, 65, 68])
 
-session = get_session(db_path=fragment_db, base=FRAGMENT_BASE)
+# Opened on first use (see `_fragment_session`), so that importing the module stays cheap.
+_session = None
+
+# Canonical Decitala, GreekFoot and ProsodicMeter objects, keyed by (class, name[, origin]) as
+# stored in the fragment database, and the registry key of every name given to a constructor.
+_REGISTRY = dict()
+_ALIASES = dict()
 
 ####################################################################################################
 class FragmentException(Exception):
@@ -138,6 +143,44 @@ def _process_matches(name, matches, data_path):
 
 	return full_path, name, filename
 
+def _fragment_session():
+	"""
+	The session of the fragment database, created on the first query.
+	"""
+	global _session
+	if _session is None:
+		_session = get_session(db_path=fragment_db, base=FRAGMENT_BASE)
+	return _session
+
+def __getattr__(name):
+	# ``fragment.session`` is still available, but only opened when accessed.
+	if name == "session":
+		return _fragment_session()
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _ql_array_from_row(row):
+	"""
+	The ``ql_array`` column of a fragment row (stored as JSON), or ``None`` if it is empty; the
+	fragment then falls back to parsing its file.
+	"""
+	if not(row.ql_array):
+		return None
+	return np.array(json.loads(row.ql_array))
+
+def _registered(alias, key, row):
+	"""
+	Returns the canonical instance for ``key``, creating an uninitialized one holding ``row`` (the
+	database row it will be built from in ``__init__``) if there is none yet.
+	"""
+	instance = _REGISTRY.get(key)
+	if instance is None:
+		instance = object.__new__(key[0])
+		instance._row = row
+		instance._initialized = False
+		_REGISTRY[key] = instance
+	_ALIASES[alias] = key
+	return instance
+
 def _decitala_full_id_from_filename(filename):
 	split = filename.split("_")
 	if len(split) == 2:
@@ -209,6 +252,17 @@ class GeneralFragment:
 			raise FragmentException(f"{data} is an invalid input to GeneralFragment.")
 
 		self.name = name
+		# Identity of the fragment, computed once since fragments are hashed in every cache lookup.
+		if isinstance(self.data, str):
+			self._key = (self.name, self.data)
+		else:
+			self._key = (self.name, tuple(self.data.tolist()))
+		self._hash = hash(self._key)
+
+		# Per-instance caches (freed with the fragment), keyed by ``retrograde``.
+		self._ql_arrays = dict()
+		self._ql_tuples = dict()
+		self._num_onsets = None
 
 	def __repr__(self):
 		if self.name is None:
@@ -217,42 +271,46 @@ class GeneralFragment:
 			return f"<fragment.GeneralFragment {self.name}: {self.ql_array()}>"
 
 	def __hash__(self):
-		lil_repr = "-".join([str(self.name), str(self.data)])
-		return hash(lil_repr)
+		return self._hash
 
 	def __eq__(self, other):
-		return self.__hash__() == other.__hash__()
+		if not isinstance(other, GeneralFragment):
+			return NotImplemented
+		return self is other or self._key == other._key
 
-	@lru_cache(maxsize=None)
 	def ql_array(self, retrograde=False):
 		"""
 		:param bool retrograde: Whether to return the fragment in its original form or
 								in retrograde.
-		:return: The quarter length array of the fragment.
+		:return: The quarter length array of the fragment. Fragments of the included datasets use
+				the array stored in the fragment database; other files are parsed.
 		:rtype: numpy.array
 		"""
+		if retrograde in self._ql_arrays:
+			return self._ql_arrays[retrograde]
+
 		if isinstance(self.data, str):
-			converted = converter.parse(self.data)
-			data = np.array([this_note.quarterLength for this_note in converted.flat.getElementsByClass(note.Note)]) # noqa
-			if not(retrograde):
-				return data
-			else:
-				return np.flip(data)
+			data = getattr(self, "_stored_ql_array", None)
+			if data is None:
+				converted = converter.parse(self.data)
+				data = np.array([this_note.quarterLength for this_note in converted.flat.getElementsByClass(note.Note)]) # noqa
 		else:
+			data = self.data
 
-			if not(retrograde):
-				return self.data
-			else:
-				return np.flip(self.data)
+		if retrograde:
+			data = np.flip(data)
+		self._ql_arrays[retrograde] = data
+		return data
 
-	@lru_cache(maxsize=None)
 	def ql_tuple(self, retrograde=False):
 		"""
 		:param bool retrograde: Whether to return the fragment in retrograde.
 		:return: The quarter length array of the fragment as a tuple.
 		:rtype: tuple
 		"""
-		return tuple(self.ql_array(retrograde=retrograde))
+		if retrograde not in self._ql_tuples:
+			self._ql_tuples[retrograde] = tuple(self.ql_array(retrograde=retrograde))
+		return self._ql_tuples[retrograde]
 
 	@property
 	def carnatic_string(self):
@@ -265,13 +323,15 @@ class GeneralFragment:
 		return utils.ql_array_to_greek_diacritics(self.ql_array())
 
 	@property
-	@lru_cache(maxsize=None)  # Caching *extremely* useful for cost function in path-finding.
 	def num_onsets(self):
 		"""
 		:return: The number of onsets in the fragment.
 		:rtype: int
 		"""
-		return len(self.ql_array())
+		# Caching *extremely* useful for cost function in path-finding.
+		if self._num_onsets is None:
+			self._num_onsets = len(self.ql_array())
+		return self._num_onsets
 
 	@property
 	def num_anga_classes(self):
@@ -512,21 +572,43 @@ class Decitala(GeneralFragment):
 	"""
 	frag_type = "decitala"
 
-	def __init__(self, name, **kwargs):
+	def __new__(cls, name, **kwargs):
 		if name.endswith(".xml"):
 			name = name[:-4]
 
-		matches = session.query(DecitalaData).filter(DecitalaData.name.contains(name)).all()
-		matches = [x.name + ".xml" for x in matches]
+		alias = (cls, name)
+		if alias in _ALIASES:
+			return _REGISTRY[_ALIASES[alias]]
+
+		rows = _fragment_session().query(DecitalaData).filter(DecitalaData.name.contains(name)).all()
+		matches = [x.name + ".xml" for x in rows]
 
 		if not matches:
 			raise DecitalaException(f"No matches were found for name {name}.")
 
-		full_path, name, filename = _process_matches(name, matches, decitala_path)
-		self.full_path = full_path
-		self.filename = filename
+		_, full_name, _ = _process_matches(name, matches, decitala_path)
+		return _registered(alias, (cls, full_name), next(x for x in rows if x.name == full_name))
+
+	def __init__(self, name, **kwargs):
+		if self._initialized:
+			return
 
-		super().__init__(data=full_path, name=name)
+		self.full_path = decitala_path + "/" + self._row.name + ".xml"
+		self.filename = self._row.name + ".xml"
+
+		super().__init__(data=self.full_path, name=self._row.name)
+		self._stored_ql_array = _ql_array_from_row(self._row)
+		del self._row
+		self._initialized = True
+
+	def __getnewargs__(self):
+		return (self.name,)
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
 
 	def __repr__(self):
 		return f"<fragment.Decitala {self.name}>"
@@ -555,7 +637,7 @@ class Decitala(GeneralFragment):
 		>>> Decitala.get_by_id("89")
 		<fragment.Decitala 89_Lalitapriya>
 		"""
-		res = session.query(DecitalaData).filter(DecitalaData.full_id == input_id).all()
+		res = _fragment_session().query(DecitalaData).filter(DecitalaData.full_id == input_id).all()
 		if len(res) > 1:
 			raise DecitalaException("Something is wrong. File an issue at https://github.com/Luke-Poeppel/decitala/issues.") # noqa
 		return Decitala(res[0].name)
@@ -601,19 +683,39 @@ class GreekFoot(GeneralFragment):
 	"""
 	frag_type = "greek_foot"
 
-	def __init__(self, name, **kwargs):
+	def __new__(cls, name, **kwargs):
 		if name.endswith(".xml"):
 			name = name[:-4]
-		matches = session.query(GreekFootData).filter(GreekFootData.name == name).all()
-		matches = [x.name + ".xml" for x in matches]
 
-		if not matches:
+		alias = (cls, name)
+		if alias in _ALIASES:
+			return _REGISTRY[_ALIASES[alias]]
+
+		row = _fragment_session().query(GreekFootData).filter(GreekFootData.name == name).first()
+		if not row:
 			raise GreekFootException(f"No matches were found for name {name}.")
 
-		full_path, name, filename = _process_matches(name, matches, greek_path)
-		self.full_path = full_path
+		return _registered(alias, (cls, row.name), row)
+
+	def __init__(self, name, **kwargs):
+		if self._initialized:
+			return
+
+		self.full_path = greek_path + "/" + self._row.name + ".xml"
+
+		super().__init__(data=self.full_path, name=self._row.name)
+		self._stored_ql_array = _ql_array_from_row(self._row)
+		del self._row
+		self._initialized = True
+
+	def __getnewargs__(self):
+		return (self.name,)
+
+	def __copy__(self):
+		return self
 
-		super().__init__(data=full_path, name=name)
+	def __deepcopy__(self, memo):
+		return self
 
 	def __repr__(self):
 		return f"<fragment.GreekFoot {self.name}>"
@@ -654,17 +756,28 @@ class ProsodicMeter(GeneralFragment):
 	"""
 	frag_type = "prosodic_meter"
 
-	def __init__(self, name, origin=None, **kwargs):
+	def __new__(cls, name, origin=None, **kwargs):
+		alias = (cls, name, origin)
+		if alias in _ALIASES:
+			return _REGISTRY[_ALIASES[alias]]
+
 		if not origin:
-			match = session.query(ProsodicMeterData).filter(ProsodicMeterData.name == name).all()
+			match = _fragment_session().query(ProsodicMeterData).filter(ProsodicMeterData.name == name).first() # noqa
 		else:
-			match = session.query(ProsodicMeterData).filter(
+			match = _fragment_session().query(ProsodicMeterData).filter(
 				ProsodicMeterData.name == name,
 				ProsodicMeterData.origin == origin,
 				).first()
 		if not match:
 			raise ProsodicException(f"No matches were found for name {name}.")
 
+		return _registered(alias, (cls, match.name, match.origin), match)
+
+	def __init__(self, name, origin=None, **kwargs):
+		if self._initialized:
+			return
+
+		match = self._row
 		super().__init__(data=json.loads(match.ql_array), name=match.name)
 
 		component_strings = match.components[1:-1].split(", ")
@@ -679,6 +792,17 @@ class ProsodicMeter(GeneralFragment):
 
 		self.components = component_fragments
 		self.origin = match.origin
+		del self._row
+		self._initialized = True
+
+	def __getnewargs__(self):
+		return (self.name, self.origin)
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
 
 	def __repr__(self):
 		return f"<fragment.ProsodicMeter {self.name} {self.origin.capitalize()}>"
@@ -703,23 +827,68 @@ class ProsodicFragment(GeneralFragment):
 
 ####################################################################################################
 # Some simple queries for quick access.
+def _from_rows(rows, key):
+	"""
+	Registers the rows of a whole table (see :obj:`preload`) and returns their canonical instances.
+	"""
+	fragments = []
+	for row in rows:
+		this_key = key(row)
+		_registered(this_key, this_key, row)
+		fragments.append(this_key[0](*this_key[1:]))
+	return fragments
+
 def get_all_greek_feet():
 	"""
 	Function for returning all Greek Feet in a list.
 	"""
-	all_greek_feet = session.query(GreekFootData)
-	return [GreekFoot(x.name) for x in all_greek_feet]
+	all_greek_feet = _fragment_session().query(GreekFootData).all()
+	return _from_rows(all_greek_feet, lambda x: (GreekFoot, x.name))
 
 def get_all_decitalas():
 	"""
 	Function for returning all Decitalas in a list.
 	"""
-	all_decitalas = session.query(DecitalaData)
-	return [Decitala(x.name) for x in all_decitalas]
+	all_decitalas = _fragment_session().query(DecitalaData).all()
+	decitalas = _from_rows(all_decitalas, lambda x: (Decitala, x.name))
+
+	# ``Decitala("Ragavardhana")`` resolves to the row whose name, without its digits, is the given
+	# name (see `_process_matches`); register these short names when they are unambiguous.
+	def _without_digits(name):
+		return "".join([x for x in name if not x.isdigit()]).lstrip("_")
+
+	counts = Counter(_without_digits(x.name) for x in all_decitalas)
+	for row in all_decitalas:
+		short_name = row.name.split("_", 1)[-1]
+		if counts[_without_digits(short_name)] == 1:
+			_ALIASES[(Decitala, short_name)] = (Decitala, row.name)
+	return decitalas
 
 def get_all_prosodic_meters():
-	all_prosodic_meters = session.query(ProsodicMeterData)
-	return [ProsodicMeter(x.name, x.origin) for x in all_prosodic_meters]
+	all_prosodic_meters = _fragment_session().query(ProsodicMeterData).all()
+	return _from_rows(all_prosodic_meters, lambda x: (ProsodicMeter, x.name, x.origin))
+
+def preload(frag_types=("greek_foot", "decitala", "prosodic_meter")):
+	"""
+	:obj:`Decitala`, :obj:`GreekFoot` and :obj:`ProsodicMeter` objects are interned: constructing
+	one with a name (or, for a prosodic meter, a name and origin) that was already used returns the
+	same instance, without querying the database again. This function loads every fragment of the
+	given datasets into that registry with one query per dataset. Decitalas are also registered
+	under their name without the number (e.g. ``"Ragavardhana"`` for ``"93_Ragavardhana"``).
+
+	:param tuple frag_types: any of ``"greek_foot"``, ``"decitala"`` and ``"prosodic_meter"``.
+
+	>>> preload(["greek_foot"])
+	>>> GreekFoot("Bacchius") is GreekFoot("Bacchius.xml")
+	True
+	"""
+	loaders = {
+		"greek_foot": get_all_greek_feet,
+		"decitala": get_all_decitalas,
+		"prosodic_meter": get_all_prosodic_meters,
+	}
+	for frag_type in frag_types:
+		loaders[frag_type]()
 
 def get_all_prosodic_fragments():
 	"""
@@ -6,6 +6,7 @@
 #
 # Location: NYC, 2021.
 ####################################################################################################
+from . import instrumentation
 from .fragment import (
 	get_all_decitalas,
 	get_all_greek_feet,
@@ -240,6 +241,7 @@ class FragmentHashTable:
 		self.datasets = datasets
 		self.custom_fragments = custom_fragments
 		self.loaded = False
+		self.load_parameters = None  # The parameters of the last `load`.
 		self.data = dict()  # All the data will be stored here.
 
 	def __repr__(self):
@@ -275,27 +277,40 @@ class FragmentHashTable:
 
 		# Process datasets
 		for this_dataset in self.datasets:
-			if this_dataset == "greek_foot":
-				fragments = get_all_greek_feet()
-			elif this_dataset == "decitala":
-				fragments = get_all_decitalas()
-			elif this_dataset == "prosodic_meter":
-				fragments = get_all_prosodic_meters()
+			with instrumentation.stage("catalog"):
+				if this_dataset == "greek_foot":
+					fragments = get_all_greek_feet()
+				elif this_dataset == "decitala":
+					fragments = get_all_decitalas()
+				elif this_dataset == "prosodic_meter":
+					fragments = get_all_prosodic_meters()
 
-			for this_fragment in fragments:
-				generate_all_modifications(
-					dict_in=self.data,
-					fragment=this_fragment,
-					factors=factors,
-					differences=differences,
-					try_retrograde=try_retrograde,
-					allow_stretch_augmentation=allow_stretch_augmentation,
-					allow_mixed_augmentation=allow_mixed_augmentation,
-					force_override=force_override,
-					exact=exact
-				)
+			with instrumentation.stage("modifications"):
+				for this_fragment in fragments:
+					generate_all_modifications(
+						dict_in=self.data,
+						fragment=this_fragment,
+						factors=factors,
+						differences=differences,
+						try_retrograde=try_retrograde,
+						allow_stretch_augmentation=allow_stretch_augmentation,
+						allow_mixed_augmentation=allow_mixed_augmentation,
+						force_override=force_override,
+						exact=exact
+					)
 
+		instrumentation.count("table_entries", len(self.data))
 		self.loaded = True
+		self.load_parameters = dict(
+			factors=tuple(factors),
+			differences=tuple(differences),
+			try_retrograde=try_retrograde,
+			allow_stretch_augmentation=allow_stretch_augmentation,
+			allow_mixed_augmentation=allow_mixed_augmentation,
+			modification_hierarchy=tuple(sorted(modification_hierarchy.items())),
+			force_override=force_override,
+			exact=exact
+		)
 
 class DecitalaHashTable(FragmentHashTable):
 	"""
@@ -8,7 +8,7 @@
 ####################################################################################################
 import numpy as np
 
-from scipy import stats, linalg
+from scipy import linalg
 
 from music21 import converter
 from music21.pitch import Pitch
@@ -295,6 +295,7 @@ def KS(
 						Default is 'pearson'.
 	"""
 	assert method.lower() in {"spearman", "pearson"}, HMUtilsException("Only supported options are 'pearson' or 'spearman'.") # noqa
+	from scipy import stats  # scipy.stats takes about a second to import.
 
 	if method.lower() == "pearson":
 		score = stats.pearsonr(pc_vector, coefficients)
@@ -323,6 +324,8 @@ def KS_diatonic(
 	"""
 	assert method.lower() in {"spearman", "pearson"}, HMUtilsException("Only supported options are 'pearson' or 'spearman'.") # noqa
 
+	from scipy import stats
+
 	coefficients = linalg.circulant(coefficients).T
 
 	if method.lower() == "pearson":
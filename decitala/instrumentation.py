@@ -0,0 +1,184 @@
+####################################################################################################
+# File:     instrumentation.py
+# Purpose:  Opt-in stage timers and counters for search and path finding.
+#
+# Author:   Luke Poeppel
+#
+# Location: NYC, 2021
+####################################################################################################
+"""
+Opt-in instrumentation of the search and path-finding code. Inside an :obj:`instrument` block,
+the stages of the hot paths (parsing, windowing, table lookups, graph building, path finding,
+...) are timed and their counters (frames scanned, table probes, hits per ``mod_hierarchy_val``,
+edges built, heap pushes, ...) are summed into an :obj:`InstrumentationReport`. Outside of it,
+every hook is a global lookup and an immediate return.
+
+Stages may be nested; the time of a stage excludes the time of the stages nested in it, so the
+stage times of a report add up to the instrumented time.
+
+>>> from decitala.path_finding.path_finding_utils import build_graph
+>>> from decitala.benchmark import synthetic_extractions
+>>> with instrument() as report:
+... 	graph = build_graph(synthetic_extractions(50))
+>>> sorted(report.seconds)
+['graph']
+>>> report.counts["edges_built"] == sum(len(edges) for edges in graph.values())
+True
+"""
+import contextlib
+import time
+
+from collections import defaultdict
+from tqdm import tqdm
+
+_report = None
+_callback = None
+
+class InstrumentationReport:
+	"""
+	Stage times (in seconds, exclusive of nested stages) and counters collected by
+	:obj:`instrument`.
+	"""
+	def __init__(self):
+		self.seconds = defaultdict(float)
+		self.counts = defaultdict(int)
+		self._stack = []  # [stage name, start, time of nested stages] of the open stages.
+
+	def __repr__(self):
+		return f"<decitala.instrumentation.InstrumentationReport {len(self.seconds)} stages, {len(self.counts)} counters>" # noqa
+
+	@property
+	def total_seconds(self):
+		return sum(self.seconds.values())
+
+	def to_dict(self):
+		"""
+		:return: the stage times and counters, e.g. for JSON serialization.
+		:rtype: dict
+		"""
+		return {"seconds": dict(self.seconds), "counts": dict(self.counts)}
+
+@contextlib.contextmanager
+def instrument(callback=None):
+	"""
+	Enables the instrumentation within the block.
+
+	:param callback: an optional function called with ``(kind, name, value)`` on every event:
+					``("stage", name, seconds)`` when a stage ends, ``("count", name, n)`` when a
+					counter is increased and ``("progress", name, i)`` on every step of a
+					:obj:`progress` iterable.
+	:return: the report filled while the block runs.
+	:rtype: :obj:`InstrumentationReport`
+	"""
+	global _report, _callback
+	previous = (_report, _callback)
+	_report, _callback = InstrumentationReport(), callback
+	try:
+		yield _report
+	finally:
+		_report, _callback = previous
+
+def enabled():
+	"""
+	:return: whether an :obj:`instrument` block is active. Useful to skip work that only feeds
+			the counters.
+	:rtype: bool
+	"""
+	return _report is not None
+
+class stage:
+	"""
+	Context manager timing a stage of the active report (if any).
+
+	:param str name: name of the stage.
+	"""
+	__slots__ = ("name", "report")
+
+	def __init__(self, name):
+		self.name = name
+		self.report = None
+
+	def __enter__(self):
+		if _report is not None:
+			self.report = _report
+			_report._stack.append([self.name, time.perf_counter(), 0.0])
+		return self
+
+	def __exit__(self, *exc_info):
+		report = self.report
+		if report is None:
+			return False
+
+		name, start, nested = report._stack.pop()
+		elapsed = time.perf_counter() - start
+		report.seconds[name] += elapsed - nested
+		if report._stack:
+			report._stack[-1][2] += elapsed
+		if _callback is not None:
+			_callback("stage", name, elapsed - nested)
+		return False
+
+
+# Shared by every `null_stage` call.
+_NULL_STAGE = contextlib.nullcontext()
+
+def null_stage(name):
+	"""
+	Drop-in replacement for :obj:`stage` that does nothing and creates no object. In hot loops,
+	choose between the two once with :obj:`enabled`.
+
+	:param str name: name of the stage (ignored).
+	"""
+	return _NULL_STAGE
+
+def timed(iterable, name):
+	"""
+	Iterates over ``iterable``, timing the production of every item as the stage ``name``. Unlike
+	wrapping the loop in a :obj:`stage`, the work done with the items is not included.
+
+	:param iterable: the iterable.
+	:param str name: name of the stage.
+	"""
+	iterator = iter(iterable)
+	end = object()
+	while True:
+		with stage(name):
+			item = next(iterator, end)
+		if item is end:
+			return
+		yield item
+
+def count(name, n=1):
+	"""
+	Increases a counter of the active report (if any). In hot loops, sum the count locally and
+	call this once.
+
+	:param str name: name of the counter.
+	:param int n: increment.
+	"""
+	if _report is None:
+		return
+	_report.counts[name] += n
+	if _callback is not None:
+		_callback("count", name, n)
+
+def progress(iterable, name, total=None, verbose=False):
+	"""
+	Iterates over ``iterable``, showing a progress bar if ``verbose`` and reporting every step to
+	the callback of the active :obj:`instrument` block.
+
+	:param iterable: the iterable.
+	:param str name: name of the loop.
+	:param int total: length of the iterable, if it has no ``len``.
+	:param bool verbose: whether to show a progress bar.
+	"""
+	if verbose:
+		iterable = tqdm(iterable, total=total, desc=name)
+	if _callback is None:
+		yield from iterable
+		return
+
+	for i, item in enumerate(iterable):
+		yield item
+		if _callback is not None:
+			_callback("progress", name, i + 1)
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+# File:     beam.py
+# Purpose:  Approximate path finding with beam search.
+#
+# Author:   Luke Poeppel
+#
+# Location: NYC, 2021
+####################################################################################################
+"""
+Beam search over the extractions in onset order. Unlike the exact algorithms, it never builds the
+graph: every extraction is only compared with a bounded number of partial paths, so time is linear
+in the number of extractions (for a fixed beam width) and memory is bounded by the beam width and
+the number of extractions overlapping any onset.
+"""
+import heapq
+import itertools
+import numpy as np
+
+from .. import instrumentation
+from . import path_finding_utils
+from .dag import ExtractionDAG
+
+DEFAULT_BEAM_WIDTH = 32
+
+def _cost_block(cost_function_class, data, arrays, sources, targets):
+	"""Costs from each of ``data[sources]`` to each of ``data[targets]``, as a numpy array."""
+	if arrays is not None:
+		return cost_function_class.cost_matrix(**arrays, sources=sources, targets=targets)
+	return np.array([
+		[cost_function_class.cost(vertex_a=data[i], vertex_b=data[j]) for j in targets]
+		for i in sources
+	], dtype=float).reshape(len(sources), len(targets))
+
+def beam_search(
+		data,
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		beam_width=DEFAULT_BEAM_WIDTH,
+		enforce_earliest_start=False
+	):
+	"""
+	Approximates the lowest-cost path from a source to a sink of the data (see
+	:obj:`~decitala.path_finding.path_finding_utils.sources_and_sinks`). The extractions are swept
+	in onset order; at every distinct onset (frontier), each extraction starting there is
+	appended to its best partial path among the ``beam_width`` retained partial paths ending
+	closest to (and before) the frontier, and only the ``beam_width`` cheapest of the new partial
+	paths are kept. With ``beam_width >= len(data)`` the result is exact.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param int beam_width: number of partial paths retained at each frontier.
+	:param bool enforce_earliest_start: whether to require that all sources begin at the earliest
+										detected onset.
+	:return: the path (a list of :obj:`decitala.search.Extraction` objects) and its cost.
+	:rtype: tuple
+
+	>>> from decitala.search import Extraction
+	>>> from decitala.fragment import GreekFoot
+	>>> data = [
+	... 	Extraction(fragment=GreekFoot("Spondee"), onset_range=(0.0, 0.5), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=1), # noqa
+	... 	Extraction(fragment=GreekFoot("Trochee"), onset_range=(0.25, 0.625), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=2), # noqa
+	... 	Extraction(fragment=GreekFoot("Dactyl"), onset_range=(0.5, 1.0), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=3), # noqa
+	... ]
+	>>> path, cost = beam_search(data, beam_width=1)
+	>>> [x.fragment for x in path]
+	[<fragment.GreekFoot Spondee>, <fragment.GreekFoot Dactyl>]
+	"""
+	sources, targets = path_finding_utils.sources_and_sinks(
+		data=data,
+		enforce_earliest_start=enforce_earliest_start
+	)
+	index_of_id = {x.id_: i for i, x in enumerate(data)}
+	source_indices = {index_of_id[x.id_] for x in sources}
+	target_indices = {index_of_id[x.id_] for x in targets}
+
+	arrays = None
+	if path_finding_utils.supports_cost_matrix(cost_function_class):
+		arrays = path_finding_utils.extraction_arrays(data)
+	starts = [x.onset_range[0] for x in data]
+	stops = [x.onset_range[1] for x in data]
+	order = sorted(range(len(data)), key=lambda i: starts[i])
+
+	# A partial path is (stop, cost, has_edge, node), where node = (index, parent node).
+	counter = itertools.count()
+	pending = []  # heap of partial paths that are not yet finished at the frontier.
+	ready = []
+	best = None
+
+	for frontier, batch in itertools.groupby(order, key=lambda i: starts[i]):
+		batch = list(batch)
+		while pending and pending[0][0] <= frontier:
+			stop, _, cost, has_edge, node = heapq.heappop(pending)
+			ready.append((stop, cost, has_edge, node))
+		if len(ready) > beam_width:
+			ready = heapq.nlargest(beam_width, ready, key=lambda p: (p[0], -p[1]))
+
+		extended = []
+		if ready:
+			block = _cost_block(
+				cost_function_class,
+				data,
+				arrays,
+				[p[3][0] for p in ready],
+				batch
+			)
+			block = np.where(block >= 0, block, np.inf)
+			totals = np.array([p[1] for p in ready])[:, None] + block
+			best_rows = np.argmin(totals, axis=0)
+
+		for col, v in enumerate(batch):
+			if v in source_indices:
+				extended.append((0.0, False, (v, None)))
+			elif ready and totals[best_rows[col], col] < np.inf:
+				parent = ready[best_rows[col]]
+				extended.append((totals[best_rows[col], col], True, (v, parent[3])))
+
+		for cost, has_edge, node in heapq.nsmallest(beam_width, extended, key=lambda p: p[0]):
+			v = node[0]
+			if has_edge and v in target_indices and (best is None or cost < best[0]):
+				best = (cost, node)
+			heapq.heappush(pending, (stops[v], next(counter), cost, has_edge, node))
+
+	instrumentation.count("heap_pushes", next(counter))
+	if best is None:
+		return [max(sources, key=lambda x: x.fragment.num_onsets)], 0.0
+
+	cost, node = best
+	path = []
+	while node is not None:
+		path.insert(0, data[node[0]])
+		node = node[1]
+
+	return path, float(cost)
+
+def optimality_gap(
+		data,
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		beam_width=DEFAULT_BEAM_WIDTH,
+		enforce_earliest_start=False
+	):
+	"""
+	Compares :obj:`~decitala.path_finding.beam.beam_search` with the exact lowest-cost path over
+	the :obj:`~decitala.path_finding.dag.ExtractionDAG` of the data.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param int beam_width: number of partial paths retained at each frontier.
+	:param bool enforce_earliest_start: whether to require that all sources begin at the earliest
+										detected onset.
+	:return: the beam search cost, the exact cost and the relative gap between them.
+	:rtype: tuple
+	"""
+	_, beam_cost = beam_search(
+		data=data,
+		cost_function_class=cost_function_class,
+		beam_width=beam_width,
+		enforce_earliest_start=enforce_earliest_start
+	)
+
+	sources, targets = path_finding_utils.sources_and_sinks(
+		data=data,
+		enforce_earliest_start=enforce_earliest_start
+	)
+	dag = ExtractionDAG(data)
+	_, edge_dist, _ = dag.shortest_paths(
+		dag.edge_costs(cost_function_class),
+		roots=[dag.index_of_id[x.id_] for x in sources]
+	)
+	exact_cost = min(edge_dist[dag.index_of_id[x.id_]] for x in targets)
+	if exact_cost == np.inf:
+		exact_cost = 0.0
+
+	if exact_cost == 0:
+		gap = 0.0 if beam_cost == 0 else np.inf
+	else:
+		gap = (beam_cost - exact_cost) / exact_cost
+
+	return beam_cost, float(exact_cost), float(gap)
@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+# File:     dag.py
+# Purpose:  Shortest paths on the directed acyclic graph formed by the extractions.
+#
+# Author:   Luke Poeppel
+#
+# Location: NYC, 2021
+####################################################################################################
+"""
+Extractions ordered by onset start form a directed acyclic graph: an edge only goes from an
+extraction to one starting at or after its end. Shortest paths can therefore be computed with a
+single dynamic programming pass in topological order, which is linear in the number of edges.
+"""
+import heapq
+import itertools
+import numpy as np
+
+from .. import instrumentation
+from . import dijkstra
+from . import path_finding_utils
+
+class ExtractionDAG:
+	"""
+	Stores the edges between a list of extractions, grouped by target vertex. For cost functions
+	that are a weighted sum of per-edge features (see
+	:obj:`~decitala.path_finding.path_finding_utils.CostFunction3D.edge_features`), the features
+	are computed once and cached, so re-weighting the cost function only requires a weighted sum
+	over the cached features.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+
+	>>> from decitala.search import Extraction
+	>>> from decitala.fragment import GreekFoot
+	>>> data = [
+	... 	Extraction(fragment=GreekFoot("Spondee"), onset_range=(0.0, 0.5), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=1), # noqa
+	... 	Extraction(fragment=GreekFoot("Trochee"), onset_range=(0.25, 0.625), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=2), # noqa
+	... 	Extraction(fragment=GreekFoot("Dactyl"), onset_range=(0.5, 1.0), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=3), # noqa
+	... ]
+	>>> dag = ExtractionDAG(data)
+	>>> dag
+	<path_finding.ExtractionDAG 3 vertices, 1 edges>
+	>>> dag.edge_features(path_finding_utils.CostFunction3D())
+	array([[0.        , 0.2       , 3.33333333]])
+	"""
+	def __init__(self, data):
+		self.data = data
+		self.index_of_id = {x.id_: i for i, x in enumerate(data)}
+
+		with instrumentation.stage("graph"):
+			order, lo, hi = path_finding_utils.successor_windows(data)
+			counts = hi - lo
+			offsets = np.cumsum(counts) - counts
+			sources = np.repeat(np.arange(len(data)), counts)
+			positions = np.arange(counts.sum()) - np.repeat(offsets, counts) + np.repeat(lo, counts)
+			targets = order[positions]
+
+			keep = sources != targets
+			sources = sources[keep]
+			targets = targets[keep]
+
+			rank = np.empty(len(data), dtype=int)
+			rank[order] = np.arange(len(data))
+			by_target = np.lexsort((rank[sources], targets))
+			instrumentation.count("edges_built", len(sources))
+
+		self.order = order  # topological order.
+		self.edge_sources = sources[by_target]
+		self.edge_targets = targets[by_target]
+		self.indptr = np.concatenate([[0], np.cumsum(np.bincount(targets, minlength=len(data)))])
+
+		self._features = dict()
+
+	def __repr__(self):
+		return f"<path_finding.ExtractionDAG {len(self.data)} vertices, {len(self.edge_sources)} edges>" # noqa
+
+	def edge_features(self, cost_function_class):
+		"""
+		:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+			function implementing ``edge_features``.
+		:return: the (cached) features of every edge, one row per edge.
+		:rtype: numpy.array
+		"""
+		key = type(cost_function_class)
+		if key not in self._features:
+			with instrumentation.stage("graph"):
+				self._features[key] = cost_function_class.edge_features(
+					**path_finding_utils.extraction_arrays(self.data),
+					sources=self.edge_sources,
+					targets=self.edge_targets
+				)
+		return self._features[key]
+
+	def edge_costs(self, cost_function_class):
+		"""
+		:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+			function that will be used in calculating the weights between vertices.
+		:return: the cost of every edge, in the order of ``edge_sources`` and ``edge_targets``.
+		:rtype: numpy.array
+		"""
+		if path_finding_utils.supports_edge_features(cost_function_class):
+			features = self.edge_features(cost_function_class)
+			return path_finding_utils._weighted_sum(features, cost_function_class.weights)
+
+		with instrumentation.stage("graph"):
+			return np.array([
+				cost_function_class.cost(vertex_a=self.data[i], vertex_b=self.data[j])
+				for i, j in zip(self.edge_sources.tolist(), self.edge_targets.tolist())
+			], dtype=float)
+
+	def shortest_paths(self, costs, roots):
+		"""
+		Multi-source shortest paths from ``roots`` via dynamic programming in topological order.
+		Edges with negative cost are ignored (as in
+		:obj:`~decitala.path_finding.path_finding_utils.build_graph`).
+
+		:param numpy.array costs: cost of every edge (see :obj:`ExtractionDAG.edge_costs`).
+		:param list roots: indices (in ``data``) of the vertices a path may start from.
+		:return: three arrays: the distance of each vertex from the closest root, the distance
+				restricted to paths with at least one edge, and the predecessor of each vertex on
+				the latter (-1 if none).
+		:rtype: tuple
+		"""
+		n = len(self.data)
+		costs = np.where(costs >= 0, costs, np.inf)
+		dist = np.full(n, np.inf)
+		edge_dist = np.full(n, np.inf)
+		pred = np.full(n, -1)
+		is_root = np.zeros(n, dtype=bool)
+		is_root[list(roots)] = True
+
+		for v in self.order.tolist():
+			lo, hi = self.indptr[v], self.indptr[v + 1]
+			if hi > lo:
+				candidates = dist[self.edge_sources[lo:hi]] + costs[lo:hi]
+				k = np.argmin(candidates)
+				if candidates[k] < np.inf:
+					edge_dist[v] = candidates[k]
+					pred[v] = self.edge_sources[lo + k]
+			dist[v] = 0 if is_root[v] else edge_dist[v]
+
+		return dist, edge_dist, pred
+
+	def k_shortest_paths(self, costs, roots, targets, k):
+		"""
+		The ``k`` lowest-cost paths (with at least one edge) from any of ``roots`` to any of
+		``targets``. Every vertex keeps its ``k`` best incoming paths, computed by merging the
+		sorted lists of its predecessors in topological order, so the paths are found in a single
+		pass over the DAG. Edges with negative cost are ignored.
+
+		:param numpy.array costs: cost of every edge (see :obj:`ExtractionDAG.edge_costs`).
+		:param list roots: indices (in ``data``) of the vertices a path may start from.
+		:param list targets: indices (in ``data``) of the vertices a path may end at.
+		:param int k: number of paths.
+		:return: a list of at most ``k`` pairs of path cost and path (list of indices in ``data``),
+				sorted by cost.
+		:rtype: list
+		"""
+		roots = set(roots)
+		costs = costs.tolist()
+		edge_sources = self.edge_sources.tolist()
+		# paths[v] holds (cost, u, i) for the best paths with at least one edge ending at v, where
+		# the path continues from the i-th entry of _extensions(u).
+		paths = [[] for _ in self.data]
+
+		def _extensions(u):
+			if u in roots:
+				return [(0.0, -1, -1)] + paths[u]
+			return paths[u]
+
+		for v in self.order.tolist():
+			lo, hi = self.indptr[v], self.indptr[v + 1]
+			incoming = []
+			for e in range(lo, hi):
+				u = edge_sources[e]
+				if costs[e] < 0:
+					continue
+				incoming.append(
+					[(entry[0] + costs[e], u, i) for i, entry in enumerate(_extensions(u)[:k])]
+				)
+			paths[v] = list(itertools.islice(heapq.merge(*incoming), k))
+
+		best = heapq.nsmallest(k, (entry + (v,) for v in targets for entry in paths[v]))
+
+		out = []
+		for cost, u, i, v in best:
+			path = [v]
+			while u >= 0:
+				path.append(u)
+				_, u, i = _extensions(u)[i]
+			out.append((cost, path[::-1]))
+
+		return out
+
+	def predecessor_dict(self, pred):
+		"""
+		Converts an array of predecessors into the ``pred`` dictionary (keyed by ``id_``) used by
+		:obj:`~decitala.path_finding.dijkstra.generate_path`.
+		"""
+		return {
+			self.data[v].id_: self.data[u].id_ for v, u in enumerate(pred.tolist()) if u >= 0
+		}
+
+def _single_source_path(data, sources, targets):
+	"""
+	If the first extraction overlaps the last one, the best path is a single source: the one
+	spanning all the data if there is one, otherwise the one with the most onsets (see
+	:obj:`~decitala.path_finding.dijkstra.dijkstra_best_source_and_sink`). Returns ``None``
+	otherwise.
+	"""
+	if data[0].onset_range[1] <= data[-1].onset_range[0]:
+		return None
+
+	min_onset = min(sources, key=lambda x: x.onset_range[0]).onset_range[0]
+	max_onset = max(targets, key=lambda x: x.onset_range[1]).onset_range[1]
+	for possible_source in sources:
+		if possible_source.onset_range == (min_onset, max_onset):
+			return possible_source
+	return max(sources, key=lambda x: x.fragment.num_onsets)
+
+def dag_best_source_and_sink(
+		data,
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		enforce_earliest_start=False,
+		dag=None
+	):
+	"""
+	Same as :obj:`~decitala.path_finding.dijkstra.dijkstra_best_source_and_sink`, but computes the
+	distances from all sources in one pass over the DAG of extractions instead of running Dijkstra
+	from every source. Ties between paths of equal cost may be broken differently.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param bool enforce_earliest_start: whether to require that all sources begin at the earliest
+										detected onset.
+	:param `ExtractionDAG` dag: optional prebuilt :obj:`ExtractionDAG` of ``data`` (e.g. with
+								cached edge features).
+	:return: the best source, the best target and the predecessor dictionary (see
+			:obj:`~decitala.path_finding.dijkstra.generate_path`).
+	:rtype: tuple
+	"""
+	sources, targets = path_finding_utils.sources_and_sinks(
+		data=data,
+		enforce_earliest_start=enforce_earliest_start
+	)
+	if dag is None:
+		dag = ExtractionDAG(data)
+	costs = dag.edge_costs(cost_function_class)
+
+	def _tree_from(source):
+		_, _, pred = dag.shortest_paths(costs, roots=[dag.index_of_id[source.id_]])
+		return dag.predecessor_dict(pred)
+
+	single_source = _single_source_path(data, sources, targets)
+	if single_source is not None:
+		return single_source, single_source, _tree_from(single_source)
+
+	roots = {dag.index_of_id[x.id_] for x in sources}
+	_, edge_dist, pred = dag.shortest_paths(costs, roots=roots)
+
+	best_path_cost = np.inf
+	best_target = None
+	for target in targets:
+		target_cost = edge_dist[dag.index_of_id[target.id_]]
+		if target_cost < best_path_cost:
+			best_path_cost = target_cost
+			best_target = target
+
+	if best_target is None:
+		max_source = max(sources, key=lambda x: x.fragment.num_onsets)
+		return max_source, max_source, _tree_from(max_source)
+
+	# The path to best_target starts at the first root met when following the predecessors.
+	v = pred[dag.index_of_id[best_target.id_]]
+	while v not in roots:
+		v = pred[v]
+	best_source = data[v]
+
+	# Find final non-overlapping target with most onsets.
+	final_target = None
+	final_target_onsets = 0
+	for target in targets:
+		if target.onset_range[0] >= best_target.onset_range[1] and \
+				target.fragment.num_onsets > final_target_onsets:
+			final_target = target
+			final_target_onsets = target.fragment.num_onsets
+
+	if not(final_target):
+		final_target = best_target
+
+	return best_source, final_target, _tree_from(best_source)
+
+def dag_k_best_paths(
+		data,
+		k,
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		enforce_earliest_start=False,
+		dag=None
+	):
+	"""
+	Finds the ``k`` lowest-cost distinct paths from a source to a sink of the data (see
+	:obj:`~decitala.path_finding.path_finding_utils.sources_and_sinks`). If no such path exists
+	(e.g. if all extractions overlap), returns the longest source as the only path. As in
+	:obj:`dag_best_source_and_sink`, if the first extraction overlaps the last one, the only path
+	is a single source.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	:param int k: number of paths (at least 1).
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param bool enforce_earliest_start: whether to require that all sources begin at the earliest
+										detected onset.
+	:param `ExtractionDAG` dag: optional prebuilt :obj:`ExtractionDAG` of ``data``.
+	:return: at most ``k`` paths (lists of :obj:`decitala.search.Extraction` objects), sorted
+			by cost.
+	:rtype: list
+	"""
+	if k < 1:
+		raise ValueError("`k` must be at least 1.")
+
+	sources, targets = path_finding_utils.sources_and_sinks(
+		data=data,
+		enforce_earliest_start=enforce_earliest_start
+	)
+	single_source = _single_source_path(data, sources, targets)
+	if single_source is not None:
+		return [[single_source]]
+
+	if dag is None:
+		dag = ExtractionDAG(data)
+
+	paths = dag.k_shortest_paths(
+		costs=dag.edge_costs(cost_function_class),
+		roots=[dag.index_of_id[x.id_] for x in sources],
+		targets=[dag.index_of_id[x.id_] for x in targets],
+		k=k
+	)
+	if not paths:
+		return [[max(sources, key=lambda x: x.fragment.num_onsets)]]
+
+	return [[data[i] for i in path] for _, path in paths]
+
+def dag_slur_constrained_path(
+		data,
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		enforce_earliest_start=False,
+		dag=None
+	):
+	"""
+	Finds the best path that passes through every extraction spanned by a slur. The slurred
+	extractions are taken as mandatory waypoints in onset order (a slurred extraction overlapping
+	an earlier waypoint is dropped). Only extractions that overlap no waypoint may be used
+	between them, and no edge may skip over a waypoint; the remaining problem is a single
+	shortest path pass over the DAG.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects, sorted by onset.
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param bool enforce_earliest_start: whether to require that all sources begin at the earliest
+										detected onset.
+	:param `ExtractionDAG` dag: optional prebuilt :obj:`ExtractionDAG` of ``data``.
+	:return: the best path (a list of :obj:`decitala.search.Extraction` objects).
+	:rtype: list
+	"""
+	if dag is None:
+		dag = ExtractionDAG(data)
+
+	waypoints = []
+	for i, x in enumerate(data):
+		if x.is_spanned_by_slur and \
+				(not waypoints or x.onset_range[0] >= data[waypoints[-1]].onset_range[1]):
+			waypoints.append(i)
+
+	if not waypoints:
+		source, target, pred = dag_best_source_and_sink(
+			data=data,
+			cost_function_class=cost_function_class,
+			enforce_earliest_start=enforce_earliest_start,
+			dag=dag
+		)
+		path = dijkstra.generate_path(pred, source, target)
+		return [data[dag.index_of_id[i]] for i in path]
+
+	arrays = path_finding_utils.extraction_arrays(data)
+	starts, stops = arrays["starts"], arrays["stops"]
+	waypoint_starts, waypoint_stops = starts[waypoints], stops[waypoints]
+
+	# Number of waypoints ending before each extraction begins and the index of the first waypoint
+	# beginning after it ends; an extraction overlaps no waypoint iff they are equal.
+	before = np.searchsorted(waypoint_stops, starts, side="right")
+	after = np.searchsorted(waypoint_starts, stops, side="left")
+	allowed = before == after
+	allowed[waypoints] = True
+	before[waypoints] = np.arange(len(waypoints))
+	after[waypoints] = np.arange(1, len(waypoints) + 1)
+
+	# An edge u -> v skips a waypoint unless v comes right after the waypoints preceding u.
+	src, dst = dag.edge_sources, dag.edge_targets
+	valid = allowed[src] & allowed[dst] & (before[dst] == after[src])
+	costs = np.where(valid, dag.edge_costs(cost_function_class), -1.0)
+
+	allowed_data = [x for i, x in enumerate(data) if allowed[i]]
+	sources, targets = path_finding_utils.sources_and_sinks(
+		data=allowed_data,
+		enforce_earliest_start=enforce_earliest_start
+	)
+	roots = {dag.index_of_id[x.id_] for x in sources if before[dag.index_of_id[x.id_]] == 0}
+	dist, edge_dist, pred = dag.shortest_paths(costs, roots=roots)
+
+	ends = [dag.index_of_id[x.id_] for x in targets]
+	ends = [v for v in ends if after[v] == len(waypoints)]
+	best_target = min(ends, key=lambda v: edge_dist[v], default=None)
+	if best_target is None or edge_dist[best_target] == np.inf:
+		# Only a single waypoint spanning the whole part (or no complete path at all).
+		return [data[i] for i in waypoints]
+
+	path = [pred[best_target], best_target]
+	while path[0] not in roots:
+		path.insert(0, pred[path[0]])
+	return [data[i] for i in path]
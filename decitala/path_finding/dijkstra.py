@@ -10,8 +10,7 @@
 import numpy as np
 import heapq
 
-from tqdm import tqdm
-
+from .. import instrumentation
 from . import path_finding_utils
 
 # Useful info here: https://stackoverflow.com/questions/22897209/dijkstras-algorithm-in-python.
@@ -20,40 +19,71 @@ def dijkstra(
 		graph,
 		source,
 		cost_function_class=path_finding_utils.CostFunction3D(),
+		targets=None
 	):
 	"""
 	Dijkstra path-finding algorithm from dynamic programming. Uses a min-heap
 	data structure for efficiency.
 
 	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	:param graph: either the dictionary returned by
+		:obj:`~decitala.path_finding.path_finding_utils.build_graph` or a function yielding the
+		edges of a vertex on demand, as returned by
+		:obj:`~decitala.path_finding.path_finding_utils.lazy_graph`.
 	:param source: an :obj:`decitala.search.Extraction` object.
 	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
 		function that will be used in calculating the weights between vertices.
+	:param targets: optional collection of :obj:`decitala.search.Extraction` objects. If given,
+		the search stops as soon as all of them are settled; only their distances (and the
+		predecessors on their paths) are then guaranteed to be final.
 	"""
 	source = source.id_
 
+	if callable(graph):
+		neighbours = graph
+		dist = {x.id_: np.inf for x in data}
+	else:
+		neighbours = graph.__getitem__
+		dist = {x: np.inf for x in graph.keys()}
+
+	if targets is not None:
+		remaining = {x.id_ for x in targets}
+	else:
+		remaining = None
+
 	q = []
-	dist = {x: np.inf for x in graph.keys()}
 	pred = {}
+	num_pushes = 1
 
 	dist[source] = 0
 	heapq.heappush(q, (0, source))
 
 	while q:
 		last_w, curr_v = heapq.heappop(q)
-		for n, n_w in graph[curr_v]:
+		if last_w > dist[curr_v]:  # stale entry.
+			continue
+
+		if remaining is not None:
+			remaining.discard(curr_v)
+			if not(remaining):
+				break
+
+		for n, n_w in neighbours(curr_v):
 			alt = last_w + n_w
 			if alt < dist[n]:
 				dist[n] = alt
 				pred[n] = curr_v
 				heapq.heappush(q, (alt, n))
+				num_pushes += 1
 
+	instrumentation.count("heap_pushes", num_pushes)
 	return dist, pred
 
 def dijkstra_best_source_and_sink(
 		data,
 		cost_function_class=path_finding_utils.CostFunction3D(),
 		enforce_earliest_start=False,
+		lazy=False,
 		verbose=False
 	):
 	"""
@@ -63,17 +93,26 @@ def dijkstra_best_source_and_sink(
 	:param list data: a list of :obj:`decitala.search.Extraction` objects.
 	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
 		function that will be used in calculating the weights between vertices.
+	:param bool lazy: whether to compute the edges on demand (see
+		:obj:`~decitala.path_finding.path_finding_utils.lazy_graph`) instead of building the
+		full graph. Uses memory linear in the size of ``data``.
 	:param bool verbose: whether to print logs.
 	"""
 	sources, targets = path_finding_utils.sources_and_sinks(
 		data=data,
 		enforce_earliest_start=enforce_earliest_start
 	)
-	graph = path_finding_utils.build_graph(
-		data=data,
-		cost_function_class=cost_function_class,
-		verbose=verbose
-	)
+	if lazy:
+		graph = path_finding_utils.lazy_graph(
+			data=data,
+			cost_function_class=cost_function_class
+		)
+	else:
+		graph = path_finding_utils.build_graph(
+			data=data,
+			cost_function_class=cost_function_class,
+			verbose=verbose
+		)
 
 	# This checks if there exists a fragment in sources/sinks that spans the whole onset range.
 	# Alternatively if all extracted fragments are overlapping (see test_povel_essen_dijkstra).
@@ -112,12 +151,13 @@ def dijkstra_best_source_and_sink(
 	best_target = None
 	best_predecessor_set = None
 
-	for source in tqdm(sources, disable=not(verbose)):
+	for source in instrumentation.progress(sources, "dijkstra", verbose=verbose):
 		dist, pred = dijkstra(
 			data,
 			graph,
 			source,
-			cost_function_class
+			cost_function_class,
+			targets=targets
 		)
 		for target in targets:
 			if (dist[target.id_] < best_path_cost):
@@ -12,10 +12,13 @@ Implementation of the Floyd-Warshall Algorithm (path of minimal cost).
 """
 import numpy as np
 
-from progress.bar import Bar
-
+from .. import instrumentation
 from ..utils import get_logger
-from .path_finding_utils import CostFunction3D
+from .path_finding_utils import (
+	CostFunction3D,
+	extraction_arrays,
+	supports_cost_matrix
+)
 
 logger = get_logger(name=__name__, print_to_console=True)
 
@@ -30,11 +33,32 @@ def floyd_warshall(
 	:param list data: a list of :obj:`decitala.search.Extraction` objects.
 	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
 		function that will be used in calculating the weights between vertices.
-	:param bool verbose: Whether to log messages (including showing a progress bar).
+	:param bool verbose: Whether to show a progress bar (see
+						:obj:`decitala.instrumentation.progress`).
 	:return: Two matrices of size len(data) x len(data): first is the weighted adjacency matrix, the
 			second is the matrix used for path reconstruction.
 	:rtype: tuple
 	"""
+	with instrumentation.stage("graph"):
+		if supports_cost_matrix(cost_function_class):
+			dist_matrix, next_matrix = _initial_matrices_vectorized(data, cost_function_class)
+		else:
+			dist_matrix, next_matrix = _initial_matrices(data, cost_function_class)
+		instrumentation.count("edges_built", int(np.isfinite(dist_matrix).sum()) - len(data))
+
+	for k in instrumentation.progress(range(0, len(data)), "floyd_warshall", verbose=verbose):
+		for i in range(0, len(data)):
+			for j in range(0, len(data)):
+				if dist_matrix[i][j] > dist_matrix[i][k] + dist_matrix[k][j]:
+					dist_matrix[i][j] = dist_matrix[i][k] + dist_matrix[k][j]
+					next_matrix[i][j] = next_matrix[i][k]
+
+	return dist_matrix, next_matrix
+
+def _initial_matrices(data, cost_function_class):
+	"""
+	Builds the initial distance and next matrices by calling the cost function on every pair.
+	"""
 	dist_matrix = np.full(shape=(len(data), len(data)), fill_value=np.inf)
 	next_matrix = np.full(shape=(len(data), len(data)), fill_value=None)
 	iterator = np.nditer(
@@ -62,23 +86,24 @@ def floyd_warshall(
 		iterator.iternext()
 	# logger.info("Finished building initial matrix.")
 
-	# logger.info("Running Floyd-Warshall Algorithm...")
-	if verbose is True:
-		with Bar("Processing...", max=len(data), check_tty=False, hide_cursor=False) as bar:
-			for k in range(0, len(data)):
-				for i in range(0, len(data)):
-					for j in range(0, len(data)):
-						if dist_matrix[i][j] > dist_matrix[i][k] + dist_matrix[k][j]:
-							dist_matrix[i][j] = dist_matrix[i][k] + dist_matrix[k][j]
-							next_matrix[i][j] = next_matrix[i][k]
-				bar.next()
-	else:
-		for k in range(0, len(data)):
-			for i in range(0, len(data)):
-				for j in range(0, len(data)):
-					if dist_matrix[i][j] > dist_matrix[i][k] + dist_matrix[k][j]:
-						dist_matrix[i][j] = dist_matrix[i][k] + dist_matrix[k][j]
-						next_matrix[i][j] = next_matrix[i][k]
+	return dist_matrix, next_matrix
+
+def _initial_matrices_vectorized(data, cost_function_class):
+	"""
+	Version of :obj:`_initial_matrices` for cost functions implementing ``cost_matrix``.
+	"""
+	n = len(data)
+	costs = cost_function_class.cost_matrix(**extraction_arrays(data))
+	valid = np.triu(np.ones((n, n), dtype=bool), k=1) & (costs >= 0)
+
+	dist_matrix = np.where(valid, costs, np.inf)
+	np.fill_diagonal(dist_matrix, 0)
+
+	targets = np.empty(n, dtype=object)
+	targets[:] = data
+	next_matrix = np.full(shape=(n, n), fill_value=None)
+	next_matrix[valid] = np.broadcast_to(targets, (n, n))[valid]
+	next_matrix[np.diag_indices(n)] = targets
 
 	return dist_matrix, next_matrix
 
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+####################################################################################################
+# File:     online.py
+# Purpose:  Online (streaming) path finding over extractions arriving in onset order.
+#
+# Author:   Luke Poeppel
+#
+# Location: NYC, 2021
+####################################################################################################
+"""
+Viterbi-style path finding for extractions that arrive one at a time in onset order (e.g. from a
+generator). Each extraction is attached to its best predecessor among the extractions ending at
+most ``lookahead`` quarter lengths before it starts and one of the older ones (the fallback). Once
+every remaining hypothesis shares the same beginning, that beginning can no longer change and is
+committed, so only the hypotheses within the lookahead window are kept in memory.
+"""
+import numpy as np
+
+from . import path_finding_utils
+
+class OnlinePathFindingException(Exception):
+	pass
+
+class _Node:
+	"""A path hypothesis, linked to the hypothesis it extends."""
+	__slots__ = ("extraction", "parent", "depth", "cost", "has_edge")
+
+	def __init__(self, extraction, parent, cost, has_edge):
+		self.extraction = extraction
+		self.parent = parent
+		self.depth = 0 if parent is None else parent.depth + 1
+		self.cost = cost
+		self.has_edge = has_edge
+
+def _common_ancestor(a, b):
+	while a is not b:
+		if a is None or b is None:
+			return None
+		if a.depth > b.depth:
+			a = a.parent
+		elif b.depth > a.depth:
+			b = b.parent
+		else:
+			a, b = a.parent, b.parent
+	return a
+
+class OnlinePathFinder:
+	"""
+	Incrementally finds the lowest-cost path from a source to a sink (see
+	:obj:`~decitala.path_finding.path_finding_utils.sources_and_sinks`) of a stream of
+	extractions. With ``lookahead=None`` every earlier extraction is a possible predecessor and
+	the result equals the exact lowest-cost path, but nothing is committed before
+	:obj:`OnlinePathFinder.close`. With a finite ``lookahead`` (e.g. the longest fragment duration
+	in the table), the extractions ending more than ``lookahead`` before the latest one are
+	replaced by the one from which the latest extraction is the cheapest to reach, which remains
+	a possible predecessor. The path then still runs from a source to a sink across longer gaps,
+	but may cost more than the exact one.
+
+	The committed extractions are returned by :obj:`OnlinePathFinder.push` and
+	:obj:`OnlinePathFinder.close` and then dropped, unless ``keep_path=True``.
+
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param float lookahead: length (in quarter lengths) of the window of extractions kept as
+							individual predecessors.
+	:param bool keep_path: whether to also collect the committed extractions in
+							``OnlinePathFinder.path`` (``None`` otherwise), so that memory grows
+							with the length of the stream.
+
+	>>> from decitala.search import Extraction
+	>>> from decitala.fragment import GreekFoot
+	>>> data = [
+	... 	Extraction(fragment=GreekFoot("Spondee"), onset_range=(0.0, 0.5), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=1), # noqa
+	... 	Extraction(fragment=GreekFoot("Trochee"), onset_range=(0.25, 0.625), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=2), # noqa
+	... 	Extraction(fragment=GreekFoot("Dactyl"), onset_range=(0.5, 1.0), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=3), # noqa
+	... 	Extraction(fragment=GreekFoot("Iamb"), onset_range=(1.0, 1.375), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=4), # noqa
+	... 	Extraction(fragment=GreekFoot("Spondee"), onset_range=(1.375, 1.875), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=5), # noqa
+	... ]
+	>>> finder = OnlinePathFinder(lookahead=0.25)
+	>>> for extraction in data:
+	... 	print([x.fragment for x in finder.push(extraction)])
+	[]
+	[]
+	[]
+	[]
+	[<fragment.GreekFoot Trochee>]
+	>>> [x.fragment for x in finder.close()]
+	[<fragment.GreekFoot Spondee>]
+	"""
+	def __init__(
+			self,
+			cost_function_class=path_finding_utils.CostFunction3D(),
+			lookahead=None,
+			keep_path=False
+		):
+		self.cost_function_class = cost_function_class
+		self.lookahead = np.inf if lookahead is None else lookahead
+		self.path = [] if keep_path else None  # committed extractions.
+		self.num_committed = 0
+
+		self._live = []
+		self._fallback = None  # best hypothesis that left the lookahead window.
+		self._sources = []
+		self._min_stop = np.inf
+		self._max_start = -np.inf
+		self._committed = None
+		self._closed = False
+
+	def __repr__(self):
+		return f"<path_finding.OnlinePathFinder {self.num_committed} committed, {len(self._live)} live>"
+
+	def push(self, extraction):
+		"""
+		Adds the next extraction of the stream.
+
+		:param `decitala.search.Extraction` extraction: an extraction starting no earlier than
+														the previously pushed ones.
+		:return: the extractions newly committed to the path (possibly empty).
+		:rtype: list
+		"""
+		if self._closed:
+			raise OnlinePathFindingException("The path finder is closed.")
+
+		start, stop = extraction.onset_range
+		if start < self._max_start:
+			raise OnlinePathFindingException("Extractions must be pushed in onset order.")
+
+		is_source = start < self._min_stop
+		self._min_stop = min(self._min_stop, stop)
+		self._max_start = start
+
+		# Extractions ending more than lookahead before this one are only kept through the one
+		# from which this extraction is the cheapest to reach.
+		live = []
+		evicted = [] if self._fallback is None else [self._fallback]
+		for node in self._live:
+			if node.extraction.onset_range[1] + self.lookahead >= start:
+				live.append(node)
+			else:
+				evicted.append(node)
+		self._live = live
+		if len(evicted) > 1:
+			self._fallback = min(
+				evicted,
+				key=lambda node: node.cost + self.cost_function_class.cost(
+					vertex_a=node.extraction,
+					vertex_b=extraction
+				)
+			)
+		elif evicted:
+			self._fallback = evicted[0]
+
+		if is_source:
+			self._sources.append(extraction)
+			self._live.append(_Node(extraction, None, 0.0, False))
+		else:
+			best = None
+			candidates = self._live if self._fallback is None else self._live + [self._fallback]
+			for node in candidates:
+				if node.extraction.onset_range[1] > start:
+					continue
+				edge_cost = self.cost_function_class.cost(
+					vertex_a=node.extraction,
+					vertex_b=extraction
+				)
+				if edge_cost >= 0 and (best is None or node.cost + edge_cost < best[0]):
+					best = (node.cost + edge_cost, node)
+			if best is not None:
+				self._live.append(_Node(extraction, best[1], best[0], True))
+
+		return self._commit()
+
+	def _commit(self):
+		# Until an extraction starts after the end of another, new sources may still arrive.
+		if not self._live or self._max_start < self._min_stop:
+			return []
+
+		hypotheses = self._live if self._fallback is None else self._live + [self._fallback]
+		ancestor = hypotheses[0]
+		for node in hypotheses[1:]:
+			ancestor = _common_ancestor(ancestor, node)
+			if ancestor is None:
+				return []
+
+		newly_committed = []
+		node = ancestor
+		while node is not None and node is not self._committed:
+			newly_committed.insert(0, node.extraction)
+			node = node.parent
+		# The committed part of the path is no longer needed to compare hypotheses, and no new
+		# source can arrive.
+		ancestor.parent = None
+		self._committed = ancestor
+		self._sources = []
+
+		return self._committed_extractions(newly_committed)
+
+	def _committed_extractions(self, extractions):
+		self.num_committed += len(extractions)
+		if self.path is not None:
+			self.path.extend(extractions)
+		return extractions
+
+	def close(self):
+		"""
+		Ends the stream and chooses the best final extraction.
+
+		:return: the remaining extractions of the path (after those already committed).
+		:rtype: list
+		"""
+		if self._closed:
+			raise OnlinePathFindingException("The path finder is already closed.")
+		self._closed = True
+
+		sinks = [
+			node for node in self._live
+			if node.extraction.onset_range[1] > self._max_start and node.has_edge
+		]
+		if not sinks:
+			if self.num_committed or not self._sources:
+				return []
+			return self._committed_extractions([
+				max(self._sources, key=lambda x: x.fragment.num_onsets)
+			])
+
+		node = min(sinks, key=lambda x: x.cost)
+		remaining = []
+		while node is not None and node is not self._committed:
+			remaining.insert(0, node.extraction)
+			node = node.parent
+
+		return self._committed_extractions(remaining)
+
+def online_path_finder(
+		extractions,
+		cost_function_class=path_finding_utils.CostFunction3D(),
+		lookahead=None
+	):
+	"""
+	Generator version of :obj:`OnlinePathFinder`. Each segment is yielded as soon as it is
+	committed and is not kept by the path finder.
+
+	:param iterable extractions: :obj:`decitala.search.Extraction` objects in onset order.
+	:param `decitala.path_finding.path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param float lookahead: see :obj:`OnlinePathFinder`.
+	:return: a generator of committed path segments (non-empty lists of extractions).
+	:rtype: generator
+	"""
+	finder = OnlinePathFinder(cost_function_class=cost_function_class, lookahead=lookahead)
+	for extraction in extractions:
+		segment = finder.push(extraction)
+		if segment:
+			yield segment
+
+	segment = finder.close()
+	if segment:
+		yield segment
@@ -8,10 +8,11 @@
 #
 # Location: NYC, 2021
 ####################################################################################################
+import bisect
+import itertools
 import numpy as np
 
-from tqdm import tqdm
-
+from .. import instrumentation
 from ..fragment import GreekFoot
 
 class CostFunction:
@@ -37,6 +38,10 @@ class CostFunction:
 	... 		first_term = ((weight_a * vertex_a.num_onsets) + weight_b)
 	... 		second_term = ((weight_a * vertex_b.num_onsets) + weight_b)
 	... 		return first_term + second_term
+
+	Child classes may also implement a vectorized ``cost_matrix`` method (see
+	:obj:`CostFunction3D.cost_matrix`) computing the cost of all pairs of extractions at once. The
+	graph builders use it when present and fall back to calling ``cost`` on each pair otherwise.
 	"""
 	def __init__(self, **kwargs):
 		self.__dict__.update(kwargs)
@@ -53,6 +58,20 @@ class CostFunction:
 		"""
 		raise NotImplementedError
 
+def _index_array(index, n):
+	if index is None:
+		return np.arange(n)
+	elif isinstance(index, slice):
+		return np.arange(n)[index]
+	return np.asarray(index)
+
+def _weighted_sum(features, weights):
+	"""Sum of the features (along the last axis) weighted by ``weights``, in order."""
+	cost = weights[0] * features[..., 0]
+	for k in range(1, len(weights)):
+		cost = cost + (weights[k] * features[..., k])
+	return cost
+
 class CostFunction2D(CostFunction):
 	"""
 	Default cost function used in the path-finding algorithms. Weights optimized by
@@ -66,12 +85,58 @@ class CostFunction2D(CostFunction):
 		self.gap_weight = gap_weight
 		self.onset_weight = onset_weight
 
+	@property
+	def weights(self):
+		return [self.gap_weight, self.onset_weight]
+
 	def cost(self, vertex_a, vertex_b):
 		gap = vertex_b.onset_range[0] - vertex_a.onset_range[1]
 		onsets = 1 / (vertex_a.fragment.num_onsets + vertex_b.fragment.num_onsets)
 		cost = (self.gap_weight * gap) + (self.onset_weight * onsets)
 		return cost
 
+	def edge_features(
+			self,
+			starts,
+			stops,
+			onsets,
+			slur_counts,
+			slur_se_counts,
+			sources,
+			targets
+		):
+		"""
+		The two terms (gap and onsets) weighted in :obj:`CostFunction2D.cost`. See
+		:obj:`CostFunction3D.edge_features`.
+		"""
+		gap = starts[targets] - stops[sources]
+		onset_term = 1 / (onsets[sources] + onsets[targets])
+		return np.stack([gap, onset_term], axis=-1)
+
+	def cost_matrix(
+			self,
+			starts,
+			stops,
+			onsets,
+			slur_counts,
+			slur_se_counts,
+			sources=None,
+			targets=None
+		):
+		"""
+		Vectorized version of :obj:`CostFunction2D.cost`. See :obj:`CostFunction3D.cost_matrix`.
+		"""
+		features = self.edge_features(
+			starts,
+			stops,
+			onsets,
+			slur_counts,
+			slur_se_counts,
+			sources=_index_array(sources, len(starts))[:, np.newaxis],
+			targets=_index_array(targets, len(starts))[np.newaxis, :]
+		)
+		return _weighted_sum(features, self.weights)
+
 class CostFunction3D(CostFunction):
 	def __init__(
 			self,
@@ -83,6 +148,10 @@ class CostFunction3D(CostFunction):
 		self.onset_weight = onset_weight
 		self.articulation_weight = articulation_weight
 
+	@property
+	def weights(self):
+		return [self.gap_weight, self.onset_weight, self.articulation_weight]
+
 	def cost(self, vertex_a, vertex_b):
 		gap = vertex_b.onset_range[0] - vertex_a.onset_range[1]
 		onsets = 1 / (vertex_a.fragment.num_onsets + vertex_b.fragment.num_onsets)
@@ -108,60 +177,315 @@ class CostFunction3D(CostFunction):
 
 		return cost
 
+	def edge_features(
+			self,
+			starts,
+			stops,
+			onsets,
+			slur_counts,
+			slur_se_counts,
+			sources,
+			targets
+		):
+		"""
+		The three terms (gap, onsets and slurs) weighted in :obj:`CostFunction3D.cost`, for the
+		edges from the ``sources[k]``-th to the ``targets[k]``-th extraction. The cost of these
+		edges is the weighted sum of the features along the last axis, so changing the weights
+		doesn't require recomputing them.
+
+		:param numpy.array starts: onset starts of the extractions.
+		:param numpy.array stops: onset stops of the extractions.
+		:param numpy.array onsets: number of onsets in each extracted fragment.
+		:param numpy.array slur_counts: ``slur_count`` of each extraction.
+		:param numpy.array slur_se_counts: ``slur_start_end_count`` of each extraction.
+		:param numpy.array sources: indices of the first extraction of each edge.
+		:param numpy.array targets: indices of the second extraction of each edge. Must
+			broadcast against ``sources``.
+		:return: array of features, with the features along the last axis.
+		:rtype: numpy.array
+		"""
+		gap = starts[targets] - stops[sources]
+		onset_term = 1 / (onsets[sources] + onsets[targets])
+
+		total_slurs = slur_counts[sources] + slur_counts[targets]
+		slur_count = 1 / np.where(total_slurs == 0, 0.5, total_slurs)
+
+		total_se = slur_se_counts[sources] + slur_se_counts[targets]
+		slur_se_count = 1 / np.where(total_se == 0, 0.75, total_se)
+
+		slur_val = slur_count + slur_se_count
+		return np.stack([gap, onset_term, slur_val], axis=-1)
+
+	def cost_matrix(
+			self,
+			starts,
+			stops,
+			onsets,
+			slur_counts,
+			slur_se_counts,
+			sources=None,
+			targets=None
+		):
+		"""
+		Vectorized version of :obj:`CostFunction3D.cost`. Each input is a numpy array holding one
+		value per extraction (see :obj:`extraction_arrays`). Entry ``[i, j]`` of the output is the
+		cost of moving from the ``i``-th to the ``j``-th extraction.
+
+		:param numpy.array starts: onset starts of the extractions.
+		:param numpy.array stops: onset stops of the extractions.
+		:param numpy.array onsets: number of onsets in each extracted fragment.
+		:param numpy.array slur_counts: ``slur_count`` of each extraction.
+		:param numpy.array slur_se_counts: ``slur_start_end_count`` of each extraction.
+		:param sources: optional index (array or slice) restricting the rows to compute.
+		:param targets: optional index (array or slice) restricting the columns to compute.
+		:return: matrix of costs.
+		:rtype: numpy.array
+		"""
+		features = self.edge_features(
+			starts,
+			stops,
+			onsets,
+			slur_counts,
+			slur_se_counts,
+			sources=_index_array(sources, len(starts))[:, np.newaxis],
+			targets=_index_array(targets, len(starts))[np.newaxis, :]
+		)
+		return _weighted_sum(features, self.weights)
+
+def extraction_arrays(data):
+	"""
+	Collects the attributes of a list of extractions used by the vectorized cost functions
+	into numpy arrays, keyed by the argument names of ``cost_matrix``.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	:rtype: dict
+	"""
+	return {
+		"starts": np.array([x.onset_range[0] for x in data], dtype=float),
+		"stops": np.array([x.onset_range[1] for x in data], dtype=float),
+		"onsets": np.array([x.fragment.num_onsets for x in data], dtype=float),
+		"slur_counts": np.array([x.slur_count for x in data], dtype=float),
+		"slur_se_counts": np.array([x.slur_start_end_count for x in data], dtype=float),
+	}
+
+def _overrides_with_cost(cost_function_class, method_name):
+	for klass in type(cost_function_class).__mro__:
+		if method_name in klass.__dict__:
+			return True
+		if "cost" in klass.__dict__:
+			return False
+	return False
+
+def supports_cost_matrix(cost_function_class):
+	"""
+	Whether a cost function provides a ``cost_matrix`` consistent with its ``cost``. A subclass
+	that overrides ``cost`` without also overriding ``cost_matrix`` falls back to the scalar
+	``cost``.
+
+	:param `path_finding_utils.CostFunction` cost_function_class: a cost function.
+	:rtype: bool
+	"""
+	return _overrides_with_cost(cost_function_class, "cost_matrix")
+
+def supports_edge_features(cost_function_class):
+	"""
+	Whether a cost function is a weighted sum of per-edge features, i.e. provides
+	``edge_features`` and ``weights`` consistent with its ``cost`` (see
+	:obj:`CostFunction3D.edge_features`).
+
+	:param `path_finding_utils.CostFunction` cost_function_class: a cost function.
+	:rtype: bool
+	"""
+	return _overrides_with_cost(cost_function_class, "edge_features")
+
+def successor_windows(data, prune=False):
+	"""
+	Uses the onset starts of the data (sorted, with binary search) to find the valid successors of
+	every extraction, i.e. the extractions starting at or after it ends. With ``prune=True`` the
+	successors are further restricted to those starting before the earliest end among all valid
+	successors; any later successor can be reached through that earliest-ending one.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	:param bool prune: whether to apply the pruning policy described above.
+	:return: a tuple holding the indices of ``data`` sorted by onset start, and two arrays ``lo``
+			and ``hi`` such that the successors of ``data[i]`` are ``order[lo[i]:hi[i]]``.
+	:rtype: tuple
+	"""
+	starts = np.array([x.onset_range[0] for x in data], dtype=float)
+	stops = np.array([x.onset_range[1] for x in data], dtype=float)
+	order = np.argsort(starts, kind="stable")
+	sorted_starts = starts[order]
+
+	lo = np.searchsorted(sorted_starts, stops, side="left")
+	hi = np.full(len(data), len(data))
+	if prune and len(data) > 0:
+		suffix_min_stop = np.minimum.accumulate(stops[order][::-1])[::-1]
+		has_successor = lo < len(data)
+		bound = suffix_min_stop[np.minimum(lo, len(data) - 1)]
+		hi = np.where(has_successor, np.searchsorted(sorted_starts, bound, side="left"), hi)
+
+	return order, lo, hi
+
+def _row_costs(cost_function_class, data, arrays, i, targets):
+	"""Costs from ``data[i]`` to each of ``data[targets]``, as a numpy array."""
+	if arrays is not None:
+		return cost_function_class.cost_matrix(**arrays, sources=[i], targets=targets)[0]
+	return np.array(
+		[cost_function_class.cost(vertex_a=data[i], vertex_b=data[j]) for j in targets],
+		dtype=float
+	)
+
+def _certified_redundant(cost_function_class, data, arrays, i, witness, targets):
+	"""
+	Checks, for each target, that going through ``witness`` is no more expensive than the direct
+	edge from ``data[i]``.
+	"""
+	direct = _row_costs(cost_function_class, data, arrays, i, targets)
+	first_leg = _row_costs(cost_function_class, data, arrays, i, [witness])[0]
+	second_leg = _row_costs(cost_function_class, data, arrays, witness, targets)
+	if first_leg < 0:
+		return np.zeros(len(targets), dtype=bool)
+	return (second_leg >= 0) & (first_leg + second_leg <= direct)
+
 def build_graph(
 		data,
 		cost_function_class=CostFunction3D(),
+		prune=False,
+		verify_pruning=False,
 		verbose=False
 	):
 	"""
 	Function for building a "graph" of nodes and edges from a given set of data (each
 	vertex of the form as those required in the cost function) extracted from one of the
-	search algorithms. Requires ``id`` keys in each dictionary input.
+	search algorithms. Requires ``id`` keys in each dictionary input. The successors of each
+	vertex are found by binary search over the sorted onset starts (see
+	:obj:`successor_windows`).
+
+	When ``prune=True``, an edge is only kept if its target starts before the earliest end among
+	the source's successors; all other targets can be reached through that successor. With
+	``verify_pruning=True``, every removed edge is checked to be no cheaper than the two-edge
+	detour through the earliest-ending successor; edges failing the check are kept. By induction
+	on the gap between the two vertices, the verified graph then has the same shortest path costs
+	as the complete graph.
 
 	:param list data: a list of :obj:`decitala.search.Extraction` objects.
 	:param `path_finding_utils.CostFunction` cost_function_class: a cost
 		function that will be used in calculating the weights between vertices.
+	:param bool prune: whether to prune edges to distant successors.
+	:param bool verify_pruning: whether to keep the pruned edges that can't be shown to be redundant.
+	:param bool verbose: whether to show a progress bar (see
+						:obj:`decitala.instrumentation.progress`).
 	:return: A "graph" holding vertices and the associated cost between all other non-negative edges.
 	:rtype: dict
 	"""
+	with instrumentation.stage("graph"):
+		return _build_graph(data, cost_function_class, prune, verify_pruning, verbose)
+
+def _build_graph(data, cost_function_class, prune, verify_pruning, verbose):
+	if supports_cost_matrix(cost_function_class):
+		arrays = extraction_arrays(data)
+	else:
+		arrays = None
+
+	order, lo, hi = successor_windows(data, prune=prune)
+	if prune and verify_pruning:
+		stops = np.array([x.onset_range[1] for x in data], dtype=float)
+		suffix_argmin = np.empty(len(data), dtype=int)
+		best = None
+		for position in range(len(data) - 1, -1, -1):
+			if best is None or stops[order[position]] <= stops[best]:
+				best = order[position]
+			suffix_argmin[position] = best
+
 	G = {}
-	i = 0
-	with tqdm(total=len(data), disable=not(verbose)) as bar:
-		while i < len(data):
-			curr = data[i]
-			curr_edges = []
-			for other in data:
-				if other == curr:
-					continue
+	num_edges = 0
+	for i in instrumentation.progress(range(len(data)), "build_graph", verbose=verbose):
+		targets = order[lo[i]:hi[i]]
+		targets = targets[targets != i]
+		costs = _row_costs(cost_function_class, data, arrays, i, targets)
+		keep = costs >= 0
+
+		if prune and verify_pruning and hi[i] < len(data):
+			pruned = order[hi[i]:]
+			pruned = pruned[pruned != i]
+			redundant = _certified_redundant(
+				cost_function_class,
+				data,
+				arrays,
+				i,
+				suffix_argmin[lo[i]],
+				pruned
+			)
+			if not(redundant.all()):
+				restored = pruned[~redundant]
+				targets = np.concatenate([targets, restored])
+				costs = np.concatenate([costs, _row_costs(cost_function_class, data, arrays, i, restored)]) # noqa
+				keep = costs >= 0
+
+		G[data[i].id_] = [(data[j].id_, edge) for j, edge in zip(targets[keep].tolist(), costs[keep].tolist())] # noqa
+		num_edges += len(G[data[i].id_])
+
+	instrumentation.count("edges_built", num_edges)
+	return G
 
-				# Check here, not in cost function, as then we don't need to instantiate a fragment object.
-				elif curr.onset_range[1] > other.onset_range[0]:
-					continue
+def lazy_graph(
+		data,
+		cost_function_class=CostFunction3D(),
+		prune=False
+	):
+	"""
+	Lazy alternative to :obj:`build_graph`. Returns a function mapping the ``id_`` of an
+	extraction to a generator over its edges, computed on demand from the onset-sorted data. No
+	edge is stored, so memory use is linear in the number of extractions. The generated edges are
+	the same as those in ``build_graph(data, cost_function_class, prune=prune)``.
 
-				edge = cost_function_class.cost(vertex_a=curr, vertex_b=other)
-				if edge < 0:  # Just in case. Dijkstra edges must be negative.
-					continue
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	:param `path_finding_utils.CostFunction` cost_function_class: a cost
+		function that will be used in calculating the weights between vertices.
+	:param bool prune: see :obj:`successor_windows`.
+	:return: a function taking a vertex ``id_`` and yielding ``(id_, cost)`` tuples.
+	:rtype: function
+	"""
+	if supports_cost_matrix(cost_function_class):
+		arrays = extraction_arrays(data)
+	else:
+		arrays = None
 
-				curr_edges.append((other.id_, edge))
+	order, lo, hi = successor_windows(data, prune=prune)
+	index_of_id = {x.id_: i for i, x in enumerate(data)}
 
-			G[curr.id_] = curr_edges
-			bar.update(1)
-			i += 1
+	def neighbours(vertex_id):
+		i = index_of_id[vertex_id]
+		targets = order[lo[i]:hi[i]]
+		targets = targets[targets != i]
+		costs = _row_costs(cost_function_class, data, arrays, i, targets)
+		for j, edge in zip(targets.tolist(), costs.tolist()):
+			if edge >= 0:
+				yield (data[j].id_, edge)
 
-	return G
+	return neighbours
 
 def sources_and_sinks(
 		data,
 		enforce_earliest_start=False
 	):
 	"""
-	Calculates all sources and sinks in a given dataset.
+	Calculates all sources and sinks in a given dataset. A source is an extraction that no other
+	extraction ends before, i.e. one starting before the minimum end time of the data. A sink is
+	an extraction that no other extraction starts after, i.e. one ending after the maximum start
+	time of the data. Both are returned in the order of the input.
 
 	:param list data: a list of :obj:`decitala.search.Extraction` objects.
 	:param bool enforce_earliest_start: whether to require that all sources begin at the earliest
 										detected onset.
 	"""
-	sources = [x for x in data if not any(y.onset_range[1] <= x.onset_range[0] for y in data)]
+	if not data:
+		return [], []
+
+	min_stop = min(x.onset_range[1] for x in data)
+	max_start = max(x.onset_range[0] for x in data)
+
+	sources = [x for x in data if x.onset_range[0] < min_stop]
 	min_onset = min(x.onset_range[0] for x in sources)
 	if enforce_earliest_start:
 		sources = list(filter(
@@ -169,7 +493,7 @@ def sources_and_sinks(
 			sources
 		))
 
-	sinks = [x for x in data if not any(x.onset_range[1] <= y.onset_range[0] for y in data)]
+	sinks = [x for x in data if x.onset_range[1] > max_start]
 	return sources, sinks
 
 def best_source_and_sink(
@@ -294,7 +618,42 @@ def default_split_dict():
 		GreekFoot("Triproceleusmatic"): [GreekFoot("Proceleusmatic"), GreekFoot("Proceleusmatic"), GreekFoot("Proceleusmatic")], # noqa
 	}
 
-def split_extractions(data, all_res, split_dict=default_split_dict()):
+class ExtractionIndex:
+	"""
+	Interval index over a list of extractions (sorted onset starts and binary search), used for
+	finding the components of an extraction when splitting it. Also hands out ``id_`` values that
+	do not collide with those of the indexed extractions.
+
+	:param list data: a list of :obj:`decitala.search.Extraction` objects.
+	"""
+	def __init__(self, data):
+		self.data = data
+		self._order = sorted(range(len(data)), key=lambda i: data[i].onset_range[0])
+		self._starts = [data[i].onset_range[0] for i in self._order]
+		self._ids = itertools.count(max((x.id_ for x in data), default=0) + 1)
+
+	def contained_in(self, onset_range):
+		"""
+		:param tuple onset_range: an onset range.
+		:return: the extractions whose onset range is contained in ``onset_range``, in the order
+				of the indexed data.
+		:rtype: list
+		"""
+		lo = bisect.bisect_left(self._starts, onset_range[0])
+		hi = bisect.bisect_right(self._starts, onset_range[1], lo)
+		positions = sorted(
+			i for i in self._order[lo:hi] if self.data[i].onset_range[1] <= onset_range[1]
+		)
+		return [self.data[i] for i in positions]
+
+	def new_id(self):
+		"""
+		:return: an ``id_`` not used by any indexed extraction nor returned before.
+		:rtype: int
+		"""
+		return next(self._ids)
+
+def split_extractions(data, all_res, split_dict=None):
 	"""
 	TODO: rename ``all_res`` to ``all_extractions``.
 	Function for splitting a list of extraction objects by a given ``split_dict``.
@@ -304,12 +663,15 @@ def split_extractions(data, all_res, split_dict=default_split_dict()):
 	:param list data: a list of :obj:`decitala.search.Extraction` objects (corresponding to
 						the complete extractions from a filepath-part.
 	:param dict split_dict: the dictionary used to split the extracted fragments into their
-							components. Default is :obj:`path_finding_utils.split_dict`
+							components. Default is :obj:`default_split_dict`.
 	"""
+	if split_dict is None:
+		split_dict = default_split_dict()
+	index = ExtractionIndex(all_res)
 	split_extractions = []
 	for extraction in data:
 		if extraction.fragment in split_dict:
-			components = extraction.split(split_dict=split_dict, all_res=all_res)
+			components = extraction.split(split_dict=split_dict, all_res=all_res, index=index)
 			split_extractions.extend(components)
 		else:
 			split_extractions.append(extraction)
@@ -14,7 +14,9 @@ approach to the end-overlapping indices problem) in a StackOverflow post from Su
 to the original post is:
 https://stackoverflow.com/questions/62734114/iterative-solution-to-end-overlapping-indices.
 """
-import itertools
+import bisect
+
+from .path_finding_utils import sources_and_sinks
 
 def check_break_point(data, i):
 	"""
@@ -42,23 +44,32 @@ def check_break_point(data, i):
 
 def get_break_points(data):
 	"""
+	Equivalent to checking :obj:`~decitala.pofp.check_break_point` at every index, but runs in a
+	single sweep over the data by keeping the running maximum of the previous onset ranges.
+
 	:param list data: data from :obj:`~decitala.trees.rolling_search`.
 	:return: every index in the input at which the data is at most end-overlapping.
 	:rtype: list
 	"""
-	i = 0
 	break_points = []
-	while i < len(data):
-		if check_break_point(data, i):
-			break_points.append(i)
+	if not data:
+		return break_points
 
-		i += 1
+	max_start, max_stop = data[0].onset_range
+	for i in range(1, len(data)):
+		start, stop = data[i].onset_range
+		if start >= max_start and start >= max_stop:
+			break_points.append(i)
+		max_start = max(max_start, start)
+		max_stop = max(max_stop, stop)
 
 	return break_points
 
 def partition_data_by_break_points(data):
 	"""
-	Partitions the input data according to all calculated breakpoints.
+	Partitions the input data according to all calculated breakpoints. No extraction in one
+	partition overlaps an extraction in another, so each can be searched independently (see
+	``partition`` in :obj:`decitala.search.path_finder`).
 	"""
 	break_points = get_break_points(data)
 	out = [data[i:j] for i, j in zip([0] + break_points, break_points + [None])]
@@ -66,13 +77,98 @@ def partition_data_by_break_points(data):
 	return out
 
 ####################################################################################################
-def _min_successor_to_elem(elem, all_min_successors):
-	for data in all_min_successors:
-		if data[0].id_ == elem.id_:
-			return data[1]
+def _successors(data):
+	"""
+	Helper function for :obj:`~decitala.pofp.iter_pareto_optimal_longest_paths`. For every
+	extraction ``x`` (keyed by ``id_``), finds the extractions starting no earlier than the end of
+	``x`` and strictly before the end of its earliest-starting successor (the first such
+	extraction in the input order). Uses binary search over the sorted onset starts.
+
+	:param list data: data from :obj:`~decitala.trees.rolling_search`.
+	:return: dictionary mapping each ``id_`` to its successors (in input order).
+	:rtype: dict
+	"""
+	order = sorted(range(len(data)), key=lambda i: data[i].onset_range[0])
+	starts = [data[i].onset_range[0] for i in order]
+
+	successors = dict()
+	for x in data:
+		lo = bisect.bisect_left(starts, x.onset_range[1])
+		if lo == len(starts):
+			successors[x.id_] = []
+			continue
+		min_successor = data[order[lo]]
+		hi = bisect.bisect_left(starts, min_successor.onset_range[1], lo)
+		successors[x.id_] = [data[i] for i in sorted(order[lo:hi])]
+
+	return successors
+
+def _iter_paths_from(source, successors, sink_ids):
+	"""
+	Helper function for :obj:`~decitala.pofp.iter_pareto_optimal_longest_paths`. Depth-first
+	enumeration of the paths from ``source`` to a sink, with an explicit stack of iterators.
+	"""
+	path = [source]
+	stack = [iter(successors[source.id_])]
+	while stack:
+		node = next(stack[-1], None)
+		if node is None:
+			stack.pop()
+			path.pop()
+		elif node.id_ in sink_ids:
+			yield path + [node]
+		else:
+			path.append(node)
+			stack.append(iter(successors[node.id_]))
+
+def iter_pareto_optimal_longest_paths(data, max_paths=None):
+	"""
+	Lazily generates the Pareto optimal longest paths through the data (see
+	:obj:`~decitala.pofp.get_pareto_optimal_longest_paths`), in the same order. The paths are
+	enumerated with an explicit stack, so long transcriptions do not hit the recursion limit.
+
+	:param list data: data from :obj:`~decitala.trees.rolling_search`.
+	:param int max_paths: optional maximum number of paths to generate.
+	:return: a generator of paths (lists of :obj:`decitala.search.Extraction` objects).
+	:rtype: generator
+
+	>>> from decitala.search import Extraction
+	>>> from decitala.fragment import GreekFoot
+	>>> data = [
+	... 	Extraction(fragment=GreekFoot("Spondee"), onset_range=(0.0, 0.5), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=1), # noqa
+	... 	Extraction(fragment=GreekFoot("Trochee"), onset_range=(0.25, 0.625), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=2), # noqa
+	... 	Extraction(fragment=GreekFoot("Dactyl"), onset_range=(0.5, 1.0), retrograde=False, factor=0.125, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=3) # noqa
+	... ]
+	>>> paths = iter_pareto_optimal_longest_paths(data, max_paths=1)
+	>>> [x.fragment for x in next(paths)]
+	[<fragment.GreekFoot Spondee>, <fragment.GreekFoot Dactyl>]
+	>>> next(paths, None) is None
+	True
+	"""
+	if max_paths is not None and max_paths <= 0:
+		return
+
+	sources, sinks = sources_and_sinks(data)
+	sink_ids = {x.id_ for x in sinks}
+	successors = _successors(data)
+
+	num_paths = 0
+	for source in sources:
+		if source.id_ in sink_ids:
+			paths = [[source]]
+		else:
+			paths = _iter_paths_from(source, successors, sink_ids)
+
+		for path in paths:
+			yield path
+			num_paths += 1
+			if max_paths is not None and num_paths >= max_paths:
+				return
 
 def get_pareto_optimal_longest_paths(data):
 	"""
+	Returns all the paths of :obj:`~decitala.pofp.iter_pareto_optimal_longest_paths` as a list.
+
 	>>> from decitala.search import Extraction
 	>>> from decitala.fragment import GreekFoot, GeneralFragment
 	>>> data = [
@@ -97,52 +193,4 @@ def get_pareto_optimal_longest_paths(data):
 	<fragment.GeneralFragment cs-test2: [0.25  0.125]> (0.25, 0.625)
 	-----
 	"""
-	sources = [x for x in data if not any(y.onset_range[1] <= x.onset_range[0] for y in data)]
-	sinks = [x for x in data if not any(x.onset_range[1] <= y.onset_range[0] for y in data)]
-
-	all_ids = [x.id_ for x in data]
-	sink_ids = [x.id_ for x in sinks]
-	remaining = set(all_ids) - set(sink_ids)
-	filtered_data = [x for x in data if x.id_ in remaining]
-
-	min_successors = []
-	for x in filtered_data:
-		candidates = [y for y in data if y.onset_range[0] >= x.onset_range[1]] # noqa and y["onset_range"] != x["onset_range"]]  
-		min_successor = min(candidates, key=lambda x: x.onset_range[0])
-		min_successors.append([x, min_successor])
-
-	successors = []
-	for x in data:
-		successor = [y for y in data if x.onset_range[1] <= y.onset_range[0] <= y.onset_range[1] and y.onset_range[0] < _min_successor_to_elem(x, min_successors).onset_range[1]] # noqa
-		successors.append([x, successor])
-
-	def print_path_rec(node, path):
-		if node in sinks:
-			solutions.append([path + [node]])
-		else:
-			for successor in _min_successor_to_elem(node, successors):
-				print_path_rec(successor, path + [node])
-
-	solutions = []
-	for source in sources:
-		print_path_rec(source, [])
-
-	flatten = lambda l: [item for sublist in l for item in sublist]
-	flattened = flatten(solutions)
-
-	return flattened
-
-	# flattened.sort()
-	pareto_optimal_paths = list(flattened for flattened, _ in itertools.groupby(flattened))
-
-	stupid_out = []
-	for this_path in pareto_optimal_paths:
-		new_path = []
-		for this_range in this_path:
-			for this_data in data:
-				if this_range == this_data.onset_range:
-					new_path.append([this_data, this_range])
-					continue
-		stupid_out.append(new_path)
-
-	return stupid_out
\ No newline at end of file
+	return list(iter_pareto_optimal_longest_paths(data))
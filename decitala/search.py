@@ -10,11 +10,15 @@
 Search algorithms.
 """
 import copy
+import functools
 import json
 import numpy as np
 
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 
+from . import instrumentation
 from .utils import (
 	successive_ratio_array,
 	successive_difference_array,
@@ -28,17 +32,25 @@ from .fragment import (
 	FragmentEncoder,
 	GeneralFragment
 )
-from .hash_table import (
+from .hash_table import (  # noqa: F401 (FragmentHashTable is used in the doctests)
 	FragmentHashTable
 )
 from .path_finding import (
 	floyd_warshall,
 	dijkstra,
+	beam,
+	dag,
+	pofp,
 	path_finding_utils
 )
 
 logger = get_logger(name=__file__, print_to_console=True)
 
+# Extractions (and their DAG) keyed by the search parameters; see `path_finder(use_cache=True)`.
+# Only the most recently used PATH_FINDING_CACHE_SIZE entries are kept.
+PATH_FINDING_CACHE_SIZE = 32
+_PATH_FINDING_CACHE = OrderedDict()
+
 ####################################################################################################
 class SearchException(Exception):
 	pass
@@ -69,46 +81,49 @@ class Extraction:
 	def show(self):
 		raise NotImplementedError
 
-	def split(self, split_dict, all_res):
+	def split(self, split_dict, all_res, index=None):
 		"""
+		Splits the extraction into its components (as given by ``split_dict``), taken from the
+		extractions in ``all_res`` contained in its onset range. The components are new
+		:obj:`~decitala.search.Extraction` objects with fresh ``id_`` values; their attributes
+		are shared with (not copied from) the corresponding extractions in ``all_res``.
+
 		NOTE: this will fail when using contiguous summation. be warned...
+
+		:param dict split_dict: see :obj:`decitala.path_finding.path_finding_utils.default_split_dict`.
+		:param list all_res: all extractions from the filepath-part.
+		:param `decitala.path_finding.path_finding_utils.ExtractionIndex` index: optional index
+			over ``all_res``; reusing one over several splits avoids rebuilding it and keeps the
+			new ``id_`` values distinct.
 		"""
 		if not(self.fragment in split_dict):
 			return [self]
-		else:
-			# This is dumb, but it should be ok as a temporary solution.
-			filtered_all_res = []
-			for extraction in all_res:
-				if (extraction.onset_range[0] >= self.onset_range[0]) and \
-					(extraction.onset_range[1] <= self.onset_range[1]):
-					filtered_all_res.append(extraction)
-
-			split = []
-			filtered_copy = copy.deepcopy(filtered_all_res)
-			i = 0
-			while i < len(split_dict[self.fragment]):
-				split_elem = split_dict[self.fragment][i]
-				for j, extraction in enumerate(filtered_copy):
-					if extraction.fragment == split_elem:
-						extraction_obj = Extraction(
-							fragment=extraction.fragment,
-							onset_range=extraction.onset_range,
-							retrograde=extraction.retrograde,
-							factor=extraction.factor,
-							difference=extraction.difference,
-							mod_hierarchy_val=extraction.mod_hierarchy_val,
-							pitch_content=extraction.pitch_content,
-							is_spanned_by_slur=extraction.is_spanned_by_slur,
-							slur_count=extraction.slur_count,
-							slur_start_end_count=extraction.slur_start_end_count,
-							id_=1000 + i  # Random scale to differentiate between standard.
-						)
-						split.append(extraction_obj)
-						filtered_copy.pop(j)
-						break  # Don't keep looking.
-				i += 1
 
-			return split
+		if index is None:
+			index = path_finding_utils.ExtractionIndex(all_res)
+		candidates = index.contained_in(self.onset_range)
+
+		split = []
+		for split_elem in split_dict[self.fragment]:
+			for j, extraction in enumerate(candidates):
+				if extraction.fragment == split_elem:
+					split.append(Extraction(
+						fragment=extraction.fragment,
+						onset_range=extraction.onset_range,
+						retrograde=extraction.retrograde,
+						factor=extraction.factor,
+						difference=extraction.difference,
+						mod_hierarchy_val=extraction.mod_hierarchy_val,
+						pitch_content=extraction.pitch_content,
+						is_spanned_by_slur=extraction.is_spanned_by_slur,
+						slur_count=extraction.slur_count,
+						slur_start_end_count=extraction.slur_start_end_count,
+						id_=index.new_id()
+					))
+					candidates.pop(j)
+					break  # Don't keep looking.
+
+		return split
 
 def frame_to_ql_array(frame):
 	"""
@@ -244,7 +259,14 @@ def frame_slur_start_end_count(frame):
 
 	return int(starts_with_slur) + int(ends_with_slur)
 
-def frame_lookup(frame, ql_array, curr_fragment_id, table, windows):
+def frame_lookup(
+		frame,
+		ql_array,
+		curr_fragment_id,
+		table,
+		windows,
+		timer=instrumentation.null_stage
+	):
 	objects = [x[0] for x in frame]
 	if any(x.isRest for x in objects):
 		return None
@@ -254,6 +276,10 @@ def frame_lookup(frame, ql_array, curr_fragment_id, table, windows):
 		if searched is not None:
 			offset_1 = frame[0][0]
 			offset_2 = frame[-1][0]
+			with timer("slur_features"):
+				is_spanned_by_slur = frame_is_spanned_by_slur(frame)
+				slur_count = frame_slur_count(frame)
+				slur_start_end_count = frame_slur_start_end_count(frame)
 			return Extraction(
 				fragment=searched["fragment"],
 				onset_range=(offset_1.offset, offset_2.offset + offset_2.quarterLength),
@@ -262,14 +288,18 @@ def frame_lookup(frame, ql_array, curr_fragment_id, table, windows):
 				difference=searched["difference"],
 				mod_hierarchy_val=searched["mod_hierarchy_val"],
 				pitch_content=frame_to_midi(frame),
-				is_spanned_by_slur=frame_is_spanned_by_slur(frame),
-				slur_count=frame_slur_count(frame),
-				slur_start_end_count=frame_slur_start_end_count(frame),
+				is_spanned_by_slur=is_spanned_by_slur,
+				slur_count=slur_count,
+				slur_start_end_count=slur_start_end_count,
 				id_=curr_fragment_id
 			)
 	except KeyError:
 		return None
 
+def _frames_and_ql_arrays(object_list, window_size):
+	for this_frame in roll_window(array=object_list, window_size=window_size):
+		yield this_frame, frame_to_ql_array(this_frame)
+
 def rolling_hash_search(
 		filepath,
 		part_num,
@@ -289,9 +319,14 @@ def rolling_hash_search(
 	:param list windows: The allowed window sizes for search. Default is all integers in range 2-19.
 	:param bool allow_subdivision: Whether to check for subdivisions of a frame in the search.
 	"""
-	object_list = get_object_indices(filepath=filepath, part_num=part_num, ignore_grace=True)
+	# The stages are only timed (and their objects only created) in an instrument block.
+	instrumented = instrumentation.enabled()
+	timer = instrumentation.stage if instrumented else instrumentation.null_stage
 
-	if type(table) == FragmentHashTable:  # sensitive to inheritance.
+	with timer("parse"):
+		object_list = get_object_indices(filepath=filepath, part_num=part_num, ignore_grace=True)
+
+	if not table.loaded:
 		table.load()
 
 	max_dataset_length = len(max(table.data, key=lambda x: len(x)))
@@ -302,81 +337,268 @@ def rolling_hash_search(
 
 	fragment_id = 0
 	fragments_found = []
+	num_frames = 0
+	num_probes = 0
+	num_superdivisions = 0
 	for this_win in windows:
-		frames = roll_window(array=object_list, window_size=this_win)
-		for this_frame in frames:
-			frame_ql_array = frame_to_ql_array(this_frame)
-			if len(frame_ql_array) < 2:
-				continue
-
-			lookup = frame_lookup(
-				frame=this_frame,
-				ql_array=frame_ql_array,
-				curr_fragment_id=fragment_id,
-				table=table,
-				windows=windows
-			)
-			if lookup:
-				fragments_found.append(lookup)
-				fragment_id += 1
+		frames = _frames_and_ql_arrays(object_list, this_win)
+		if instrumented:
+			frames = instrumentation.timed(frames, "windowing")
+
+		with timer("lookup"):
+			for this_frame, frame_ql_array in frames:
+				num_frames += 1
+				if len(frame_ql_array) < 2:
+					continue
 
-			if allow_subdivision:
-				all_superdivisions = find_possible_superdivisions(
+				num_probes += 1
+				lookup = frame_lookup(
+					frame=this_frame,
 					ql_array=frame_ql_array,
-					include_self=False
+					curr_fragment_id=fragment_id,
+					table=table,
+					windows=windows,
+					timer=timer
 				)
-				for this_superdivision in all_superdivisions:
-					this_superdivision_retrograde = this_superdivision[::-1]
-					if len(this_superdivision) < min(windows):
+				if lookup:
+					fragments_found.append(lookup)
+					fragment_id += 1
+
+				if allow_subdivision:
+					with timer("subdivision"):
+						all_superdivisions = find_possible_superdivisions(
+							ql_array=frame_ql_array,
+							include_self=False
+						)
+						num_superdivisions += len(all_superdivisions)
+						for this_superdivision in all_superdivisions:
+							this_superdivision_retrograde = this_superdivision[::-1]
+							if len(this_superdivision) < min(windows):
+								continue
+
+							searches = [tuple(this_superdivision), tuple(this_superdivision_retrograde)]
+							subdivision_results = []
+							for i, this_search in enumerate(searches):
+								num_probes += 1
+								lookup = frame_lookup(
+									frame=this_frame,
+									ql_array=this_search,
+									curr_fragment_id=fragment_id,
+									table=table,
+									windows=windows,
+									timer=timer
+								)
+								if lookup:
+									if i == 0:
+										lookup.mod_hierarchy_val = 5
+									else:
+										lookup.mod_hierarchy_val = 6
+
+									subdivision_results.append(lookup)
+									fragment_id += 1
+
+							if subdivision_results:
+								fragments_found.append(min(subdivision_results, key=lambda x: x.mod_hierarchy_val)) # noqa
+
+				if allow_contiguous_summation:
+					if any(type(x[0]).__name__ == "Rest" for x in this_frame):
+						continue
+
+					cs_frame = tuple(contiguous_summation(this_frame))
+					if cs_frame == this_frame:
 						continue
 
-					searches = [tuple(this_superdivision), tuple(this_superdivision_retrograde)]
-					subdivision_results = []
-					for i, this_search in enumerate(searches):
-						lookup = frame_lookup(
-							frame=this_frame,
-							ql_array=this_search,
+					cs_ql_array = frame_to_ql_array(cs_frame)
+					if len(cs_ql_array) < min(windows):
+						continue
+					else:
+						num_probes += 1
+						cs_lookup = frame_lookup(
+							frame=cs_frame,
+							ql_array=cs_ql_array,
 							curr_fragment_id=fragment_id,
 							table=table,
 							windows=windows,
+							timer=timer
 						)
-						if lookup:
-							if i == 0:
-								lookup.mod_hierarchy_val = 5
-							else:
-								lookup.mod_hierarchy_val = 6
-
-							subdivision_results.append(lookup)
+						if cs_lookup:
+							cs_lookup.contiguous_summation = True
+							fragments_found.append(cs_lookup)
 							fragment_id += 1
 
-					if subdivision_results:
-						fragments_found.append(min(subdivision_results, key=lambda x: x.mod_hierarchy_val))
+	if instrumented:
+		instrumentation.count("objects", len(object_list))
+		instrumentation.count("frames", num_frames)
+		instrumentation.count("probes", num_probes)
+		instrumentation.count("superdivisions", num_superdivisions)
+		instrumentation.count("extractions", len(fragments_found))
+		for mod_hierarchy_val, hits in sorted(Counter(x.mod_hierarchy_val for x in fragments_found).items()): # noqa
+			instrumentation.count(f"hits_mod_hierarchy_val_{mod_hierarchy_val}", hits)
 
-			if allow_contiguous_summation:
-				if any(type(x[0]).__name__ == "Rest" for x in this_frame):
-					continue
+	return sorted(fragments_found, key=lambda x: x.onset_range[0])
 
-				cs_frame = tuple(contiguous_summation(this_frame))
-				if cs_frame == this_frame:
-					continue
+def clear_path_finding_cache():
+	"""
+	Clears the extractions stored by :obj:`decitala.search.path_finder` when run with
+	``use_cache=True``.
+	"""
+	_PATH_FINDING_CACHE.clear()
 
-				cs_ql_array = frame_to_ql_array(cs_frame)
-				if len(cs_ql_array) < min(windows):
-					continue
-				else:
-					cs_lookup = frame_lookup(
-						frame=cs_frame,
-						ql_array=cs_ql_array,
-						curr_fragment_id=fragment_id,
-						table=table,
-						windows=windows
-					)
-					if cs_lookup:
-						cs_lookup.contiguous_summation = True
-						fragments_found.append(cs_lookup)
-						fragment_id += 1
+def _path_finding_cache_key(
+		filepath,
+		part_num,
+		table,
+		windows,
+		allow_subdivision,
+		allow_contiguous_summation
+	):
+	return (
+		filepath,
+		part_num,
+		type(table).__name__,
+		tuple(table.datasets),
+		tuple(repr(x) for x in table.custom_fragments),
+		tuple(sorted(table.load_parameters.items())),
+		tuple(windows),
+		allow_subdivision,
+		allow_contiguous_summation
+	)
 
-	return sorted(fragments_found, key=lambda x: x.onset_range[0])
+def _segment_path(
+		extractions,
+		extraction_dag,
+		algorithm,
+		cost_function_class,
+		slur_constraint,
+		enforce_earliest_start,
+		beam_width,
+		verbose
+	):
+	"""
+	Helper function for :obj:`decitala.search.path_finder`. Finds the best path through a list of
+	extractions; returns it along with the (possibly newly built) :obj:`ExtractionDAG` when
+	``algorithm="dag"``.
+	"""
+	if slur_constraint and algorithm == "beam":
+		raise SearchException("`slur_constraint` is not supported with `algorithm='beam'`.")
+	elif slur_constraint and algorithm in {"dijkstra", "dag"}:
+		if extraction_dag is None:
+			extraction_dag = dag.ExtractionDAG(extractions)
+		best_path = dag.dag_slur_constrained_path(
+			data=extractions,
+			cost_function_class=cost_function_class,
+			enforce_earliest_start=enforce_earliest_start,
+			dag=extraction_dag
+		)
+	elif algorithm == "dijkstra":
+		source, target, best_pred = dijkstra.dijkstra_best_source_and_sink(
+			data=extractions,
+			cost_function_class=cost_function_class,
+			enforce_earliest_start=enforce_earliest_start,
+			verbose=verbose
+		)
+		best_path = dijkstra.generate_path(
+			best_pred,
+			source,
+			target
+		)
+		best_path = sorted([x for x in extractions if x.id_ in best_path], key=lambda x: x.onset_range[0]) # noqa
+	elif algorithm == "dag":
+		if extraction_dag is None:
+			extraction_dag = dag.ExtractionDAG(extractions)
+		source, target, best_pred = dag.dag_best_source_and_sink(
+			data=extractions,
+			cost_function_class=cost_function_class,
+			enforce_earliest_start=enforce_earliest_start,
+			dag=extraction_dag
+		)
+		best_path = dijkstra.generate_path(
+			best_pred,
+			source,
+			target
+		)
+		best_path = sorted([x for x in extractions if x.id_ in best_path], key=lambda x: x.onset_range[0]) # noqa
+	elif algorithm == "beam":
+		best_path, _ = beam.beam_search(
+			data=extractions,
+			cost_function_class=cost_function_class,
+			beam_width=beam_width,
+			enforce_earliest_start=enforce_earliest_start
+		)
+	elif algorithm == "floyd-warshall":
+		best_source, best_sink = path_finding_utils.best_source_and_sink(
+			data=extractions,
+			enforce_earliest_start=enforce_earliest_start
+		)
+		distance_matrix, next_matrix = floyd_warshall.floyd_warshall(
+			data=extractions,
+			cost_function_class=cost_function_class,
+			verbose=verbose
+		)
+		best_path = floyd_warshall.get_path(
+			start=best_source,
+			end=best_sink,
+			next_matrix=next_matrix,
+			data=extractions,
+			slur_constraint=slur_constraint
+		)
+
+	return best_path, extraction_dag
+
+def _partitioned_path(
+		extractions,
+		extraction_dags,
+		algorithm,
+		cost_function_class,
+		slur_constraint,
+		enforce_earliest_start,
+		partition,
+		n_jobs,
+		beam_width,
+		verbose
+	):
+	"""
+	Helper function for :obj:`decitala.search.path_finder`. Finds the best path through each
+	segment of the extractions (or through all of them if ``partition=False``) and concatenates
+	them. Newly built :obj:`ExtractionDAG` objects are stored in ``extraction_dags``.
+	"""
+	if partition:
+		break_points = pofp.get_break_points(extractions)
+		bounds = list(zip([0] + break_points, break_points + [len(extractions)]))
+	else:
+		bounds = [(0, len(extractions))]
+
+	segments = [extractions[i:j] for i, j in bounds]
+	segment_dags = [extraction_dags.get(bound) for bound in bounds]
+	solve = functools.partial(
+		_segment_path,
+		algorithm=algorithm,
+		cost_function_class=cost_function_class,
+		slur_constraint=slur_constraint,
+		enforce_earliest_start=enforce_earliest_start,
+		beam_width=beam_width,
+		verbose=verbose
+	)
+	if n_jobs != 1 and len(segments) > 1:
+		with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+			results = list(executor.map(solve, segments, segment_dags))
+	else:
+		results = [solve(segment, segment_dag) for segment, segment_dag in zip(segments, segment_dags)] # noqa
+
+	# Results computed in other processes are copies; map them back onto the extractions.
+	extractions_by_id = {x.id_: x for x in extractions}
+	best_path = []
+	for bound, (segment_path, segment_dag) in zip(bounds, results):
+		best_path.extend(extractions_by_id[x.id_] for x in segment_path)
+		if segment_dag is not None:
+			extraction_dags[bound] = segment_dag
+
+	return best_path
+
+def _copy_extraction(extraction):
+	copied = copy.copy(extraction)
+	copied.pitch_content = list(extraction.pitch_content)
+	return copied
 
 def path_finder(
 		filepath,
@@ -391,6 +613,11 @@ def path_finder(
 		slur_constraint=False,
 		enforce_earliest_start=False,
 		save_filepath=None,
+		use_cache=False,
+		partition=False,
+		n_jobs=1,
+		k=None,
+		beam_width=beam.DEFAULT_BEAM_WIDTH,
 		verbose=False
 	):
 	"""
@@ -405,73 +632,128 @@ def path_finder(
 	 													object or one of its subclasses.
 	:param list windows: The allowed window sizes for search. Default is all integers in range 2-19.
 	:param bool allow_subdivision: Whether to check for subdivisions of a frame in the search.
-	:param str algorithm: Path-finding algorithm used. Options are ``"floyd_warshall"`` and ``"dijkstra"``.
+	:param str algorithm: Path-finding algorithm used. Options are ``"floyd_warshall"``,
+						``"dijkstra"``, ``"dag"`` (see
+						:obj:`decitala.path_finding.dag.dag_best_source_and_sink`) and the
+						approximate ``"beam"`` (see :obj:`decitala.path_finding.beam.beam_search`).
 						Default is ``"dijkstra"``.
 	:param bool slur_constraint: Whether to force slurred fragments to appear in the final path.
-								Only possible if `algorithm="floyd-warshall"`.
+								With ``"dijkstra"`` and ``"dag"``, see
+								:obj:`decitala.path_finding.dag.dag_slur_constrained_path`.
 	:param str save_filepath: An optional path to a JSON file for saving search results. This file
 							can then be loaded with the :meth:`decitala.utils.loader`.
+	:param bool use_cache: Whether to reuse the extractions (and, for ``algorithm="dag"``, the
+						cached edge features) of a previous call with the same file, table (and
+						table load parameters) and search parameters. Useful when only
+						``cost_function_class`` changes, e.g. in a hyperparameter search. The
+						:obj:`PATH_FINDING_CACHE_SIZE` most recently used entries are kept.
+						The returned extractions are copies, so changing them doesn't affect
+						later results. Default is ``False``.
+	:param bool partition: Whether to split the extractions at the onsets where no extraction
+						overlaps another (see :obj:`decitala.path_finding.pofp.get_break_points`),
+						find the best path of each segment independently and concatenate them.
+						The result may differ from the unpartitioned search, since every segment
+						contributes its own best path. Default is ``False``.
+	:param int n_jobs: Number of processes used to search the segments when ``partition=True``.
+					``None`` uses all available processors. Default is ``1``.
+	:param int k: If provided, returns a list of the ``k`` lowest-cost distinct paths instead of
+				a single path (see :obj:`decitala.path_finding.dag.dag_k_best_paths`). The paths
+				are always found with the exact DAG search, so ``algorithm`` must be ``"dag"``
+				or ``"dijkstra"``, and ``k`` must be at least 1 (raises a
+				:obj:`SearchException` otherwise). Not available with ``slur_constraint`` or
+				``partition``.
+	:param int beam_width: Number of partial paths kept at each onset when ``algorithm="beam"``.
 	:param bool verbose: Whether to log messages. Default is ``False``.
 	"""
-	extractions = rolling_hash_search(
-		filepath=filepath,
-		part_num=part_num,
-		table=table,
-		windows=windows,
-		allow_subdivision=allow_subdivision,
-		allow_contiguous_summation=allow_contiguous_summation
-	)
+	cache_key = None
+	if use_cache:
+		if not table.loaded:
+			table.load()
+		cache_key = _path_finding_cache_key(
+			filepath=filepath,
+			part_num=part_num,
+			table=table,
+			windows=windows,
+			allow_subdivision=allow_subdivision,
+			allow_contiguous_summation=allow_contiguous_summation
+		)
+
+	if cache_key in _PATH_FINDING_CACHE:
+		extractions, extraction_dags = _PATH_FINDING_CACHE[cache_key]
+		_PATH_FINDING_CACHE.move_to_end(cache_key)
+	else:
+		extractions = rolling_hash_search(
+			filepath=filepath,
+			part_num=part_num,
+			table=table,
+			windows=windows,
+			allow_subdivision=allow_subdivision,
+			allow_contiguous_summation=allow_contiguous_summation
+		)
+		extraction_dags = dict()  # keyed by the bounds of the segment they cover.
+		if cache_key is not None:
+			_PATH_FINDING_CACHE[cache_key] = (extractions, extraction_dags)
+			while len(_PATH_FINDING_CACHE) > PATH_FINDING_CACHE_SIZE:
+				_PATH_FINDING_CACHE.popitem(last=False)
 	if not extractions:
 		return None
 
-	if algorithm.lower() == "dijkstra":
-		if slur_constraint:
-			raise SearchException("This is not yet supported. Coming soon.")
-		source, target, best_pred = dijkstra.dijkstra_best_source_and_sink(
-			data=extractions,
-			cost_function_class=cost_function_class,
-			enforce_earliest_start=enforce_earliest_start,
-			verbose=verbose
-		)
-		best_path = dijkstra.generate_path(
-			best_pred,
-			source,
-			target
-		)
-		best_path = sorted([x for x in extractions if x.id_ in best_path], key=lambda x: x.onset_range[0]) # noqa
-	elif algorithm.lower() == "floyd-warshall":
-		best_source, best_sink = path_finding_utils.best_source_and_sink(
-			data=extractions,
-			enforce_earliest_start=enforce_earliest_start
-		)
-		distance_matrix, next_matrix = floyd_warshall.floyd_warshall(
-			data=extractions,
-			cost_function_class=cost_function_class,
-			verbose=verbose
-		)
-		best_path = floyd_warshall.get_path(
-			start=best_source,
-			end=best_sink,
-			next_matrix=next_matrix,
-			data=extractions,
-			slur_constraint=slur_constraint
-		)
-	else:
-		raise SearchException("The only available options are 'dijkstra' and 'floyd-warshall'.")
+	if algorithm.lower() not in {"dijkstra", "dag", "beam", "floyd-warshall"}:
+		raise SearchException("The only available options are 'dijkstra', 'dag', 'beam' and 'floyd-warshall'.") # noqa
+
+	with instrumentation.stage("path"):
+		if k is not None:
+			if algorithm.lower() not in {"dag", "dijkstra"}:
+				raise SearchException("`k` is only available with the exact algorithms, 'dag' and 'dijkstra'.") # noqa
+			if k < 1:
+				raise SearchException("`k` must be at least 1.")
+			if slur_constraint or partition:
+				raise SearchException("`k` cannot be combined with `slur_constraint` or `partition`.")
+			bound = (0, len(extractions))
+			if bound not in extraction_dags:
+				extraction_dags[bound] = dag.ExtractionDAG(extractions)
+			best_paths = dag.dag_k_best_paths(
+				data=extractions,
+				k=k,
+				cost_function_class=cost_function_class,
+				enforce_earliest_start=enforce_earliest_start,
+				dag=extraction_dags[bound]
+			)
+		else:
+			best_paths = [_partitioned_path(
+				extractions=extractions,
+				extraction_dags=extraction_dags,
+				algorithm=algorithm.lower(),
+				cost_function_class=cost_function_class,
+				slur_constraint=slur_constraint,
+				enforce_earliest_start=enforce_earliest_start,
+				partition=partition,
+				n_jobs=n_jobs,
+				beam_width=beam_width,
+				verbose=verbose
+			)]
 
 	if split_dict:
-		best_path = path_finding_utils.split_extractions(
-			data=best_path,
-			split_dict=split_dict,
-			all_res=extractions
-		)
-
+		best_paths = [
+			path_finding_utils.split_extractions(
+				data=best_path,
+				split_dict=split_dict,
+				all_res=extractions
+			) for best_path in best_paths
+		]
+
+	if cache_key is not None:
+		# The cached extractions (and the split components sharing their attributes) must not be
+		# changed by the caller.
+		best_paths = [[_copy_extraction(x) for x in best_path] for best_path in best_paths]
+
+	result = best_paths if k is not None else best_paths[0]
 	if save_filepath:
 		with open(save_filepath, "w") as output:
-			json.dump(obj=best_path, fp=output, cls=FragmentEncoder, indent=4)
+			json.dump(obj=result, fp=output, cls=FragmentEncoder, indent=4)
 		logger.info(f"Result saved in: {save_filepath}")
 
-	return best_path
+	return result
 
 def rolling_search_on_array(
 		ql_array,
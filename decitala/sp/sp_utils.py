@@ -6,15 +6,11 @@
 #
 # Location: Kent, 2021
 ####################################################################################################
-import librosa
-import librosa.display
-import matplotlib.pyplot as plt
-import matplotlib as mpl
 import numpy as np
 
 from scipy.signal import resample
 
-mpl.style.use("bmh")
+from ..vis import _pyplot
 
 SAMPLE_RATE = 44100
 
@@ -38,6 +34,9 @@ def plot_audio_file(filepath, title=None, save_path=None):
 	:param str title: optional title for the plot. Default is ``None``.
 	:param str save_path: optional path to save the plot. Default is ``None``.
 	"""
+	import librosa
+
+	plt = _pyplot()
 	samples, fs = librosa.load(filepath)
 	samples = resample_(samples, source_rate=fs, target_rate=SAMPLE_RATE)
 
@@ -61,6 +60,10 @@ def plot_spectrogram(
 	"""
 	Function for plotting the spectrogram of an audio file.
 	"""
+	import librosa
+	import librosa.display
+
+	plt = _pyplot()
 	samples, fs = librosa.load(filepath)
 	samples = resample_(samples, source_rate=fs, target_rate=SAMPLE_RATE)
 	S = librosa.feature.melspectrogram(y=samples, sr=SAMPLE_RATE, fmax=max_freq)
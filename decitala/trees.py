@@ -8,11 +8,11 @@
 ####################################################################################################
 import os
 
+# FragmentTree subclasses the treeplotter Tree, so treeplotter can't be imported lazily.
 from treeplotter.tree import (
 	Node,
 	Tree
 )
-from wand.image import Image
 
 from .fragment import (
 	GeneralFragment,
@@ -206,6 +206,8 @@ class FragmentTree(Tree):
 		stored in an HTML file, but is saved as a PDF using the R webshot package. This function
 		does not save the directory, but returns a wand.Image object (with optionally saving it).
 		"""
+		from wand.image import Image
+
 		pdf_filepath = vis.create_tree_diagram(FragmentTree=self, verbose=verbose)
 		img = Image(filename=pdf_filepath)
 
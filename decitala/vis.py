@@ -6,10 +6,7 @@
 #
 # Location: Kent, CT, 2020/21 / NYC, 2021
 ####################################################################################################
-import matplotlib.pyplot as plt
-import matplotlib as mpl
 import os
-import treeplotter
 import natsort
 
 from collections import Counter
@@ -24,7 +21,18 @@ FONTNAME = 'Times'
 FONTSIZE_TITLE = 14
 FONTSIZE_LABEL = 14
 
-mpl.style.use("bmh")
+def _pyplot():
+	"""
+	Imports ``matplotlib.pyplot`` (and sets the plot style) the first time a plot is made, since
+	importing matplotlib is slow.
+	"""
+	import matplotlib as mpl
+	import matplotlib.pyplot as plt
+
+	if not getattr(_pyplot, "styled", False):
+		mpl.style.use("bmh")
+		_pyplot.styled = True
+	return plt
 
 ####################################################################################################
 def create_tree_diagram(
@@ -44,6 +52,8 @@ def create_tree_diagram(
 	:return: A folder at the provided path containing an index.html file which has a visualization
 			of the provided :obj:`~decitala.trees.FragmentTree`.
 	"""
+	import treeplotter
+
 	stupid_tree = treeplotter.tree.Tree()
 	if FragmentTree.rep_type == "ratio":
 		root = treeplotter.tree.Node(value=1.0, name=None)
@@ -79,6 +89,7 @@ def fragment_roll(
 	:param str title: title for the plot. Default is ``None``.
 	:param str save_path: optional path to save the plot (DPI=350). Default is `None`.
 	"""
+	plt = _pyplot()
 	plt.figure(figsize=(11, 3))
 	highest_onset = 0
 	for fragment in data:
@@ -161,6 +172,7 @@ def result_bar_plot(
 	:param str title: Title for the plot. Default is `None`.
 	:param str save_filepath: Optional path to save the plot (DPI=350). Default is `None`.
 	"""
+	plt = _pyplot()
 	if type(data) == list:
 		fragments = [x["fragment"].name for x in data]
 
@@ -198,6 +210,7 @@ def plot_2D_search_results(
 	:param bool legend: Whether to include a legend in the final plot. Default is ``True``.
 	:param str save_path: Optional path to save the plot (DPI=350). Default is `None`.
 	"""
+	plt = _pyplot()
 	if data:
 		xs = [x.onset_range[0] for x in data]
 		ys = [x.onset_range[1] for x in data]
@@ -228,6 +241,7 @@ def plot_2D_search_results(
 	return plt
 
 def plot_pitch_class_distribution_by_species(species, save_path=None):
+	plt = _pyplot()
 	combined_pc_dict = species.aggregated_pc_distribution(as_vector=False)
 	keys = list(combined_pc_dict.keys())
 	values = list(combined_pc_dict.values())
@@ -40,8 +40,7 @@ setup(
 		"natsort",
 		"numpy>=1.16.5",
 		"pandas",
-		"progress",
-		"sqlalchemy",
+		"sqlalchemy>=2.0",
 		"scipy",
 		"tqdm",
 		"treeplotter==0.4.3",
@@ -0,0 +1,48 @@
+import os
+import pytest
+
+from decitala.hash_table import GreekFootHashTable
+from decitala.search import rolling_hash_search, path_finder
+from decitala.path_finding import beam, path_finding_utils
+
+here = os.path.abspath(os.path.dirname(__file__))
+s1_fp = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_1.xml"
+s5_fp = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_5.xml"
+
+@pytest.fixture
+def s5_fragments():
+	return rolling_hash_search(
+		filepath=s5_fp,
+		part_num=0,
+		table=GreekFootHashTable()
+	)
+
+def test_full_beam_is_exact(s5_fragments):
+	beam_cost, exact_cost, gap = beam.optimality_gap(
+		s5_fragments,
+		path_finding_utils.CostFunction3D(0.8, 0.1, 0.1),
+		beam_width=len(s5_fragments)
+	)
+	assert beam_cost == pytest.approx(exact_cost)
+	assert gap == pytest.approx(0.0)
+
+def test_optimality_gap(s5_fragments):
+	# A wider beam is not guaranteed to do better, but is never better than the exact search.
+	cf = path_finding_utils.CostFunction3D(0.8, 0.1, 0.1)
+	widths = [1, 2, 4, len(s5_fragments)]
+	results = [beam.optimality_gap(s5_fragments, cf, beam_width=b) for b in widths]
+	for beam_cost, exact_cost, gap in results:
+		assert gap >= 0
+		assert beam_cost >= exact_cost - 1e-9
+	beam_cost, exact_cost, _ = results[-1]
+	assert beam_cost == pytest.approx(exact_cost)
+
+def test_beam_path_is_non_overlapping(s5_fragments):
+	path, cost = beam.beam_search(s5_fragments, beam_width=2)
+	assert cost >= 0
+	for a, b in zip(path, path[1:]):
+		assert a.onset_range[1] <= b.onset_range[0]
+
+def test_path_finder_beam():
+	path = path_finder(s1_fp, 0, GreekFootHashTable(), algorithm="beam", beam_width=4)
+	assert [x.onset_range for x in path] == sorted(x.onset_range for x in path)
@@ -0,0 +1,92 @@
+import doctest
+import json
+import pytest
+
+from decitala import benchmark
+
+def test_doctests():
+	assert doctest.testmod(benchmark, raise_on_error=True)
+
+def test_synthetic_extractions():
+	data = benchmark.synthetic_extractions(200, overlap=3.0, slur_density=0.5, seed=2)
+	assert len(data) == 200
+	assert len({x.id_ for x in data}) == 200
+	assert all(x.onset_range[0] < x.onset_range[1] for x in data)
+	assert all(x.fragment.num_onsets == len(x.pitch_content) for x in data)
+	assert 50 < sum(x.is_spanned_by_slur for x in data) < 150
+
+	sparse = benchmark.synthetic_extractions(200, overlap=0.5, seed=2)
+	assert sparse[-1].onset_range[0] > data[-1].onset_range[0]
+
+def test_run_benchmarks_and_compare(tmp_path):
+	results = benchmark.run_benchmarks(sizes=(20, 200), repeat=1)
+	assert set(results["results"]) == set(benchmark.BENCHMARKS)
+	assert set(results["results"]["build_graph"]) == {"20", "200"}
+	assert set(results["results"]["floyd_warshall"]) == {"20"}
+	gaps = results["beam_optimality_gaps"]
+	assert set(gaps) == {"20", "200"}
+	for by_width in gaps.values():
+		assert set(by_width) == {str(x) for x in benchmark.BEAM_WIDTHS}
+		assert all(x["gap"] >= 0 for x in by_width.values())
+		assert all(x["beam_cost"] >= x["exact_cost"] - 1e-9 for x in by_width.values())
+
+	filepath = str(tmp_path / "baseline.json")
+	benchmark.save_baseline(results, filepath)
+	assert benchmark.compare_to_baseline(results, filepath) == []
+
+	with open(filepath) as baseline_file:
+		baseline = json.load(baseline_file)
+	baseline["results"]["build_graph"]["200"]["peak_memory"] /= 10
+	with open(filepath, "w") as baseline_file:
+		json.dump(baseline, baseline_file)
+	regressions = benchmark.compare_to_baseline(results, filepath)
+	assert [(x["name"], x["size"], x["metric"]) for x in regressions] == [("build_graph", 200, "peak_memory")] # noqa
+
+def test_unknown_benchmark():
+	with pytest.raises(benchmark.BenchmarkException):
+		benchmark.run_benchmarks(sizes=(10,), names=["bogus"])
+
+def test_generate_score(tmp_path):
+	from decitala.utils import get_object_indices
+
+	filepath = benchmark.generate_score(120, str(tmp_path / "score.xml"), seed=3)
+	assert len(get_object_indices(filepath, part_num=0, ignore_grace=True)) == 120
+
+def test_search_stage_timings_match_search(tmp_path):
+	from decitala.hash_table import GreekFootHashTable
+	from decitala.search import rolling_hash_search
+
+	filepath = benchmark.generate_score(80, str(tmp_path / "score.xml"), seed=4)
+	table = GreekFootHashTable()
+	timings = benchmark.search_stage_timings(filepath, part_num=0, table=table)
+	assert set(timings["seconds"]) == set(benchmark.SEARCH_STAGES)
+	assert timings["counts"]["objects"] == 80
+	assert timings["counts"]["extractions"] == len(rolling_hash_search(filepath, part_num=0, table=table)) # noqa
+	assert timings["path_length"] > 0
+
+	dijkstra_timings = benchmark.search_stage_timings(
+		filepath,
+		part_num=0,
+		table=table,
+		algorithm="dijkstra"
+	)
+	assert dijkstra_timings["path_length"] > 0
+	assert dijkstra_timings["seconds"]["path"] > 0
+
+def test_run_search_benchmarks():
+	report = benchmark.run_search_benchmarks(
+		sources=("synthetic",),
+		synthetic_lengths=(40, 60),
+		include_tree_search=False
+	)
+	assert set(report["table_loads"]) == {x.__name__ for x in benchmark.TABLE_CLASSES}
+	assert [x["name"] for x in report["scores"]] == ["synthetic_40.xml", "synthetic_60.xml"]
+	assert all(x["path_finder"]["best_seconds"] > 0 for x in report["scores"])
+	json.dumps(report)
+
+	with pytest.raises(benchmark.BenchmarkException):
+		benchmark.run_search_benchmarks(sources=("bogus",))
+
+def test_fragment_hash_benchmark():
+	result = benchmark.fragment_hash_benchmark(n=30, repeat=1)
+	assert result["speedup"] > 1
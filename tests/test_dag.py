@@ -0,0 +1,178 @@
+import os
+import pytest
+
+from decitala import search
+from decitala.fragment import GreekFoot
+from decitala.hash_table import FragmentHashTable, GreekFootHashTable
+from decitala.search import (
+	rolling_hash_search,
+	path_finder,
+	clear_path_finding_cache,
+	Extraction,
+	SearchException
+)
+from decitala.path_finding import dag, dijkstra, path_finding_utils
+
+here = os.path.abspath(os.path.dirname(__file__))
+s1_fp = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_1.xml"
+s2_fp = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_2.xml"
+s3_fp = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_3.xml"
+
+def _path_cost(data, path, cost_function_class):
+	by_id = {x.id_: x for x in data}
+	return sum(
+		cost_function_class.cost(by_id[a], by_id[b]) for a, b in zip(path, path[1:])
+	)
+
+@pytest.mark.parametrize("filepath", [s1_fp, s3_fp])
+def test_dag_matches_dijkstra(filepath):
+	data = rolling_hash_search(
+		filepath=filepath,
+		part_num=0,
+		table=GreekFootHashTable()
+	)
+	cf = path_finding_utils.CostFunction3D(0.8, 0.1, 0.1)
+	d_source, d_target, d_pred = dijkstra.dijkstra_best_source_and_sink(data, cf)
+	source, target, pred = dag.dag_best_source_and_sink(data, cf)
+
+	d_path = dijkstra.generate_path(d_pred, d_source, d_target)
+	path = dijkstra.generate_path(pred, source, target)
+	assert _path_cost(data, path, cf) == pytest.approx(_path_cost(data, d_path, cf))
+
+def test_edge_features_are_cached():
+	data = rolling_hash_search(
+		filepath=s1_fp,
+		part_num=0,
+		table=GreekFootHashTable()
+	)
+	extraction_dag = dag.ExtractionDAG(data)
+	features = extraction_dag.edge_features(path_finding_utils.CostFunction3D())
+	assert extraction_dag.edge_features(path_finding_utils.CostFunction3D(0.1, 0.2, 0.7)) is features
+
+	cf = path_finding_utils.CostFunction3D(0.5, 0.25, 0.25)
+	expected = [
+		cf.cost(data[i], data[j])
+		for i, j in zip(extraction_dag.edge_sources, extraction_dag.edge_targets)
+	]
+	assert list(extraction_dag.edge_costs(cf)) == expected
+
+def test_cached_path_finder_reweighting():
+	clear_path_finding_cache()
+	table = GreekFootHashTable()
+	for point in [(0.8, 0.1, 0.1), (0.1, 0.8, 0.1), (0.25, 0.25, 0.5)]:
+		cf = path_finding_utils.CostFunction3D(*point)
+		cached = path_finder(s1_fp, 0, table, algorithm="dag", cost_function_class=cf, use_cache=True) # noqa
+		uncached = path_finder(s1_fp, 0, table, algorithm="dag", cost_function_class=cf)
+		assert [(x.fragment, x.onset_range) for x in cached] == [(x.fragment, x.onset_range) for x in uncached] # noqa
+	clear_path_finding_cache()
+
+def test_path_finder_cache_key(monkeypatch):
+	clear_path_finding_cache()
+	table = FragmentHashTable(datasets=["greek_foot"])
+	path_finder(s1_fp, 0, table, algorithm="dag", use_cache=True)
+	path_finder(s1_fp, 0, table, algorithm="dag", use_cache=True)
+	assert len(search._PATH_FINDING_CACHE) == 1
+
+	# Loading the table with other parameters gives another entry.
+	first_key = next(iter(search._PATH_FINDING_CACHE))
+	table.load(try_retrograde=False)
+	path_finder(s1_fp, 0, table, algorithm="dag", use_cache=True)
+	assert len(search._PATH_FINDING_CACHE) == 2
+
+	# Only the most recently used entries are kept.
+	monkeypatch.setattr(search, "PATH_FINDING_CACHE_SIZE", 2)
+	path_finder(s1_fp, 0, table, windows=[2, 3], algorithm="dag", use_cache=True)
+	assert len(search._PATH_FINDING_CACHE) == 2
+	assert first_key not in search._PATH_FINDING_CACHE
+	clear_path_finding_cache()
+
+def test_cached_path_finder_returns_copies():
+	clear_path_finding_cache()
+	table = GreekFootHashTable()
+	path = path_finder(s1_fp, 0, table, algorithm="dag", use_cache=True)
+	expected = [(x.onset_range, x.mod_hierarchy_val, list(x.pitch_content)) for x in path]
+	for extraction in path:
+		extraction.mod_hierarchy_val = -1
+		extraction.pitch_content.append("edited")
+
+	path = path_finder(s1_fp, 0, table, algorithm="dag", use_cache=True)
+	assert [(x.onset_range, x.mod_hierarchy_val, list(x.pitch_content)) for x in path] == expected
+	clear_path_finding_cache()
+
+def test_k_shortest_paths_match_enumeration():
+	data = rolling_hash_search(
+		filepath=s3_fp,
+		part_num=0,
+		table=GreekFootHashTable()
+	)
+	cf = path_finding_utils.CostFunction3D(0.8, 0.1, 0.1)
+	sources, targets = path_finding_utils.sources_and_sinks(data)
+	target_ids = {x.id_ for x in targets}
+	graph = path_finding_utils.build_graph(data, cf)
+
+	def _all_paths(vertex_id, path):
+		if len(path) > 1 and vertex_id in target_ids:
+			yield path
+		for successor_id, _ in graph[vertex_id]:
+			yield from _all_paths(successor_id, path + [successor_id])
+
+	all_costs = sorted(
+		_path_cost(data, path, cf) for source in sources for path in _all_paths(source.id_, [source.id_]) # noqa
+	)
+	paths = dag.dag_k_best_paths(data, k=5, cost_function_class=cf)
+	assert len({tuple(x.id_ for x in path) for path in paths}) == 5
+	assert [_path_cost(data, [x.id_ for x in path], cf) for path in paths] == pytest.approx(all_costs[:5]) # noqa
+
+def test_path_finder_k_best():
+	table = GreekFootHashTable()
+	paths = path_finder(s1_fp, 0, table, algorithm="dag", k=3)
+	assert len(paths) == 3
+	assert len({tuple(x.id_ for x in path) for path in paths}) == 3
+	with pytest.raises(SearchException):
+		path_finder(s1_fp, 0, table, k=3, partition=True)
+	for algorithm in ["beam", "floyd-warshall"]:
+		with pytest.raises(SearchException):
+			path_finder(s1_fp, 0, table, algorithm=algorithm, k=3)
+	for k in [0, -1]:
+		with pytest.raises(SearchException):
+			path_finder(s1_fp, 0, table, algorithm="dag", k=k)
+		with pytest.raises(ValueError):
+			dag.dag_k_best_paths(rolling_hash_search(s1_fp, 0, table), k=k)
+
+@pytest.mark.parametrize("filepath", [s1_fp, s2_fp, s3_fp])
+def test_path_finder_one_best_path(filepath):
+	table = GreekFootHashTable()
+	best_path = path_finder(filepath, 0, table, algorithm="dag")
+	assert path_finder(filepath, 0, table, algorithm="dag", k=1) == [best_path]
+
+def test_k_best_paths_single_source():
+	# The first extraction overlaps the last one: the spanning source is the only path.
+	data = [
+		Extraction(fragment=GreekFoot("Iamb"), onset_range=(0.0, 1.5), retrograde=False, factor=1.0, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=1), # noqa
+		Extraction(fragment=GreekFoot("Peon_IV"), onset_range=(0.0, 2.0), retrograde=False, factor=1.0, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=2), # noqa
+		Extraction(fragment=GreekFoot("Spondee"), onset_range=(0.5, 1.0), retrograde=False, factor=1.0, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=3), # noqa
+		Extraction(fragment=GreekFoot("Dactyl"), onset_range=(1.0, 1.75), retrograde=False, factor=1.0, difference=0.0, mod_hierarchy_val=1, pitch_content=[None], is_spanned_by_slur=False, slur_count=0, slur_start_end_count=0, id_=4), # noqa
+	]
+	source, target, _ = dag.dag_best_source_and_sink(data)
+	assert source is target is data[1]
+	assert dag.dag_k_best_paths(data, k=1) == [[data[1]]]
+	assert dag.dag_k_best_paths(data, k=3) == [[data[1]]]
+
+def test_slur_constrained_path_keeps_waypoints():
+	data = rolling_hash_search(
+		filepath=os.path.dirname(here) + "/tests/static/Shuffled_Transcription_5.xml",
+		part_num=0,
+		table=GreekFootHashTable()
+	)
+	path = dag.dag_slur_constrained_path(data, path_finding_utils.CostFunction3D(0.8, 0.1, 0.1))
+	path_ids = {x.id_ for x in path}
+	for x in data:
+		if x.is_spanned_by_slur and x.id_ not in path_ids:
+			# Only slurred extractions overlapping one on the path may be left out.
+			assert any(
+				y.is_spanned_by_slur and
+				x.onset_range[0] < y.onset_range[1] and y.onset_range[0] < x.onset_range[1]
+				for y in path
+			)
+	for a, b in zip(path, path[1:]):
+		assert a.onset_range[1] <= b.onset_range[0]
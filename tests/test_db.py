@@ -4,16 +4,22 @@ import tempfile
 import uuid
 import doctest
 import json
+import sqlite3
+
+from contextlib import contextmanager
+from sqlalchemy import event
 
 from sqlalchemy.ext.declarative import declarative_base
 
 from decitala import database
+from decitala.database import db_utils
 from decitala.database.db_utils import get_session
 from decitala.database import db 
 from decitala.fragment import FragmentDecoder
 from decitala.hash_table import (
 	GreekFootHashTable
 )
+from decitala.search import rolling_hash_search
 
 here = os.path.abspath(os.path.dirname(__file__))
 
@@ -85,4 +91,271 @@ def test_species_colors():
 
 def test_num_transcriptions():
 	rvj = db.Species("Le Rossignol à ventre jaune")
-	assert rvj.num_transcriptions == 20
\ No newline at end of file
+	assert rvj.num_transcriptions == 20
+
+def test_get_session_reuses_engine():
+	base = declarative_base()
+	with tempfile.TemporaryDirectory() as tmpdir:
+		db_path = os.path.join(tmpdir, "reused.db")
+		session = get_session(db_path=db_path, base=base)
+		engine = db_utils._engines[(db_path, base)][0]
+		assert get_session(db_path=db_path, base=base) is not session
+		assert get_session(db_path=db_path, base=base).get_bind() is engine
+		assert db_utils._engines[(db_path, base)][0] is engine
+
+		scoped = db_utils.get_scoped_session(db_path=db_path, base=base)
+		assert db_utils.get_scoped_session(db_path=db_path, base=base) is scoped
+		assert scoped is not session
+
+		# A removed database is recreated on the next call.
+		os.remove(db_path)
+		assert db_utils.get_scoped_session(db_path=db_path, base=base) is not scoped
+		assert db_utils._engines[(db_path, base)][0] is not engine
+		assert os.path.isfile(db_path)
+
+		db_utils.dispose_engines()
+		assert not db_utils._engines
+
+def test_odnc_accessors_share_a_session():
+	rvj = db.Species("Le Rossignol à ventre jaune")
+	assert {x.session for x in rvj.transcriptions} == {rvj.session}
+
+@contextmanager
+def count_odnc_queries():
+	engine = db._odnc_session().get_bind()
+	statements = []
+	listener = lambda *args: statements.append(args[2])
+	event.listen(engine, "before_cursor_execute", listener)
+	try:
+		yield statements
+	finally:
+		event.remove(engine, "before_cursor_execute", listener)
+
+def test_get_all_species_queries():
+	with count_odnc_queries() as statements:
+		species = db.get_all_species()
+	assert len(statements) == 2
+	assert len(species) == 19
+	rvj = [x for x in species if x.name == "Le Rossignol à ventre jaune"][0]
+	assert [x.name for x in rvj.transcriptions] == [
+		x.name for x in db.Species("Le Rossignol à ventre jaune").transcriptions
+	]
+
+def test_odnc_catalog():
+	with count_odnc_queries() as statements:
+		catalog = db.get_odnc_catalog()
+	assert len(statements) == 3
+	assert sum(len(x) for x in catalog.values()) == 19
+	assert all(x.category == name for name, species in catalog.items() for x in species)
+
+def test_transcription_analysis_is_lazy():
+	transcriptions = [x for x in db.get_all_transcriptions() if x._analysis_json]
+	assert transcriptions
+	transcription = transcriptions[0]
+	assert transcription._analysis is None
+	expected = json.loads(
+		transcription.session.query(db.TranscriptionData).filter(
+			db.TranscriptionData.name == transcription.name
+		).first().analysis,
+		cls=FragmentDecoder
+	)
+	assert transcription.analysis == expected
+	assert transcription.analysis is transcription.analysis
+
+def test_transcription_analysis_setter():
+	transcription = [x for x in db.get_all_transcriptions() if x._analysis_json][0]
+	transcription.analysis = ["edited"]
+	assert transcription.analysis == ["edited"]
+	assert transcription._analysis_json is None
+	transcription.analysis = None
+	assert transcription.analysis is None
+
+def test_bulk_writer():
+	filepath = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_2.xml"
+	extractions = rolling_hash_search(filepath=filepath, part_num=0, table=GreekFootHashTable())
+	with tempfile.TemporaryDirectory() as tmpdir:
+		db_path = os.path.join(tmpdir, "bulk.db")
+		with db.BulkWriter(db_path, chunk_size=7) as writer:
+			assert writer.connection.exec_driver_sql("PRAGMA synchronous").scalar() == 0
+			assert writer.connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "memory"
+			composition_id = writer.add_composition("Shuffled_Transcription_2.xml", 0, filepath)
+			writer.add_extractions(composition_id, extractions)
+			assert len(writer._rows) == len(extractions) % 7
+			assert len(writer._fragment_ids) == len({x.fragment for x in extractions})
+
+		session = get_session(db_path=db_path, base=db.USER_BASE)
+		with session.get_bind().connect() as connection:
+			assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 2
+			assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+
+		rows = session.query(db.ExtractionData).order_by(db.ExtractionData.id).all()
+		expected = [db._extraction_values(x) for x in extractions]
+		assert [{k: getattr(x, k) for k in expected[0]} for x in rows] == expected
+		assert {x.composition_data_id for x in rows} == {composition_id}
+		assert [json.loads(x.fragment, cls=FragmentDecoder) for x in rows] == [
+			x.fragment for x in extractions
+		]
+		assert session.query(db.FragmentDim).count() == len({x.fragment for x in extractions})
+		assert [db.decode_pitch_content(x.pitch_content) for x in rows] == [
+			x.pitch_content for x in extractions
+		]
+		session.close()
+
+def test_bulk_writer_rolls_back():
+	with tempfile.TemporaryDirectory() as tmpdir:
+		db_path = os.path.join(tmpdir, "failed.db")
+		with pytest.raises(ValueError):
+			with db.BulkWriter(db_path) as writer:
+				writer.add_composition("example.xml", 0, "example.xml")
+				raise ValueError()
+		session = get_session(db_path=db_path, base=db.USER_BASE)
+		assert session.query(db.CompositionData).count() == 0
+		session.close()
+
+def test_fragment_occurrences_use_indexes():
+	with tempfile.TemporaryDirectory() as tmpdir:
+		db_path = os.path.join(tmpdir, "indexed.db")
+		with db.BulkWriter(db_path):
+			pass
+		connection = sqlite3.connect(db_path)
+		plan = connection.execute(
+			"EXPLAIN QUERY PLAN SELECT * FROM ExtractionData JOIN FragmentDim ON "
+			"FragmentDim.id = ExtractionData.fragment_id WHERE FragmentDim.name = 'Ragavardhana'"
+		).fetchall()
+		indexes = {x[1] for x in connection.execute("PRAGMA index_list('ExtractionData')")}
+		connection.close()
+	assert all("SCAN" not in x[-1] for x in plan)
+	assert indexes == {
+		"ix_ExtractionData_fragment_id",
+		"ix_ExtractionData_mod_hierarchy_val",
+		"ix_ExtractionData_composition_onset",
+	}
+
+def test_migrate_extraction_database():
+	legacy_rows = [
+		(1, '{"frag_type": "greek_foot", "name": "Iamb"}', 0.0, 0.75, "[[60], [62]]", 1),
+		(2, '{"frag_type": "decitala", "name": "95_Ragavardhana"}', 0.5, 2.0, "[[60, 64]]", 1),
+		(3, '{"frag_type": "greek_foot", "name": "Iamb"}', 1.0, 1.75, "[null]", 2),
+	]
+	with tempfile.TemporaryDirectory() as tmpdir:
+		db_path = os.path.join(tmpdir, "legacy.db")
+		connection = sqlite3.connect(db_path)
+		connection.executescript("""
+			CREATE TABLE "CompositionData" (
+				id INTEGER PRIMARY KEY, name VARCHAR, part_num INTEGER, local_filepath VARCHAR
+			);
+			CREATE TABLE "ExtractionData" (
+				id INTEGER PRIMARY KEY, fragment VARCHAR, onset_start FLOAT, onset_stop FLOAT,
+				retrograde BOOLEAN, factor FLOAT, difference FLOAT, mod_hierarchy_val INTEGER,
+				pitch_content VARCHAR, is_spanned_by_slur BOOLEAN, slur_count INTEGER,
+				slur_start_end_count INTEGER, id_ INTEGER, contiguous_summation BOOLEAN,
+				composition_data_id INTEGER REFERENCES "CompositionData" (id)
+			);
+			INSERT INTO "CompositionData" VALUES (1, 'a.xml', 0, 'a.xml'), (2, 'b.xml', 0, 'b.xml');
+		""")
+		connection.executemany(
+			"INSERT INTO ExtractionData (id, fragment, onset_start, onset_stop, pitch_content, "
+			"composition_data_id) VALUES (?, ?, ?, ?, ?, ?)",
+			legacy_rows
+		)
+		connection.commit()
+		connection.close()
+
+		assert db.migrate_extraction_database(db_path, chunk_size=2) == 3
+		assert db.migrate_extraction_database(db_path) == 0
+
+		session = get_session(db_path=db_path, base=db.USER_BASE)
+		rows = session.query(db.ExtractionData).order_by(db.ExtractionData.id).all()
+		assert [(x.id, x.fragment, x.onset_start, x.composition_data_id) for x in rows] == [
+			x[:3] + x[5:] for x in legacy_rows
+		]
+		assert [db.decode_pitch_content(x.pitch_content) for x in rows] == [
+			[(60,), (62,)], [(60, 64)], [None]
+		]
+		assert session.query(db.FragmentDim).count() == 2
+		ragavardhana = session.query(db.ExtractionData).join(db.FragmentDim).filter(
+			db.FragmentDim.name == "95_Ragavardhana"
+		).all()
+		assert [x.id for x in ragavardhana] == [2]
+		session.close()
+
+def _extraction_rows(db_path):
+	session = get_session(db_path=db_path, base=db.USER_BASE)
+	compositions = session.query(db.CompositionData).order_by(db.CompositionData.id).all()
+	rows = [
+		(x.composition_data.name, x.composition_data.part_num, x.fragment, x.onset_start, x.id_)
+		for x in session.query(db.ExtractionData).order_by(db.ExtractionData.id)
+	]
+	session.close()
+	return [(x.name, x.part_num) for x in compositions], rows
+
+def test_parallel_batch_create_extraction_database():
+	static = os.path.dirname(here) + "/tests/static/"
+	data_in = {
+		static + "Shuffled_Transcription_1.xml": [0],
+		static + "Shuffled_Transcription_2.xml": [0],
+		static + "Shuffled_Transcription_3.xml": [0],
+	}
+	table = GreekFootHashTable()
+	with tempfile.TemporaryDirectory() as tmpdir:
+		results = []
+		for n_jobs in [1, 2]:
+			db_path = os.path.join(tmpdir, f"batch_{n_jobs}.db")
+			db.batch_create_extraction_database(
+				db_path=db_path,
+				data_in=data_in,
+				table=table,
+				windows=list(range(2, 19)),
+				n_jobs=n_jobs
+			)
+			results.append(_extraction_rows(db_path))
+
+	assert results[0] == results[1]
+	compositions, rows = results[0]
+	assert compositions == [(x.split("/")[-1], 0) for x in data_in]
+	assert len(rows) > 0
+
+def _counting_job(calls, results):
+	def job(table, filepath, part_num):
+		calls.append((filepath, part_num))
+		return results[part_num]
+	return job
+
+def test_build_database_skips_parts_after_empty_part():
+	extraction = rolling_hash_search(
+		os.path.dirname(here) + "/tests/static/Shuffled_Transcription_1.xml",
+		part_num=0,
+		table=GreekFootHashTable()
+	)[:1]
+	calls = []
+	job = _counting_job(calls, {0: extraction, 1: [], 2: extraction, 3: extraction})
+	data_in = {"a.xml": [0, 1, 2, 3], "b.xml": [0]}
+	with tempfile.TemporaryDirectory() as tmpdir:
+		db_path = os.path.join(tmpdir, "lazy.db")
+		db._build_database(db_path, data_in, table=None, job=job, n_jobs=1)
+		compositions, rows = _extraction_rows(db_path)
+
+	assert calls == [("a.xml", 0), ("a.xml", 1), ("b.xml", 0)]
+	assert compositions == [("a.xml", 0), ("a.xml", 1), ("b.xml", 0)]
+	assert len(rows) == 2
+
+def test_parallel_batch_create_path_database():
+	static = os.path.dirname(here) + "/tests/static/"
+	data_in = {
+		static + "Shuffled_Transcription_1.xml": [0],
+		static + "Shuffled_Transcription_2.xml": [0],
+	}
+	table = GreekFootHashTable()
+	with tempfile.TemporaryDirectory() as tmpdir:
+		results = []
+		for n_jobs in [1, 2]:
+			db_path = os.path.join(tmpdir, f"paths_{n_jobs}.db")
+			db.batch_create_path_database(
+				db_path=db_path,
+				data_in=data_in,
+				table=table,
+				n_jobs=n_jobs
+			)
+			results.append(_extraction_rows(db_path))
+	assert results[0] == results[1]
+	assert len(results[0][1]) > 0
@@ -101,4 +101,37 @@ def test_dijkstra_best_source_and_sink():
 		table=DecitalaHashTable(exact=True),
 	)
 	source, target, best_pred = dijkstra.dijkstra_best_source_and_sink(data=exact_bach_frags)
-	assert source == target
\ No newline at end of file
+	assert source == target
+
+def test_verified_pruned_graph_keeps_shortest_paths(s1_fragments):
+	cost_function = path_finding_utils.CostFunction3D()
+	full = path_finding_utils.build_graph(s1_fragments, cost_function)
+	pruned = path_finding_utils.build_graph(
+		s1_fragments,
+		cost_function,
+		prune=True,
+		verify_pruning=True
+	)
+	assert sum(len(x) for x in pruned.values()) < sum(len(x) for x in full.values())
+
+	sources, _ = path_finding_utils.sources_and_sinks(s1_fragments)
+	for source in sources:
+		full_dist, _ = dijkstra.dijkstra(s1_fragments, full, source)
+		pruned_dist, _ = dijkstra.dijkstra(s1_fragments, pruned, source)
+		assert full_dist.keys() == pruned_dist.keys()
+		for key in full_dist:
+			assert np.isclose(full_dist[key], pruned_dist[key]) or full_dist[key] == pruned_dist[key]
+
+def test_lazy_graph_matches_built_graph(s1_fragments):
+	cost_function = path_finding_utils.CostFunction3D()
+	graph = path_finding_utils.build_graph(s1_fragments, cost_function)
+	neighbours = path_finding_utils.lazy_graph(s1_fragments, cost_function)
+	for vertex_id, edges in graph.items():
+		assert list(neighbours(vertex_id)) == edges
+
+def test_lazy_dijkstra_best_source_and_sink(s1_fragments):
+	eager = dijkstra.dijkstra_best_source_and_sink(data=s1_fragments)
+	lazy = dijkstra.dijkstra_best_source_and_sink(data=s1_fragments, lazy=True)
+	assert eager[0] == lazy[0]
+	assert eager[1] == lazy[1]
+	assert dijkstra.generate_path(eager[2], eager[0], eager[1]) == dijkstra.generate_path(lazy[2], lazy[0], lazy[1]) # noqa
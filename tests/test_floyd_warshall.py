@@ -38,4 +38,17 @@ def test_get_path(s1_fragments):
 		GreekFoot("Peon_IV"),
 		GreekFoot("Peon_IV")
 	]
-	assert set(x.fragment for x in best_path) == set(fragments)
\ No newline at end of file
+	assert set(x.fragment for x in best_path) == set(fragments)
+
+def test_vectorized_initial_matrices(s1_fragments):
+	class ScalarCostFunction(path_finding_utils.CostFunction3D):
+		def cost(self, vertex_a, vertex_b):
+			return super().cost(vertex_a, vertex_b)
+
+	dist_vectorized, next_vectorized = floyd_warshall._initial_matrices_vectorized(
+		s1_fragments,
+		path_finding_utils.CostFunction3D()
+	)
+	dist_scalar, next_scalar = floyd_warshall._initial_matrices(s1_fragments, ScalarCostFunction())
+	assert np.array_equal(dist_vectorized, dist_scalar)
+	assert (next_vectorized == next_scalar).all()
@@ -110,7 +110,6 @@ def test_decitala_carnatic_string():
 	assert rajacudamani.carnatic_string == predicted
 
 def test_dseg():
-	GeneralFragment.ql_array.cache_clear()
 	frag = GeneralFragment([1.0, 1.0, 2.0, 2.0, 3.0, 0.125, 1.0, 0.5, 4.0])
 	predicted = np.array([2, 2, 3, 3, 4, 0, 2, 1, 5])
 
@@ -183,4 +182,84 @@ def test_prosodic_meter_query_unordered():
 		ProsodicMeter("Cretic_Tetrameter_3", origin="latin"),
 		ProsodicMeter("Cretic_Tetrameter_5", origin="latin"),
 		ProsodicMeter("Cretic_Tetrameter_6", origin="latin"),
-	]
\ No newline at end of file
+	]
+
+def test_dataset_fragments_use_stored_ql_array(monkeypatch):
+	def _fail(*args, **kwargs):
+		raise AssertionError("The file should not be parsed.")
+
+	jaya = Decitala("Jaya")
+	bacchius = GreekFoot("Bacchius")
+	jaya._ql_arrays.clear()
+	bacchius._ql_arrays.clear()
+	monkeypatch.setattr(fragment.converter, "parse", _fail)
+	assert list(jaya.ql_array()) == [0.5, 1.0, 0.5, 0.5, 0.25, 0.25, 1.5]
+	assert list(bacchius.ql_array(retrograde=True)) == [2.0, 2.0, 1.0]
+
+def test_stored_ql_array_fallback_to_file():
+	for this_fragment in fragment.get_all_decitalas()[:10] + fragment.get_all_greek_feet()[:10]:
+		stored = this_fragment._stored_ql_array
+		this_fragment._stored_ql_array = None
+		this_fragment._ql_arrays.clear()
+		try:
+			assert np.array_equal(this_fragment.ql_array(), stored)
+		finally:
+			this_fragment._stored_ql_array = stored
+
+def test_registry_returns_canonical_instances():
+	import copy
+	import pickle
+
+	assert Decitala("Jaya") is Decitala("28_Jaya.xml")
+	assert GreekFoot("Iamb") is GreekFoot("Iamb")
+	meter = ProsodicMeter("Cretic_Tetrameter", origin="latin")
+	assert meter is ProsodicMeter("Cretic_Tetrameter", origin="latin")
+	assert meter is not ProsodicMeter("Cretic_Tetrameter", origin="greek")
+	assert ProsodicMeter("Cretic_Tetrameter").name == "Cretic_Tetrameter"
+
+	for this_fragment in [Decitala("Ragavardhana"), GreekFoot("Bacchius"), meter]:
+		assert pickle.loads(pickle.dumps(this_fragment)) is this_fragment
+		assert copy.deepcopy(this_fragment) is this_fragment
+
+def test_preload_avoids_queries(monkeypatch):
+	# Start from an empty registry, so that the fragments built by other tests don't matter.
+	monkeypatch.setattr(fragment, "_REGISTRY", dict())
+	monkeypatch.setattr(fragment, "_ALIASES", dict())
+	fragment.preload()
+	num_fragments = len(fragment._REGISTRY)
+	all_fragments = fragment.get_all_decitalas() + fragment.get_all_greek_feet() + get_all_prosodic_meters() # noqa
+	assert num_fragments == len({id(x) for x in all_fragments})
+
+	def _fail(*args, **kwargs):
+		raise AssertionError("No query should be needed.")
+
+	monkeypatch.setattr(fragment, "_fragment_session", _fail)
+	assert Decitala("Ragavardhana").name == "93_Ragavardhana"
+	assert Decitala("Ragavardhana") is Decitala("93_Ragavardhana")
+	assert Decitala("A_Mantha").name == "38_A_Mantha"
+	assert GreekFoot("Peon_IV").num_onsets == 4
+	assert len(fragment._REGISTRY) == num_fragments
+
+def test_identity_key():
+	a = GeneralFragment([1.0, 0.5], name="x")
+	assert a == GeneralFragment(np.array([1.0, 0.5]), name="x")
+	assert hash(a) == hash(GeneralFragment(np.array([1.0, 0.5]), name="x"))
+	assert a != GeneralFragment([1.0, 0.5], name="y")
+	assert a != GeneralFragment([0.5, 1.0], name="x")
+	assert a != "x"
+	assert GreekFoot("Iamb") == GeneralFragment(GreekFoot("Iamb").full_path, name="Iamb")
+	assert len({GreekFoot("Iamb"), GreekFoot("Iamb"), Decitala("Jaya")}) == 2
+
+def test_caches_are_freed_with_the_fragment():
+	import gc
+	import weakref
+
+	this_fragment = GeneralFragment([0.25, 0.5, 0.25], name="temporary")
+	assert this_fragment.num_onsets == 3
+	assert this_fragment.ql_tuple(retrograde=True) == (0.25, 0.5, 0.25)
+	assert this_fragment.ql_array(retrograde=True) is this_fragment.ql_array(retrograde=True)
+
+	reference = weakref.ref(this_fragment)
+	del this_fragment
+	gc.collect()
+	assert reference() is None
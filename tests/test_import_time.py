@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+# Generous enough for a slow CI machine; the eager imports took several seconds.
+IMPORT_TIME_BUDGET = 3.0
+
+HEAVY_MODULES = ["matplotlib", "wand", "treeplotter", "librosa", "scipy.stats"]
+
+script = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+from decitala import cli, fragment, search, vis
+from decitala.database import db
+seconds = time.perf_counter() - start
+
+print(json.dumps({
+	"seconds": seconds,
+	"loaded": [x for x in %r if x in sys.modules],
+	"session_opened": fragment._session is not None,
+}))
+""" % (HEAVY_MODULES,)
+
+def _import_report():
+	output = subprocess.run(
+		[sys.executable, "-c", script],
+		check=True,
+		capture_output=True,
+		text=True
+	).stdout
+	return json.loads(output.strip().splitlines()[-1])
+
+def test_import_is_lazy():
+	report = _import_report()
+	assert report["loaded"] == []
+	assert not report["session_opened"]
+
+def test_import_time_budget():
+	# Best of three, so that a busy machine doesn't fail the test.
+	seconds = min(_import_report()["seconds"] for _ in range(3))
+	assert seconds < IMPORT_TIME_BUDGET
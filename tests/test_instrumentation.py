@@ -0,0 +1,79 @@
+import os
+import doctest
+import time
+
+from decitala import instrumentation
+from decitala.benchmark import synthetic_extractions
+from decitala.hash_table import GreekFootHashTable
+from decitala.search import rolling_hash_search, path_finder
+from decitala.path_finding import floyd_warshall
+
+here = os.path.abspath(os.path.dirname(__file__))
+fp = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_2.xml"
+
+def test_doctests():
+	assert doctest.testmod(instrumentation, raise_on_error=True)
+
+def test_disabled_hooks_do_nothing():
+	assert not instrumentation.enabled()
+	with instrumentation.stage("graph"):
+		instrumentation.count("edges_built", 3)
+	assert list(instrumentation.progress(range(3), "loop")) == [0, 1, 2]
+
+def test_disabled_search_creates_no_stages(monkeypatch):
+	table = GreekFootHashTable()
+	table.load()
+
+	def _fail(name):
+		raise AssertionError(f"Stage {name} created while instrumentation is disabled.")
+
+	monkeypatch.setattr(instrumentation, "stage", _fail)
+	extractions = rolling_hash_search(fp, part_num=0, table=table, allow_subdivision=True)
+	assert len(extractions) > 0
+
+def test_timed():
+	with instrumentation.instrument() as report:
+		with instrumentation.stage("outer"):
+			for _ in instrumentation.timed((time.sleep(0.01) for _ in range(3)), "inner"):
+				time.sleep(0.02)
+	assert 0.03 <= report.seconds["inner"] < 0.06
+	assert 0.06 <= report.seconds["outer"]
+
+def test_nested_stages_are_exclusive():
+	with instrumentation.instrument() as report:
+		with instrumentation.stage("outer"):
+			time.sleep(0.02)
+			with instrumentation.stage("inner"):
+				time.sleep(0.05)
+	assert not instrumentation.enabled()
+	assert 0.05 <= report.seconds["inner"]
+	assert 0.02 <= report.seconds["outer"] < 0.05
+
+def test_callback_events():
+	events = []
+	with instrumentation.instrument(callback=lambda *event: events.append(event)):
+		floyd_warshall.floyd_warshall(synthetic_extractions(10))
+	assert [x[0] for x in events].count("progress") == 10
+	assert ("count", "edges_built") in {x[:2] for x in events}
+	assert ("stage", "graph") in {x[:2] for x in events}
+
+def test_search_counters():
+	table = GreekFootHashTable()
+	with instrumentation.instrument() as report:
+		extractions = rolling_hash_search(fp, part_num=0, table=table, allow_subdivision=True)
+
+	counts = report.counts
+	assert counts["extractions"] == len(extractions)
+	assert counts["probes"] >= counts["frames"] - counts["objects"]
+	assert counts["superdivisions"] > 0
+	hits = sum(v for k, v in counts.items() if k.startswith("hits_mod_hierarchy_val_"))
+	assert hits == len(extractions)
+	assert {"parse", "windowing", "lookup", "subdivision", "slur_features"} <= set(report.seconds)
+
+def test_path_finder_stages():
+	with instrumentation.instrument() as report:
+		path_finder(fp, part_num=0, table=GreekFootHashTable())
+	assert {"catalog", "modifications", "parse", "graph", "path"} <= set(report.seconds)
+	assert report.counts["heap_pushes"] > 0
+	assert report.counts["edges_built"] > 0
+	assert report.to_dict()["counts"] == dict(report.counts)
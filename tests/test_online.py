@@ -0,0 +1,88 @@
+import os
+import pytest
+
+from decitala.benchmark import synthetic_extractions
+from decitala.hash_table import GreekFootHashTable
+from decitala.search import rolling_hash_search
+from decitala.path_finding import beam, online, path_finding_utils
+
+here = os.path.abspath(os.path.dirname(__file__))
+s2_fp = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_2.xml"
+s5_fp = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_5.xml"
+
+def _path_cost(path, cost_function_class):
+	return sum(cost_function_class.cost(a, b) for a, b in zip(path, path[1:]))
+
+@pytest.mark.parametrize("filepath", [s2_fp, s5_fp])
+def test_unbounded_lookahead_is_exact(filepath):
+	data = rolling_hash_search(filepath=filepath, part_num=0, table=GreekFootHashTable())
+	cf = path_finding_utils.CostFunction3D(0.8, 0.1, 0.1)
+	finder = online.OnlinePathFinder(cost_function_class=cf)
+	for extraction in data:
+		assert finder.push(extraction) == []
+	path = finder.close()
+
+	_, exact_cost, _ = beam.optimality_gap(data, cf)
+	assert _path_cost(path, cf) == pytest.approx(exact_cost)
+
+def test_segments_are_committed_while_streaming():
+	data = rolling_hash_search(filepath=s2_fp, part_num=0, table=GreekFootHashTable())
+	segments = []
+	stream = online.online_path_finder(iter(data), lookahead=2.0)
+	for segment in stream:
+		segments.append(segment)
+	assert len(segments) > 1
+
+	path = [x for segment in segments for x in segment]
+	assert path[0].onset_range[0] == 0.0
+	for a, b in zip(path, path[1:]):
+		assert a.onset_range[1] <= b.onset_range[0]
+
+@pytest.mark.parametrize("seed,lookahead", [(1, 3.0), (4, 3.0), (0, 1.0), (2, 0.5)])
+def test_gaps_longer_than_lookahead(seed, lookahead):
+	data = sorted(
+		synthetic_extractions(300, overlap=3.0, seed=seed),
+		key=lambda x: x.onset_range
+	)
+	cf = path_finding_utils.CostFunction3D()
+	path = [x for segment in online.online_path_finder(data, cf, lookahead=lookahead) for x in segment] # noqa
+
+	gaps = [b.onset_range[0] - a.onset_range[1] for a, b in zip(path, path[1:])]
+	assert max(gaps) > lookahead
+	sources, sinks = path_finding_utils.sources_and_sinks(data)
+	assert path[0] in sources
+	assert path[-1] in sinks
+
+	# The path may cost more than the exact one, but never less.
+	_, exact_cost, _ = beam.optimality_gap(data, cf)
+	assert _path_cost(path, cf) >= exact_cost - 1e-9
+
+def test_committed_extractions_are_dropped():
+	import gc
+	import weakref
+
+	data = sorted(synthetic_extractions(300, overlap=3.0, seed=1), key=lambda x: x.onset_range)
+	refs = [weakref.ref(x) for x in data]
+	finder = online.OnlinePathFinder(lookahead=1.0)
+
+	num_committed = 0
+	while data:
+		num_committed += len(finder.push(data.pop(0)))
+	gc.collect()
+	assert finder.path is None
+	assert finder.num_committed == num_committed > 0
+	assert sum(ref() is not None for ref in refs) < 50
+
+def test_keep_path():
+	data = rolling_hash_search(filepath=s2_fp, part_num=0, table=GreekFootHashTable())
+	finder = online.OnlinePathFinder(lookahead=2.0, keep_path=True)
+	segments = [finder.push(x) for x in data] + [finder.close()]
+	assert finder.path == [x for segment in segments for x in segment]
+	assert finder.num_committed == len(finder.path)
+
+def test_out_of_order_push():
+	data = rolling_hash_search(filepath=s2_fp, part_num=0, table=GreekFootHashTable())
+	finder = online.OnlinePathFinder()
+	finder.push(data[-1])
+	with pytest.raises(online.OnlinePathFindingException):
+		finder.push(data[0])
@@ -89,4 +89,101 @@ def test_nc_106_split_extractions():
 		(10.375, 10.875),
 		(10.875, 11.5)
 	]
-	assert calculated_split_onset_ranges == expected_onset_ranges
\ No newline at end of file
+	assert calculated_split_onset_ranges == expected_onset_ranges
+
+def test_split_extractions_ids_and_sharing():
+	filepath = os.path.dirname(here) + "/tests/static/Shuffled_Transcription_5.xml"
+	all_results = rolling_hash_search(
+		filepath=filepath,
+		part_num=0,
+		table=GreekFootHashTable(),
+	)
+	index = path_finding_utils.ExtractionIndex(all_results)
+	for extraction in all_results:
+		expected = [
+			x for x in all_results
+			if x.onset_range[0] >= extraction.onset_range[0] and x.onset_range[1] <= extraction.onset_range[1] # noqa
+		]
+		assert index.contained_in(extraction.onset_range) == expected
+
+	split = path_finding_utils.split_extractions(
+		data=all_results,
+		all_res=all_results,
+		split_dict=path_finding_utils.default_split_dict()
+	)
+	assert len(split) > len(all_results)
+	ids = [x.id_ for x in split]
+	assert len(ids) == len(set(ids))
+
+	by_onset_range = {(x.fragment, x.onset_range): x for x in all_results}
+	for x in split:
+		assert x.pitch_content is by_onset_range[(x.fragment, x.onset_range)].pitch_content
+
+class _ScalarCostFunction3D(path_finding_utils.CostFunction3D):
+	"""Overrides ``cost`` only, so the graph builders fall back to the scalar path."""
+	def cost(self, vertex_a, vertex_b):
+		return super().cost(vertex_a, vertex_b)
+
+def test_supports_cost_matrix():
+	assert path_finding_utils.supports_cost_matrix(path_finding_utils.CostFunction2D())
+	assert path_finding_utils.supports_cost_matrix(path_finding_utils.CostFunction3D())
+	assert not(path_finding_utils.supports_cost_matrix(_ScalarCostFunction3D()))
+
+def test_cost_matrix_matches_cost():
+	fragments = rolling_hash_search(
+		filepath=st2,
+		part_num=0,
+		table=GreekFootHashTable()
+	)
+	arrays = path_finding_utils.extraction_arrays(fragments)
+	for cf in [path_finding_utils.CostFunction2D(), path_finding_utils.CostFunction3D(0.6, 0.3, 0.1)]:
+		matrix = cf.cost_matrix(**arrays)
+		for i, a in enumerate(fragments):
+			for j, b in enumerate(fragments):
+				assert matrix[i, j] == cf.cost(a, b)
+
+def test_vectorized_build_graph_matches_scalar():
+	fragments = rolling_hash_search(
+		filepath=st2,
+		part_num=0,
+		table=GreekFootHashTable()
+	)
+	vectorized = path_finding_utils.build_graph(fragments, path_finding_utils.CostFunction3D())
+	scalar = path_finding_utils.build_graph(fragments, _ScalarCostFunction3D())
+	assert vectorized == scalar
+
+def test_successor_windows():
+	fragments = rolling_hash_search(
+		filepath=st2,
+		part_num=0,
+		table=GreekFootHashTable()
+	)
+	order, lo, hi = path_finding_utils.successor_windows(fragments)
+	for i, x in enumerate(fragments):
+		expected = {j for j, y in enumerate(fragments) if x.onset_range[1] <= y.onset_range[0]}
+		assert set(order[lo[i]:hi[i]].tolist()) == expected
+
+	order, lo, hi = path_finding_utils.successor_windows(fragments, prune=True)
+	for i, x in enumerate(fragments):
+		successors = [y for y in fragments if x.onset_range[1] <= y.onset_range[0]]
+		if not successors:
+			continue
+		earliest_end = min(y.onset_range[1] for y in successors)
+		expected = {j for j, y in enumerate(fragments) if x.onset_range[1] <= y.onset_range[0] < earliest_end} # noqa
+		assert set(order[lo[i]:hi[i]].tolist()) == expected
+
+def test_sources_and_sinks_match_pairwise_definition():
+	for filepath in [st2, st3]:
+		fragments = rolling_hash_search(
+			filepath=filepath,
+			part_num=0,
+			table=GreekFootHashTable(),
+			allow_subdivision=True
+		)
+		sources, sinks = path_finding_utils.sources_and_sinks(fragments)
+		assert sources == [x for x in fragments if not any(y.onset_range[1] <= x.onset_range[0] for y in fragments)] # noqa
+		assert sinks == [x for x in fragments if not any(x.onset_range[1] <= y.onset_range[0] for y in fragments)] # noqa
+
+def test_sources_and_sinks_empty():
+	assert path_finding_utils.sources_and_sinks([]) == ([], [])
+	assert path_finding_utils.sources_and_sinks([], enforce_earliest_start=True) == ([], [])
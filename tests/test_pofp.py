@@ -7,7 +7,8 @@ from decitala.path_finding.pofp import (
 	get_break_points,
 	get_pareto_optimal_longest_paths,
 	partition_data_by_break_points,
-	get_pareto_optimal_longest_paths
+	get_pareto_optimal_longest_paths,
+	iter_pareto_optimal_longest_paths
 )
 from decitala.fragment import (
 	GeneralFragment,
@@ -128,6 +129,12 @@ def test_break_point(fake_data):
 def test_get_break_points(fake_data):
 	assert get_break_points(fake_data) == [6]
 
+def test_get_break_points_matches_check_break_point(fake_data):
+	for n in range(len(fake_data) + 1):
+		data = fake_data[:n]
+		expected = [i for i in range(len(data)) if check_break_point(data, i)]
+		assert get_break_points(data) == expected
+
 def test_partition_data_by_break_points(fake_data):
 	partitioned = partition_data_by_break_points(fake_data)
 	assert set([x.id_ for x in partitioned[0]]) == set([1, 2, 3, 4, 5, 6])
@@ -141,4 +148,14 @@ def test_get_pareto_optimal_longest_paths(fake_data):
 		[(0.0, 2.0), (2.0, 5.75), (6.0, 7.25)],
 		[(0.0, 2.0), (2.5, 4.5), (6.0, 7.25)],
 		[(0.0, 4.0), (4.0, 5.5), (6.0, 7.25)]
-	]
\ No newline at end of file
+	]
+
+def test_iter_pareto_optimal_longest_paths(fake_data):
+	all_paths = get_pareto_optimal_longest_paths(fake_data)
+	for max_paths in [None, 0, 1, 2, 10]:
+		paths = list(iter_pareto_optimal_longest_paths(fake_data, max_paths=max_paths))
+		assert paths == all_paths[:max_paths]
+
+def test_pareto_optimal_longest_paths_empty():
+	assert get_pareto_optimal_longest_paths([]) == []
+	assert list(iter_pareto_optimal_longest_paths([])) == []
@@ -183,6 +183,20 @@ def test_povel_essen_dijkstra(povel_essen_example):
 	assert len(path) == 1
 	assert path[0].fragment == GreekFoot("Tribrach") # see ms. 8-9.  
 
+def test_partitioned_path_finder(fp1):
+	table = GreekFootHashTable()
+	path = search.path_finder(filepath=fp1, part_num=0, table=table)
+	partitioned_path = search.path_finder(filepath=fp1, part_num=0, table=table, partition=True)
+	parallel_path = search.path_finder(
+		filepath=fp1,
+		part_num=0,
+		table=table,
+		partition=True,
+		n_jobs=2
+	)
+	assert [x.onset_range for x in partitioned_path] == [x.onset_range for x in path]
+	assert [x.id_ for x in parallel_path] == [x.id_ for x in partitioned_path]
+
 def test_rolling_search_on_array():
 	ght = FragmentHashTable(
 		datasets=["greek_foot"]
@@ -228,4 +242,36 @@ def test_slur_data(fp3):
 
 	assert frame_spanned_by_slur == expected_frame_is_spanned_by_slur
 	assert slur_counts == expected_slur_counts
-	assert slur_start_end_counts == expected_slur_start_end_counts
\ No newline at end of file
+	assert slur_start_end_counts == expected_slur_start_end_counts
+
+@pytest.mark.parametrize("algorithm", ["dijkstra", "dag"])
+def test_shuffled_I_path_with_slur_constraint_dag(algorithm):
+	path = search.path_finder(
+		filepath=os.path.dirname(here) + "/tests/static/Shuffled_Transcription_1.xml",
+		part_num=0,
+		table=GreekFootHashTable(),
+		algorithm=algorithm,
+		slur_constraint=True
+	)
+	assert [x.onset_range for x in path] == [
+		(0.0, 0.625),
+		(0.875, 1.25),
+		(1.25, 1.875),
+		(1.875, 2.375),
+		(2.375, 3.0)
+	]
+	assert all(x.is_spanned_by_slur for x in path)
+
+def test_loaded_table_is_not_reloaded(fp1, monkeypatch):
+	table = FragmentHashTable(datasets=["greek_foot"])
+	table.load(try_retrograde=False)
+	load_parameters = table.load_parameters
+
+	def _fail(*args, **kwargs):
+		raise AssertionError("The table should not be loaded again.")
+
+	monkeypatch.setattr(table, "load", _fail)
+	extractions = search.rolling_hash_search(filepath=fp1, part_num=0, table=table)
+	assert extractions
+	assert not any(x.retrograde for x in extractions)
+	assert table.load_parameters == load_parameters